@@ -1,11 +1,41 @@
 import os
 from functools import wraps
 from datetime import datetime
-import json # NOVO: Importa json para manipular a chave de serviço
-import json 
-
-import firebase_admin 
-from firebase_admin import credentials, firestore, auth
+import time
+import uuid
+import csv
+import hmac
+import io
+import json
+
+# Firebase é carregado sob demanda (ver firebase_client.py): db, auth e firestore são proxies
+import firebase_client
+from firebase_client import auth, db, firestore
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
+from flask import abort, g, send_file
+
+from cache import TTLCache
+from progress import ProgressEngine, compactar_progresso
+from progress_migration import migrar_progresso
+from portfolio_migration import completar_portfolios
+from write_buffer import ProgressWriteBuffer
+from submission_tx import TransactionalSubmitter
+from certificates import CertificateStore, CertificadoPendente, data_por_extenso
+from certificate_job import gerar_certificados_turma
+from storage import FirestoreStorage, SQLiteStorage, normalizar_email
+from async_storage import AsyncFirestoreStorage
+from instrumentation import Instrumentacao, InstrumentedAsyncFirestore, InstrumentedFirestore, PerfiladorLento
+from fragment_cache import FragmentCacheExtension
+from jinja2 import FileSystemBytecodeCache
+from assets import AssetPipeline, construir_assets
+from css_build import construir_css
+from course_stats import EstatisticasCurso
+from password_pool import PasswordPool, PoolDeSenhasOcupado
+from throttle import TokenBucketLimiter
+from roster import ler_planilha, provisionar_turma
+from question_bank import BancoDeQuestoes
+from page_cache import CachePaginas, versao_templates
+import click
 
 
 # =========================================================
@@ -17,110 +47,158 @@ app = Flask(__name__)
 # Em produção, o Render fornecerá a 'SECRET_KEY'
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua_chave_secreta_padrao_muito_longa')
 
+# Cache por processo de usuário+progresso (segundos). 0 desativa o cache. Só serve às páginas de
+# exibição: gravações e decisões de desbloqueio/conclusão releem (usuario_logado(fresco=True)).
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 30))
+app.config['USER_CACHE_MAXSIZE'] = int(os.environ.get('USER_CACHE_MAXSIZE', 2048))
+# Enquanto houver usuários sem documento em 'emails', cai na query antiga por e-mail
+app.config['EMAIL_INDEX_LEGACY_FALLBACK'] = os.environ.get('EMAIL_INDEX_LEGACY_FALLBACK', '1') == '1'
+# Janela (segundos) do modo write-behind de submissões de exercícios. 0 = grava na hora.
+app.config['SUBMISSION_WRITE_BEHIND_WINDOW'] = float(os.environ.get('SUBMISSION_WRITE_BEHIND_WINDOW', 0))
+# 'increment' (padrão, maior vazão) ou 'transaction' (contadores exatos, ver submission_tx.py)
+app.config['SUBMISSION_MODE'] = os.environ.get('SUBMISSION_MODE', 'increment')
+app.config['SUBMISSION_TX_MAX_ATTEMPTS'] = int(os.environ.get('SUBMISSION_TX_MAX_ATTEMPTS', 5))
+# Cache em disco dos PDFs de certificado e tamanho do pool de geração
+app.config['CERTIFICADOS_DIR'] = os.environ.get('CERTIFICADOS_DIR', os.path.join(app.instance_path, 'certificados'))
+app.config['CERTIFICADOS_WORKERS'] = int(os.environ.get('CERTIFICADOS_WORKERS', 2))
+# 'firestore' (produção), 'firestore-async' (conteúdo e submissões pelo AsyncClient, servido por asgi.py)
+# ou 'sqlite' (instalações locais e testes de carga, ver storage.py)
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'firestore')
+# Threads por worker para as rotas síncronas quando o app roda em asgi.py
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 8))
+app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', os.path.join(app.instance_path, 'storage.db'))
+# Inicialização do Firebase no primeiro uso (1) ou no import (0)
+app.config['FIREBASE_LAZY'] = os.environ.get('FIREBASE_LAZY', '1') == '1'
+# Contagem de chamadas ao Firestore por requisição (Server-Timing e /metrics)
+app.config['FIRESTORE_INSTRUMENTATION'] = os.environ.get('FIRESTORE_INSTRUMENTATION', '1') == '1'
+# /metrics só existe com um token definido, e exige 'Authorization: Bearer <token>'
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+# Perfil (cProfile) das requisições lentas: limite em ms (0 desativa) e fração amostrada
+app.config['SLOW_REQUEST_PROFILE_MS'] = int(os.environ.get('SLOW_REQUEST_PROFILE_MS', 0))
+app.config['SLOW_REQUEST_PROFILE_SAMPLE'] = float(os.environ.get('SLOW_REQUEST_PROFILE_SAMPLE', 0.05))
+app.config['PROFILES_DIR'] = os.environ.get('PROFILES_DIR', os.path.join(app.instance_path, 'profiles'))
+# Cache dos trechos estáticos dos módulos e do bytecode dos templates ('' desativa o bytecode em disco)
+app.config['TEMPLATE_FRAGMENT_CACHE'] = os.environ.get('TEMPLATE_FRAGMENT_CACHE', '1') == '1'
+app.config['JINJA_BYTECODE_CACHE_DIR'] = os.environ.get('JINJA_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+# Contadores agregados do curso (painel dos coordenadores; só Firestore) e nº de shards
+app.config['COURSE_STATS'] = os.environ.get('COURSE_STATS', '1') == '1'
+app.config['COURSE_STATS_SHARDS'] = int(os.environ.get('COURSE_STATS_SHARDS', 8))
+# Os incrementos das estatísticas são somados em memória e gravados a cada N segundos, fora da requisição
+app.config['COURSE_STATS_FLUSH_WINDOW'] = float(os.environ.get('COURSE_STATS_FLUSH_WINDOW', 5))
+# Documentos lidos por página na exportação das respostas (/admin/respostas.csv)
+app.config['EXPORT_PAGE_SIZE'] = int(os.environ.get('EXPORT_PAGE_SIZE', 500))
+# Hash/verificação de senhas em um pool de processos por worker (0 = na thread da requisição),
+# vagas na fila e espera máxima (segundos) por uma vaga
+app.config['PASSWORD_POOL_WORKERS'] = int(os.environ.get('PASSWORD_POOL_WORKERS', 1))
+app.config['PASSWORD_POOL_QUEUE'] = int(os.environ.get('PASSWORD_POOL_QUEUE', 8))
+app.config['PASSWORD_POOL_TIMEOUT'] = float(os.environ.get('PASSWORD_POOL_TIMEOUT', 10))
+# Tentativas de login/cadastro (token bucket por worker): rajada e recarga por segundo,
+# por IP (escolas saem por um IP só) e por e-mail. Rajada 0 desativa o limite.
+app.config['LOGIN_THROTTLE_IP_BURST'] = int(os.environ.get('LOGIN_THROTTLE_IP_BURST', 60))
+app.config['LOGIN_THROTTLE_IP_RATE'] = float(os.environ.get('LOGIN_THROTTLE_IP_RATE', 1))
+app.config['LOGIN_THROTTLE_EMAIL_BURST'] = int(os.environ.get('LOGIN_THROTTLE_EMAIL_BURST', 5))
+app.config['LOGIN_THROTTLE_EMAIL_RATE'] = float(os.environ.get('LOGIN_THROTTLE_EMAIL_RATE', 0.05))
+# Atrás do proxy do Render: o IP do cliente é o último do X-Forwarded-For
+app.config['BEHIND_PROXY'] = os.environ.get('BEHIND_PROXY', '1') == '1'
+# Banco de questões dos módulos (JSON, ou YAML com PyYAML instalado), carregado uma vez por processo
+app.config['QUESTION_BANK_PATH'] = os.environ.get('QUESTION_BANK_PATH', os.path.join(app.root_path, 'data', 'questoes.json'))
+# Cache de página inteira das páginas públicas para visitantes anônimos: validade (segundos, 0 desativa),
+# páginas em memória, pasta compartilhada entre workers ('' = só memória) e max-age para navegador/CDN
+app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 300))
+app.config['PAGE_CACHE_MAXSIZE'] = int(os.environ.get('PAGE_CACHE_MAXSIZE', 64))
+app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR', '')
+app.config['PAGE_CACHE_MAX_AGE'] = int(os.environ.get('PAGE_CACHE_MAX_AGE', 60))
+# E-mails (separados por vírgula) com acesso às páginas /admin
+app.config['ADMIN_EMAILS'] = {normalizar_email(e) for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
+
+# Templates compilados ficam em disco e sobrevivem ao reinício dos workers do gunicorn
+if app.config['JINJA_BYTECODE_CACHE_DIR']:
+    os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragmentos_ativos = app.config['TEMPLATE_FRAGMENT_CACHE']
+
+# Estáticos com hash no nome, gzip/brotli/WebP e cache imutável (gerados por `flask construir-assets`)
+asset_pipeline = AssetPipeline(app)
+
 
 # =========================================================
-# 1.1 CONFIGURAÇÃO FIREBASE ADMIN SDK (NOVO)
 # 1.1 CONFIGURAÇÃO FIREBASE ADMIN SDK
 # =========================================================
-try:
-    # 1. Tenta carregar da variável de ambiente (USO EM PRODUÇÃO)
-    FIREBASE_SERVICE_ACCOUNT_JSON = os.environ.get('FIREBASE_CONFIG_JSON')
-
-    if FIREBASE_SERVICE_ACCOUNT_JSON:
-        # Carrega o JSON da string (variável de ambiente)
-        cred_json = json.loads(FIREBASE_SERVICE_ACCOUNT_JSON)
-        cred = credentials.Certificate(cred_json)
-        print("INFO: Credenciais carregadas da variável de ambiente 'FIREBASE_CONFIG_JSON'.")
-    else:
-        # 2. Tenta carregar de um arquivo local (USO EM DESENVOLVIMENTO)
-        cred = credentials.Certificate('serviceAccountKey.json')
-        print("INFO: Credenciais carregadas do arquivo local 'serviceAccountKey.json'.")
-
-except FileNotFoundError:
-    print("AVISO: Arquivo 'serviceAccountKey.json' não encontrado localmente.")
-    cred = None
-except Exception as e:
-    # Este erro pode ocorrer se o JSON da variável de ambiente for mal-formado
-    print(f"ERRO ao carregar credenciais: {e}")
-    cred = None
-
-# Inicializa o Firebase apenas se as credenciais foram carregadas com sucesso
-if not firebase_admin._apps and cred:
-    firebase_admin.initialize_app(cred, {
-        'projectId': "pc-teacher-6c75f",
-@@ -54,21 +45,21 @@
-elif not firebase_admin._apps:
-    print("ERRO CRÍTICO: Firebase Admin SDK não foi inicializado. Verifique as credenciais.")
+# Credenciais, initialize_app e o cliente do Firestore ficam para o primeiro uso.
+# FIREBASE_LAZY=0 volta a inicializar tudo no import, como antes.
+if not app.config['FIREBASE_LAZY']:
+    try:
+        firebase_client.aquecer(criar_cliente=True)
+    except RuntimeError:
+        # Sem credenciais: o erro já foi impresso e se repete no primeiro uso do banco
+        pass
 
 
 # =========================================================
-# 3. HELPERS E DECORATORS (REVISADOS)
-# 1.2. CONFIGURAÇÃO ESTÁTICA DOS MÓDULOS (ATUALIZADO)
+# 1.2. CONFIGURAÇÃO ESTÁTICA DOS MÓDULOS
 # =========================================================
 
-# --- CONFIGURAÇÃO ESTÁTICA DOS MÓDULOS (Sem alterações) ---
-# Adicionado 'min_acertos_para_desbloqueio'
+# --- CONFIGURAÇÃO ESTÁTICA DOS MÓDULOS ---
+# 'slug' é a chave no documento de progresso; 'dependency_field' é o slug do módulo anterior.
 MODULO_CONFIG = [
-    # ... (Seu MODULO_CONFIG permanece o mesmo) ...
     {
         'title': '1. Introdução ao Pensamento Computacional',
-        'field': 'introducao_concluido',
         'field': 'introducao_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
         'slug': 'introducao',
-        'template': 'conteudo-introducao.html', 
+        'template': 'conteudo-introducao.html',
         'order': 1,
         'description': 'Entenda o que é o Pensamento Computacional, seus pilares e por que ele é crucial para o futuro.',
-        'lessons': 1, 'exercises': 5, 'dependency_field': None
         'lessons': 1, 'exercises': 5, 'dependency_field': None,
-        'min_acertos_para_desbloqueio': 3 # NOVO: Acertos mínimos para conclusão/desbloqueio
+        'min_acertos_para_desbloqueio': 3 # Acertos mínimos para conclusão/desbloqueio
     },
     {
         'title': '2. Decomposição',
-@@ -77,7 +68,8 @@
-        'template': 'conteudo-decomposicao.html', 
+        'field': 'decomposicao_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
+        'slug': 'decomposicao',
+        'template': 'conteudo-decomposicao.html',
         'order': 2,
         'description': 'Aprenda a quebrar problemas complexos em partes menores e gerenciáveis.',
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'introducao_concluido'
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'introducao', # Agora usa o slug
+        'lessons': 1, 'exercises': 5, 'dependency_field': 'introducao',
         'min_acertos_para_desbloqueio': 3
     },
     {
         'title': '3. Reconhecimento de Padrões',
-@@ -86,7 +78,8 @@
-        'template': 'conteudo-rec-padrao.html', 
+        'field': 'reconhecimento_padroes_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
+        'slug': 'rec-padrao',
+        'template': 'conteudo-rec-padrao.html',
         'order': 3,
         'description': 'Identifique similaridades e tendências para simplificar a resolução de problemas.',
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'decomposicao_concluido'
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'decomposicao',
-        'min_acertos_para_desbloqueio': 3
+        'lessons': 1, 'exercises': 2, 'dependency_field': 'decomposicao',
+        'min_acertos_para_desbloqueio': 2 # O módulo tem só 2 questões
     },
     {
         'title': '4. Abstração',
-@@ -95,7 +88,8 @@
-        'template': 'conteudo-abstracao.html', 
+        'field': 'abstracao_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
+        'slug': 'abstracao',
+        'template': 'conteudo-abstracao.html',
         'order': 4,
         'description': 'Foque apenas nas informações importantes, ignorando detalhes irrelevantes.',
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'reconhecimento_padroes_concluido'
         'lessons': 1, 'exercises': 5, 'dependency_field': 'rec-padrao',
         'min_acertos_para_desbloqueio': 3
     },
     {
         'title': '5. Algoritmos',
-@@ -104,7 +98,8 @@
-        'template': 'conteudo-algoritmo.html', 
+        'field': 'algoritmo_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
+        'slug': 'algoritmo',
+        'template': 'conteudo-algoritmo.html',
         'order': 5,
         'description': 'Desenvolva sequências lógicas e organizadas para resolver problemas de forma eficaz.',
-        'lessons': 1, 'exercises': 5, 'dependency_field': 'abstracao_concluido'
         'lessons': 1, 'exercises': 5, 'dependency_field': 'abstracao',
         'min_acertos_para_desbloqueio': 3
     },
     {
         'title': '6. Projeto Final',
-@@ -113,33 +108,37 @@
-        'template': 'conteudo-projeto-final.html', 
+        'field': 'projeto_final_concluido', # Mantido para compatibilidade, mas o slug é a chave principal
+        'slug': 'projeto-final',
+        'template': 'conteudo-projeto-final.html',
         'order': 6,
         'description': 'Aplique todos os pilares do PC para solucionar um desafio prático de sala de aula.',
-        'lessons': 1, 'exercises': 0, 'dependency_field': 'algoritmo_concluido'
         'lessons': 1, 'exercises': 0, 'dependency_field': 'algoritmo',
         'min_acertos_para_desbloqueio': 0 # Não tem exercícios
     },
@@ -128,6 +206,34 @@ MODULO_CONFIG = [
 
 MODULO_BY_SLUG = {m['slug']: m for m in MODULO_CONFIG}
 
+# Questões e gabarito dos exercícios (ver question_bank.py). Um arquivo inválido impede a subida.
+banco_questoes = BancoDeQuestoes.carregar(app.config['QUESTION_BANK_PATH'])
+app.jinja_env.globals['banco_questoes'] = banco_questoes
+app.logger.info(f"Banco de questões carregado: {len(banco_questoes)} questões ({app.config['QUESTION_BANK_PATH']}).")
+for _modulo in MODULO_CONFIG:
+    if 0 < len(banco_questoes.do_modulo(_modulo['slug'])) < _modulo['exercises']:
+        app.logger.warning(f"Módulo {_modulo['slug']}: {_modulo['exercises']} exercícios, mas só "
+                           f"{len(banco_questoes.do_modulo(_modulo['slug']))} questões no banco.")
+
+def progresso_inicial():
+    """Documento 'progresso' de um professor recém-cadastrado, já no formato compacto."""
+    return compactar_progresso({
+        m['slug']: {'acertos': 0, 'erros': 0, 'concluido': False} if m['exercises'] else {'concluido': False}
+        for m in MODULO_CONFIG
+    })
+
+def novo_usuario(nome, email, senha_hash, instituicao='', telefone='', cargo='Professor(a)'):
+    """Documento 'usuarios' de um professor recém-cadastrado (cadastro e provisionar-turma)."""
+    return {
+        'nome': nome,
+        'email': email,
+        'senha_hash': senha_hash,
+        'instituicao': instituicao,
+        'telefone': telefone,
+        'cargo': cargo,
+        'created_at': firestore.SERVER_TIMESTAMP
+    }
+
 
 # =========================================================
 # 2. HELPERS E DECORATORS (REVISADOS)
@@ -140,246 +246,510 @@ def get_firestore_doc(collection_name, doc_id):
     if doc.exists:
         data = doc.to_dict()
         data['id'] = doc.id # Adiciona o ID do documento ao dict
-        data['id'] = doc.id
         return data
     return None
 
-def usuario_logado():
-    """Retorna o objeto (dict) Usuario logado ou None, buscando no Firestore."""
-    if 'usuario_id' in session:
-        # Busca o usuário pelo ID armazenado na sessão
-        user_data = get_firestore_doc('usuarios', session['usuario_id'])
-
-        if user_data:
-             # Busca o progresso associado (se existir)
-            # Busca o progresso associado (se existir)
-            progresso_data = get_firestore_doc('progresso', session['usuario_id'])
-            # Anexa o progresso ao objeto do usuário para manter a compatibilidade
-            # Anexa o progresso ao objeto do usuário
-            user_data['progresso'] = progresso_data if progresso_data else {}
-            return user_data
-    return None
-@@ -154,51 +153,74 @@ def wrapper(*args, **kwargs):
+# 2.1. Instrumentação: chamadas, bytes e tempo de Firestore por requisição
+instrumentacao = Instrumentacao()
+if app.config['FIRESTORE_INSTRUMENTATION'] and app.config['STORAGE_BACKEND'] != 'sqlite':
+    db = InstrumentedFirestore(db, instrumentacao)
+
+perfilador_lento = None
+if app.config['SLOW_REQUEST_PROFILE_MS'] > 0:
+    perfilador_lento = PerfiladorLento(
+        app.config['PROFILES_DIR'],
+        limite_ms=app.config['SLOW_REQUEST_PROFILE_MS'],
+        amostragem=app.config['SLOW_REQUEST_PROFILE_SAMPLE'],
+    )
+
+@app.before_request
+def iniciar_metricas():
+    g.inicio_requisicao = time.perf_counter()
+    instrumentacao.iniciar()
+    if perfilador_lento:
+        g.perfilador = perfilador_lento.iniciar()
+
+@app.after_request
+def registrar_metricas(response):
+    """Fecha a contagem da requisição e adiciona o cabeçalho Server-Timing."""
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is None:
+        return response
+    segundos = time.perf_counter() - inicio
+    rota = request.url_rule.rule if request.url_rule else '<sem rota>'
+    finalizar_perfil(rota, segundos)
+
+    resumo = instrumentacao.finalizar(rota, request.method, response.status_code, segundos)
+    if resumo:
+        response.headers.add(
+            'Server-Timing',
+            f'firestore;dur={resumo["segundos"] * 1000:.1f};desc="{resumo["total_chamadas"]} chamadas, '
+            f'{resumo["lidos"]} B lidos, {resumo["gravados"]} B gravados"'
+        )
+    response.headers.add('Server-Timing', f'total;dur={segundos * 1000:.1f}')
+    return response
+
+def finalizar_perfil(rota, segundos):
+    """Para o perfilador da requisição, se houver, e grava o dump quando ela foi lenta."""
+    perfilador = g.pop('perfilador', None)
+    if perfilador is None:
+        return
+    caminho = perfilador_lento.finalizar(perfilador, rota, segundos)
+    if caminho:
+        print(f"AVISO: {request.method} {rota} levou {segundos * 1000:.0f} ms. Perfil em {caminho}")
+
+@app.teardown_request
+def liberar_perfilador(exc):
+    # Requisições que terminam em exceção não passam pelo after_request
+    if 'perfilador' in g:
+        rota = request.url_rule.rule if request.url_rule else '<sem rota>'
+        finalizar_perfil(rota, time.perf_counter() - g.get('inicio_requisicao', time.perf_counter()))
+
+# Todo acesso a usuários, progresso e respostas passa por 'storage' (ver storage.py)
+if app.config['STORAGE_BACKEND'] == 'sqlite':
+    storage = SQLiteStorage(app.config['SQLITE_PATH'])
+elif app.config['STORAGE_BACKEND'] == 'firestore-async':
+    # As rotas de rotas_async() leem e gravam pelo AsyncClient no event loop do asgi.py;
+    # as demais seguem no cliente síncrono
+    def criar_cliente_async():
+        cliente = firebase_client.criar_cliente_async()
+        if app.config['FIRESTORE_INSTRUMENTATION']:
+            cliente = InstrumentedAsyncFirestore(cliente, instrumentacao)
+        return cliente
+
+    storage = AsyncFirestoreStorage(
+        db, criar_cliente_async, email_fallback_legado=app.config['EMAIL_INDEX_LEGACY_FALLBACK']
+    )
+else:
+    storage = FirestoreStorage(db, email_fallback_legado=app.config['EMAIL_INDEX_LEGACY_FALLBACK'])
+
+# Cache de usuário+progresso compartilhado entre requisições do mesmo worker.
+# Rotas que escrevem em 'usuarios' ou 'progresso' devem chamar invalidar_cache_usuario().
+usuario_cache = TTLCache(
+    maxsize=app.config['USER_CACHE_MAXSIZE'],
+    ttl=app.config['USER_CACHE_TTL'],
+)
+
+def invalidar_cache_usuario(user_id):
+    """Descarta o usuário dos caches (requisição atual e processo) após uma escrita."""
+    usuario_cache.pop(str(user_id))
+    g.pop('usuario_logado', None)
+    g.pop('usuario_fresco', None)
+
+def usuario_logado(fresco=False):
+    """Retorna o objeto (dict) Usuario logado ou None, buscando no Firestore.
+       O resultado é memorizado em flask.g (por requisição) e em usuario_cache (por processo).
+       O usuario_cache de cada worker só é invalidado pelas escritas do próprio worker: com
+       fresco=True a leitura ignora o cache (uma vez por requisição). Use nas rotas que gravam
+       progresso e nas que decidem com ele (desbloqueio, conclusão, certificado, ETag)."""
+    if 'usuario_id' not in session:
+        return None
+
+    user_id = str(session['usuario_id'])
+    user_data = usuario_memorizado(user_id, fresco)
+    if user_data is not NAO_MEMORIZADO:
+        return user_data
+
+    # Busca o usuário e o progresso associado (se existir) em uma só chamada
+    return memorizar_usuario(user_id, *storage.get_usuario_e_progresso(user_id))
+
+async def usuario_logado_async(fresco=False):
+    """usuario_logado nas rotas async (asgi.py): mesma memória, leitura pelo AsyncClient."""
+    if 'usuario_id' not in session:
+        return None
+
+    user_id = str(session['usuario_id'])
+    user_data = usuario_memorizado(user_id, fresco)
+    if user_data is not NAO_MEMORIZADO:
+        return user_data
+
+    return memorizar_usuario(user_id, *await storage.get_usuario_e_progresso_async(user_id))
+
+NAO_MEMORIZADO = object()
+
+def usuario_memorizado(user_id, fresco=False):
+    """Usuário já em memória para esta requisição, ou NAO_MEMORIZADO."""
+    # 1. Memo da requisição: rotas e decorators podem chamar várias vezes
+    if 'usuario_logado' in g and (not fresco or g.get('usuario_fresco')):
+        return g.usuario_logado
+
+    # 2. Cache do processo (TTL curto), só para o que é exibição
+    user_data = None if fresco else usuario_cache.get(user_id)
+    if user_data is None:
+        return NAO_MEMORIZADO
+    g.usuario_logado = user_data
+    return user_data
+
+def memorizar_usuario(user_id, user_data, progresso_data):
+    """Guarda o usuário recém-lido (com o progresso anexado) em g e no usuario_cache."""
+    if user_data:
+        # Anexa o progresso ao objeto do usuário
+        user_data['progresso'] = progresso_data if progresso_data else {}
+        usuario_cache.set(user_id, user_data)
+    g.usuario_fresco = True
+    g.usuario_logado = user_data
+    return user_data
+
+# 2.1.1. Páginas de conteúdo: usuário, progresso e respostas em uma só leitura em lote,
+# antes do requires_auth e da view
+def slugs_com_resposta(modulo_slug):
+    """Módulos cujas respostas de projeto a página do módulo exibe."""
+    if modulo_slug == 'projeto-final':
+        return [mod['slug'] for mod in MODULO_CONFIG if mod['slug'] != 'projeto-final']
+    return [modulo_slug]
+
+# Marca, no environ, das requisições que asgi.py atende pelas rotas de rotas_async()
+ROTA_ASYNC = 'pcteacher.rota_async'
+
+@app.before_request
+def pre_carregar_pagina():
+    if not isinstance(storage, FirestoreStorage) or 'usuario_id' not in session:
+        return
+    if request.environ.get(ROTA_ASYNC):
+        # Atendida por conteudo_dinamico_async, que faz esta leitura pelo AsyncClient
+        return
+    modulo_slug = (request.view_args or {}).get('modulo_slug')
+    if request.endpoint != 'conteudo_dinamico' or modulo_slug not in MODULO_BY_SLUG:
+        return
+
+    user_id = str(session['usuario_id'])
+    # Usuário e progresso entram sempre no lote (a mesma chamada): o desbloqueio decide com
+    # o progresso atual, não com o usuario_cache, que pode estar atrasado em relação a outro worker
+    usuario, progresso, respostas = storage.carregar_pagina(
+        user_id, slugs_com_resposta(modulo_slug), portfolio=modulo_slug == 'projeto-final'
+    )
+    if usuario:
+        usuario['progresso'] = progresso if progresso else {}
+        usuario_cache.set(user_id, usuario)
+        g.usuario_logado = usuario
+        g.usuario_fresco = True
+    g.respostas_pagina = respostas
+
+def respostas_da_pagina(user_id, slugs, portfolio=False):
+    """Respostas já lidas por pre_carregar_pagina ou, se não houver, uma leitura nova
+       (do portfólio do usuário, na página do projeto final)."""
+    respostas = g.pop('respostas_pagina', None)
+    if respostas is not None:
+        return respostas
+    return storage.get_portfolio(user_id, slugs) if portfolio else storage.get_respostas(user_id, slugs)
+
+def requires_auth(func):
+    """Redireciona para o login quando não há usuário na sessão."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if usuario_logado() is None:
+            flash('Você precisa estar logado para acessar esta página.', 'warning')
+            return redirect(url_for('login'))
         return func(*args, **kwargs)
     return wrapper
 
-# 2.2. calculate_progress (ATUALIZADO PARA USAR DICIONÁRIO E LÓGICA DE ACERTOS)
+# 2.2. calculate_progress (PRÉ-COMPILADO E MEMORIZADO, ver progress.py)
+progress_engine = ProgressEngine(MODULO_CONFIG)
+
 def calculate_progress(progresso_db):
     """Calcula todas as métricas de progresso do curso.
-       progresso_db agora é um dicionário (dict) do Firestore."""
-        progresso_db é o dicionário completo do documento 'progresso' do Firestore."""
-
-    total_modules = len(MODULO_CONFIG)
-    completed_modules = 0
-    total_lessons = sum(m['lessons'] for m in MODULO_CONFIG)
-    total_exercises = sum(m['exercises'] for m in MODULO_CONFIG)
-    
-    completed_lessons = 0
-    completed_exercises = 0
-    completed_exercises = 0 
-    total_acertos = 0 
-    total_erros = 0 
-
-    dynamic_modules = []
-
-    # Rastreia o progresso para a lógica de desbloqueio
-    last_module_was_completed = True 
-
-    for module_config in MODULO_CONFIG:
-        db_field = module_config['field']
-        slug = module_config['slug']
-
-        # MUDANÇA: Acessa o status de conclusão como uma chave de dicionário
-        is_completed = progresso_db.get(db_field, False) 
-        # Pega os dados do módulo ou inicializa se não existir
-        module_progress = progresso_db.get(slug, {'acertos': 0, 'erros': 0, 'concluido': False})
-
-        # Lógica de Desbloqueio (BASEADA NA DEPENDÊNCIA explícita)
-        dependency_field = module_config.get('dependency_field')
-        # 1. Status de Conclusão e Contadores
-        is_completed = module_progress.get('concluido', False)
-        acertos = module_progress.get('acertos', 0)
-        erros = module_progress.get('erros', 0)
-
-        if dependency_field is None:
-            is_unlocked_for_current_module = True
-        module_exercises_done = acertos + erros
-        
-        # 2. Lógica de Desbloqueio
-        # Um módulo está desbloqueado se:
-        # a) É o primeiro módulo OU
-        # b) O módulo anterior foi COMPLETADO (is_completed)
-        if module_config['order'] == 1:
-             is_unlocked = True
-        else:
-            # MUDANÇA: Acessa o status da dependência como chave de dicionário
-            dependency_is_completed = progresso_db.get(dependency_field, False)
-            is_unlocked_for_current_module = dependency_is_completed 
-
-        # Contadores
-             is_unlocked = last_module_was_completed
-             
-        # 3. Atualiza os Contadores GLOBAIS
-        total_acertos += acertos
-        total_erros += erros
-        
-        if is_completed:
-            completed_modules += 1
-            completed_lessons += module_config['lessons']
-            completed_exercises += module_config['exercises']
-
-            completed_exercises += module_config['exercises'] 
-        
-        # 4. Prepara dados para o template e atualiza o rastreador
-        dynamic_modules.append({
-            'title': module_config['title'],
-            'description': module_config['description'],
-            'slug': module_config['slug'],
-            'slug': slug,
-            'order': module_config['order'],
-            'is_unlocked': is_unlocked_for_current_module,
-            'is_unlocked': is_unlocked,
-            'is_completed': is_completed,
-            'lessons': module_config['lessons'],
-            'exercises': module_config['exercises'],
-            'min_acertos': module_config['min_acertos_para_desbloqueio'], # NOVO
-            'acertos': acertos, 
-            'erros': erros, 
-            'exercises_done': module_exercises_done, 
-        })
-        
-        last_module_was_completed = is_completed # Prepara para o próximo loop
-
-    overall_progress_percent = int((completed_modules / total_modules) * 100) if total_modules > 0 else 0
-
-@@ -208,13 +230,30 @@ def calculate_progress(progresso_db):
-        'total_modules': total_modules,
-        'completed_lessons': completed_lessons,
-        'total_lessons': total_lessons,
-        'completed_exercises': completed_exercises,
-        'total_acertos': total_acertos,
-        'total_erros': total_erros,
-        'completed_exercises': completed_exercises, 
-        'total_exercises': total_exercises,
-        'modules': dynamic_modules 
-    }
+        progresso_db é o dicionário completo do documento 'progresso' do Firestore.
+        O resultado é compartilhado entre chamadas com o mesmo estado: não modifique."""
+    return progress_engine.calculate(progresso_db)
 
-# 2.3. Função de Simulação de Correção (NOVO)
-def check_answer(modulo_slug, user_answer):
+# 2.3. Correção dos exercícios (BANCO DE QUESTÕES, ver question_bank.py)
+def check_answer(modulo_slug, user_answer, questao_id=None):
     """
-    Função de simulação de correção do exercício.
-    Em um ambiente real, esta lógica seria complexa (e.g., verificar código, etc.).
-    Aqui, simulamos com uma palavra-chave.
+    Corrige a resposta de um exercício pelo gabarito do banco de questões.
+    Em módulos com questões no banco, `questao_id` precisa ser uma questão do módulo
+    e a resposta uma das opções (letra, número ou texto); qualquer outra coisa é erro.
+    Só módulos sem nenhuma questão no banco mantêm a correção simulada por
+    palavra-chave ("certo"/"correto").
     """
-    # Módulos 1-5 (introducao, decomposicao, rec-padrao, abstracao, algoritmo)
-    if "certo" in user_answer.lower() or "correto" in user_answer.lower():
-         return True
-    
-    # Se não for uma palavra-chave de acerto, simula um erro.
-    return False 
+    if not banco_questoes.do_modulo(modulo_slug):
+        return "certo" in user_answer.lower() or "correto" in user_answer.lower()
+
+    questao = banco_questoes.questao(questao_id) if questao_id else None
+    if questao is None or questao['modulo'] != modulo_slug:
+        return False
+    return banco_questoes.corrigir(questao_id, user_answer) is True
+
+def feedback_resposta(modulo_slug, user_answer, questao_id):
+    """Feedback da opção escolhida, do banco de questões (None fora do banco ou se não for uma opção)."""
+    questao = banco_questoes.questao(questao_id) if questao_id else None
+    if questao is None or questao['modulo'] != modulo_slug:
+        return None
+    opcao = banco_questoes.opcao_escolhida(questao_id, user_answer)
+    return opcao.get('feedback') if opcao else None
+
+def mensagem_submissao(modulo_config, is_correct, acertos, is_module_completed):
+    """Mensagem de feedback de uma submissão de exercício."""
+    min_acertos = modulo_config.get('min_acertos_para_desbloqueio', 3)
+    if is_module_completed:
+        return f'Parabéns! Você atingiu {min_acertos} acertos e concluiu o módulo "{modulo_config["title"]}". O próximo módulo foi desbloqueado.'
+    if is_correct:
+        return f'Resposta correta! Faltam apenas {min_acertos - acertos} acertos para concluir o módulo.'
+    return f'Resposta incorreta. Você tem {acertos} acerto(s) até agora. Mínimo: {min_acertos}.'
+
+def validar_submissao(modulo_config):
+    """Resposta de erro de uma submissão de exercício, ou None se ela pode ser corrigida."""
+    if not modulo_config or modulo_config['exercises'] == 0:
+        return jsonify({'success': False, 'message': 'Módulo não encontrado ou sem exercícios.'}), 404
+    if not request.is_json:
+        return jsonify({'success': False, 'message': 'Requisição deve ser JSON.'}), 400
+    return None
+
+def corrigir_submissao(modulo_slug):
+    """(is_correct, feedback) da resposta no corpo JSON da submissão."""
+    dados = request.get_json()
+    user_answer = dados.get('resposta', '').strip()
+    # Questão respondida (id do banco, ex.: 'introducao-2'); obrigatória nos módulos com questões no banco
+    questao_id = dados.get('questao_id')
+    return check_answer(modulo_slug, user_answer, questao_id), feedback_resposta(modulo_slug, user_answer, questao_id)
+
+def json_ja_concluido(is_correct, feedback, acertos, erros):
+    return jsonify({'success': True, 'message': 'Módulo já concluído!', 'is_correct': is_correct, 'feedback': feedback, 'is_module_completed': True, 'new_acertos': acertos, 'new_erros': erros})
+
+def json_submissao(modulo_config, is_correct, feedback, acertos, erros, is_module_completed):
+    """Resposta de uma submissão contada; acertos e erros já incluem esta."""
+    return jsonify({
+        'success': True,
+        'message': mensagem_submissao(modulo_config, is_correct, acertos, is_module_completed),
+        'is_correct': is_correct,
+        'feedback': feedback,
+        'new_acertos': acertos,
+        'new_erros': erros,
+        'is_module_completed': is_module_completed,
+        'min_acertos': modulo_config.get('min_acertos_para_desbloqueio', 3)
+    })
+
+# 2.4. Write-behind das submissões de exercícios (opcional)
+progress_write_buffer = None
+if app.config['SUBMISSION_WRITE_BEHIND_WINDOW'] > 0:
+    progress_write_buffer = ProgressWriteBuffer(
+        storage.incrementar_lote, window=app.config['SUBMISSION_WRITE_BEHIND_WINDOW']
+    ).start()
+
+# 2.5. Modo transacional das submissões (contadores reais, sem simulação; só Firestore)
+submissao_transacional = None
+if app.config['SUBMISSION_MODE'] == 'transaction':
+    if isinstance(storage, FirestoreStorage):
+        submissao_transacional = TransactionalSubmitter(db, max_attempts=app.config['SUBMISSION_TX_MAX_ATTEMPTS'])
+    else:
+        app.logger.warning("SUBMISSION_MODE=transaction só vale com STORAGE_BACKEND=firestore; "
+                           "usando incrementos simples no backend '%s'.", app.config['STORAGE_BACKEND'])
+
+# 2.6. Índice de e-mails (emails/{email_normalizado} -> usuario_id no Firestore,
+# coluna indexada no SQLite). Substitui a query where('email', '==', ...) por um
+# get pontual, com LRU local. Só guardamos acertos no LRU: um "não existe" em
+# cache poderia liberar e-mail duplicado.
+email_uid_cache = TTLCache(maxsize=4096, ttl=300)
+
+def buscar_uid_por_email(email):
+    """Retorna o UID dono do e-mail ou None."""
+    chave = normalizar_email(email)
+    if not chave:
+        return None
+
+    user_id = email_uid_cache.get(chave)
+    if user_id:
+        return user_id
+
+    user_id = storage.buscar_uid_por_email(email)
+    if user_id:
+        email_uid_cache.set(chave, user_id)
+    return user_id
+
+def buscar_usuario_por_email(email):
+    """Retorna o dict do usuário dono do e-mail (via índice) ou None."""
+    user_id = buscar_uid_por_email(email)
+    if not user_id:
+        return None
+    usuario_data = storage.get_usuario(user_id)
+    if not usuario_data or normalizar_email(usuario_data.get('email')) != normalizar_email(email):
+        # Entrada do LRU desatualizada (e-mail trocado em outro worker)
+        email_uid_cache.pop(normalizar_email(email))
+        return None
+    return usuario_data
+
+def atualizar_cache_email(user_id, email_novo, email_antigo=None):
+    """Mantém o LRU de e-mails em sincronia depois que o storage gravou a troca."""
+    if email_antigo:
+        email_uid_cache.pop(normalizar_email(email_antigo))
+    email_uid_cache.set(normalizar_email(email_novo), user_id)
+
+# 2.7. Estatísticas agregadas do curso (contadores com shards, ver course_stats.py; só Firestore)
+# As submissões só somam os incrementos em um buffer do processo (o mesmo ProgressWriteBuffer do
+# write-behind); a thread do buffer grava o total acumulado em um shard a cada COURSE_STATS_FLUSH_WINDOW.
+estatisticas_curso = None
+buffer_estatisticas = None
+if app.config['COURSE_STATS'] and isinstance(storage, FirestoreStorage):
+    estatisticas_curso = EstatisticasCurso(db, MODULO_CONFIG, shards=app.config['COURSE_STATS_SHARDS'])
+
+    def gravar_estatisticas(lote):
+        estatisticas_curso.registrar(lote['curso'])
+        lote.pop('curso')
+
+    buffer_estatisticas = ProgressWriteBuffer(
+        gravar_estatisticas, window=app.config['COURSE_STATS_FLUSH_WINDOW']
+    ).start()
+
+def registrar_estatisticas(modulo_slug, acertos_antes, erros_antes, acertos=0, erros=0, concluiu=False):
+    """Soma os incrementos agregados da submissão no buffer; nada é gravado na requisição."""
+    if buffer_estatisticas is None:
+        return
+    buffer_estatisticas.somar(
+        'curso', EstatisticasCurso.delta_submissao(modulo_slug, acertos_antes, erros_antes, acertos, erros, concluiu)
+    )
+
+def gravar_progresso(user_id, modulo_slug, incrementos, valores, acertos_antes, erros_antes, concluiu):
+    """storage.atualizar_progresso de uma submissão. Devolve o módulo como estava logo antes da
+       escrita quando as estatísticas dependem dele (primeira submissão do módulo, que conta em
+       'iniciados', ou conclusão): a leitura do começo da requisição pode não valer mais se outra
+       submissão do mesmo usuário gravou no meio. Nos demais casos grava sem ler e devolve None."""
+    if precisa_do_anterior(acertos_antes, erros_antes, concluiu):
+        return storage.atualizar_progresso_com_anterior(user_id, modulo_slug, incrementos, valores)
+    storage.atualizar_progresso(user_id, incrementos, valores)
+    return None
+
+async def gravar_progresso_async(user_id, modulo_slug, incrementos, valores, acertos_antes, erros_antes, concluiu):
+    """gravar_progresso pelo AsyncClient (rotas async de asgi.py)."""
+    if precisa_do_anterior(acertos_antes, erros_antes, concluiu):
+        return await storage.atualizar_progresso_com_anterior_async(user_id, modulo_slug, incrementos, valores)
+    await storage.atualizar_progresso_async(user_id, incrementos, valores)
+    return None
+
+def precisa_do_anterior(acertos_antes, erros_antes, concluiu):
+    return buffer_estatisticas is not None and (acertos_antes + erros_antes == 0 or concluiu)
+
+# 2.8. Senhas: hash fora da thread da requisição e limite de tentativas
+# (ver password_pool.py e throttle.py)
+senhas = PasswordPool(
+    workers=app.config['PASSWORD_POOL_WORKERS'],
+    fila=app.config['PASSWORD_POOL_QUEUE'],
+    timeout=app.config['PASSWORD_POOL_TIMEOUT'],
+)
+limite_ip = TokenBucketLimiter(app.config['LOGIN_THROTTLE_IP_BURST'], app.config['LOGIN_THROTTLE_IP_RATE'])
+limite_email = TokenBucketLimiter(app.config['LOGIN_THROTTLE_EMAIL_BURST'], app.config['LOGIN_THROTTLE_EMAIL_RATE'])
+
+def ip_cliente():
+    return request.access_route[-1] if app.config['BEHIND_PROXY'] else request.remote_addr
+
+def tentativa_permitida(email):
+    """Gasta uma ficha do IP e uma do e-mail. False: barrar antes de qualquer hash de senha."""
+    return (limite_ip.permitir(f'ip:{ip_cliente()}')
+            and limite_email.permitir(f'email:{normalizar_email(email)}'))
+
+@app.errorhandler(PoolDeSenhasOcupado)
+def pool_de_senhas_ocupado(e):
+    return 'Servidor ocupado. Tente novamente em alguns segundos.', 503, {'Retry-After': '5'}
+
+# 2.9. Páginas públicas: HTML pronto para visitantes anônimos (ver page_cache.py).
+# A chave inclui a versão dos templates e do manifest dos estáticos: um deploy invalida tudo.
+PAGINAS_PUBLICAS = ['index', 'dashboard', 'infor_curso_decomposicao', 'infor_curso_rec_padrao',
+                    'infor_curso_abstracao', 'infor_curso_algoritmo']
+cache_paginas = CachePaginas(
+    versao_templates(os.path.join(app.root_path, app.template_folder), asset_pipeline.manifest),
+    maxsize=app.config['PAGE_CACHE_MAXSIZE'],
+    ttl=app.config['PAGE_CACHE_TTL'],
+    pasta=app.config['PAGE_CACHE_DIR'] or None,
+    max_age=app.config['PAGE_CACHE_MAX_AGE'],
+)
+cache_paginas.init_app(app, PAGINAS_PUBLICAS)
+
+def requires_admin(func):
+    """Como requires_auth, mas só para os e-mails de ADMIN_EMAILS."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        usuario = usuario_logado()
+        if usuario is None:
+            flash('Você precisa estar logado para acessar esta página.', 'warning')
+            return redirect(url_for('login'))
+        if normalizar_email(usuario.get('email')) not in app.config['ADMIN_EMAILS']:
+            abort(403)
+        return func(*args, **kwargs)
+    return wrapper
 
 
 # =========================================================
-# 4. ROTAS DE AUTENTICAÇÃO (REVISADAS)
-# 3. ROTAS DE AUTENTICAÇÃO (AJUSTE NO CADASTRO)
+# 3. ROTAS DE AUTENTICAÇÃO
 # =========================================================
 
 @app.route('/cadastro', methods=['GET', 'POST'])
-@@ -228,52 +267,45 @@ def cadastro():
+def cadastro():
+    usuario = usuario_logado()
+    if usuario:
+        return redirect(url_for('dashboard'))
+
+    if request.method == 'POST':
+        nome = request.form.get('nome')
         email = request.form.get('email')
         senha = request.form.get('senha')
 
-        # 1. Verifica se o e-mail já existe (Firestore Query)
-        email_exists_query = db.collection('usuarios').where('email', '==', email).limit(1).stream()
-        email_exists = next(email_exists_query, None)
+        if not tentativa_permitida(email):
+            flash('Muitas tentativas seguidas. Aguarde alguns instantes e tente novamente.', 'danger')
+            return render_template('cadastro.html', nome_for_form=nome, email_for_form=email), 429
+
+        # 1. Verifica se o e-mail já existe (índice 'emails')
+        email_exists = buscar_uid_por_email(email)
 
         if email_exists:
             flash('Este e-mail já está cadastrado. Tente fazer o login.', 'danger')
             return render_template('cadastro.html', nome_for_form=nome, email_for_form=email)
 
-        # 2. Cria novo usuário no Firebase Authentication (Recomendado) e Firestore
+        # 2. Cria novo usuário no Firebase Authentication e no storage
         try:
-            # 2.1 Criar no Firebase Authentication (para login seguro)
-            # Isso gera um UID (ID do usuário) único
+            # Hash antes de criar a conta: se o pool de senhas estiver ocupado, nada fica pela metade
+            senha_hash = senhas.gerar_hash(senha)
+
             # 2.1 Criar no Firebase Authentication
-            user_auth = auth.create_user(email=email, password=senha, display_name=nome)
-            user_id = user_auth.uid
-
-            # 2.2 Salvar dados no Firestore (Coleção 'usuarios')
-            novo_usuario_data = {
-                'nome': nome,
-                'email': email,
-                'senha_hash': generate_password_hash(senha), # Mantém o hash da senha por compatibilidade, mas o Auth do Firebase deve ser a fonte de verdade
-                'senha_hash': generate_password_hash(senha),
-                'instituicao': '',
-                'telefone': '',
-                'cargo': 'Professor(a)',
-                'created_at': firestore.SERVER_TIMESTAMP # Para registro de criação
-                'created_at': firestore.SERVER_TIMESTAMP
-            }
-            # Usa o UID do Auth como ID do documento no Firestore
-            db.collection('usuarios').document(user_id).set(novo_usuario_data)
-
-            # 2.3 Cria um registro de progresso (Coleção 'progresso')
-            # O progresso é um documento separado, usando o mesmo UID
-            # 2.3 Cria um registro de progresso (Coleção 'progresso') (ATUALIZADO)
-            novo_progresso_data = {
-                'introducao_concluido': False,
-                'decomposicao_concluido': False,
-                'reconhecimento_padroes_concluido': False,
-                'abstracao_concluido': False,
-                'algoritmo_concluido': False,
-                'projeto_final_concluido': False,
-                'introducao': {'acertos': 0, 'erros': 0, 'concluido': False},
-                'decomposicao': {'acertos': 0, 'erros': 0, 'concluido': False},
-                'rec-padrao': {'acertos': 0, 'erros': 0, 'concluido': False},
-                'abstracao': {'acertos': 0, 'erros': 0, 'concluido': False},
-                'algoritmo': {'acertos': 0, 'erros': 0, 'concluido': False},
-                'projeto-final': {'concluido': False}, # Projeto Final não tem acertos/erros
-            }
-            db.collection('progresso').document(user_id).set(novo_progresso_data)
+            if isinstance(storage, FirestoreStorage):
+                user_auth = auth.create_user(email=email, password=senha, display_name=nome)
+                user_id = user_auth.uid
+            else:
+                # Instalação local (SQLite): sem Firebase Auth, o login usa só o senha_hash
+                user_id = uuid.uuid4().hex
+
+            # 2.2 Documentos do usuário e do progresso (derivado de MODULO_CONFIG)
+            novo_usuario_data = novo_usuario(nome, email, senha_hash)
+            novo_progresso_data = progresso_inicial()
+
+            # 2.3 Grava usuário, progresso e índice de e-mail em um único lote (o UID do Auth é o ID dos documentos)
+            storage.criar_usuario(user_id, novo_usuario_data, novo_progresso_data)
+            atualizar_cache_email(user_id, email)
 
             flash('Cadastro realizado com sucesso! Faça login para começar.', 'success')
             return redirect(url_for('login'))
 
         except Exception as e:
-            # Em caso de falha de criação, tente limpar o registro
             # Nota: O Firebase Auth lida com a maior parte da transação de forma atômica
             flash(f'Erro interno ao cadastrar: {str(e)}', 'danger')
 
     return render_template('cadastro.html', user=usuario)
-@@ -288,24 +320,15 @@ def login():
+
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    usuario = usuario_logado()
+    if usuario:
+        return redirect(url_for('dashboard'))
+
+    if request.method == 'POST':
         email = request.form.get('email')
         senha = request.form.get('senha')
 
-        # MUDANÇA: O Auth do Firebase é usado para validar a senha, mas
-        # para projetos Flask/Admin SDK, é mais simples buscar no Firestore
-        # e usar o werkzeug.security se você não estiver usando o Firebase
-        # Client SDK para login. 
-        
-        # 1. Busca o usuário pelo e-mail
-        user_query = db.collection('usuarios').where('email', '==', email).limit(1).stream()
-        usuario_doc = next(user_query, None)
-
-        if usuario_doc:
-            usuario_data = usuario_doc.to_dict()
-            usuario_data['id'] = usuario_doc.id # O ID é o UID/Doc ID
-            usuario_data['id'] = usuario_doc.id
-
-            # 2. Verifica a senha (usando o hash armazenado por compatibilidade)
-            # IDEALMENTE: Você usaria o Firebase Client SDK aqui para fazer o login
-            # e obter o Token de autenticação.
-            if 'senha_hash' in usuario_data and check_password_hash(usuario_data['senha_hash'], senha):
-                session['usuario_id'] = usuario_data['id'] # Salva o ID (UID) no Flask Session
-                session['usuario_id'] = usuario_data['id']
-                flash(f'Bem-vindo(a), {usuario_data["nome"]}!', 'success')
-                return redirect(url_for('dashboard'))
-
-@@ -314,14 +337,13 @@ def login():
+        if not tentativa_permitida(email):
+            flash('Muitas tentativas de login. Aguarde alguns instantes e tente novamente.', 'danger')
+            return render_template('login.html', user=usuario), 429
+
+        # 1. Busca o usuário pelo e-mail (índice 'emails' + LRU local)
+        usuario_data = buscar_usuario_por_email(email)
+
+        # 2. Verifica a senha pelo hash armazenado no storage
+        if usuario_data and 'senha_hash' in usuario_data and senhas.verificar(usuario_data['senha_hash'], senha):
+            session['usuario_id'] = usuario_data['id']
+            flash(f'Bem-vindo(a), {usuario_data["nome"]}!', 'success')
+            return redirect(url_for('dashboard'))
+
+        flash('E-mail ou senha incorretos.', 'danger')
 
     return render_template('login.html', user=usuario)
 
-# A rota /logout permanece a mesma, pois só usa o Flask session
 @app.route('/logout')
 def logout():
     """Remove o ID da sessão e redireciona para a página inicial."""
@@ -389,111 +759,57 @@ def logout():
 
 
 # =========================================================
-# 4.1 INFORMAÇÃO
+# 3.1 INFORMAÇÃO
 # =========================================================
-@@ -347,14 +369,10 @@ def infor_curso_algoritmo():
-    return render_template('infor-curso-algoritmo.html', user=usuario)
 
+@app.route('/infor-curso-decomposicao')
+def infor_curso_decomposicao():
+    usuario = usuario_logado()
+    return render_template('infor-curso-decomposicao.html', user=usuario)
+
+@app.route('/infor-curso-rec-padrao')
+def infor_curso_rec_padrao():
+    usuario = usuario_logado()
+    return render_template('infor-curso-rec-padrao.html', user=usuario)
+
+@app.route('/infor-curso-abstracao')
+def infor_curso_abstracao():
+    usuario = usuario_logado()
+    return render_template('infor-curso-abstracao.html', user=usuario)
+
+@app.route('/infor-curso-algoritmo')
+def infor_curso_algoritmo():
+    usuario = usuario_logado()
+    return render_template('infor-curso-algoritmo.html', user=usuario)
 
 
 # =========================================================
-# 5. ROTAS DE ÁREA RESTRITA E PERFIL (REVISADAS)
-# 4. ROTAS DE CONTEÚDO E PROGRESSO (MAIS ALTERAÇÕES)
+# 4. ROTAS DE CONTEÚDO E PROGRESSO
 # =========================================================
 
-# As rotas 'index', 'dashboard' e 'progresso' permanecem iguais em sua lógica de renderização,
-# pois usam a função 'usuario_logado' e 'calculate_progress' que foram atualizadas.
-
 @app.route('/')
 def index():
     usuario = usuario_logado()
-@@ -366,84 +384,10 @@ def dashboard():
-    usuario = usuario_logado()
-    return render_template('dashboard.html', user=usuario)
+    return render_template('index.html', user=usuario)
 
-
-@app.route('/perfil', methods=['GET', 'POST']) 
-@requires_auth
-def perfil():
+@app.route('/dashboard')
+def dashboard():
     usuario = usuario_logado()
-    
-    if request.method == 'POST':
-        user_id = usuario['id'] # Obtém o ID/UID do usuário logado
-        
-        name = request.form.get('name')
-        email = request.form.get('email')
-        phone = request.form.get('phone')
-        institution = request.form.get('institution')
-        new_password = request.form.get('new_password')
-        confirm_password = request.form.get('confirm_password')
-        
-        tem_erro = False
-        
-        try:
-            # 1. Dicionário para atualização no Firestore
-            update_data = {}
-            
-            # 2. Checa e atualiza E-mail
-            if email != usuario['email']:
-                # Verifica se o novo e-mail já existe para outro usuário (Firestore Query)
-                email_existente_query = db.collection('usuarios').where('email', '==', email).limit(1).stream()
-                email_existente = next(email_existente_query, None)
-                
-                # Garante que, se o e-mail existir, não é o documento do usuário atual
-                if email_existente and email_existente.id != user_id:
-                    flash("Este novo e-mail já está em uso por outro usuário.", 'danger')
-                    tem_erro = True
-                else:
-                    update_data['email'] = email
-                    
-            # 3. Processa a mudança de senha
-            if new_password:
-                if new_password != confirm_password:
-                    flash("As novas senhas digitadas não coincidem.", 'danger')
-                    tem_erro = True
-                elif len(new_password) < 6:
-                    flash("A nova senha deve ter no mínimo 6 caracteres.", 'danger')
-                    tem_erro = True
-                else:
-                    # MUDANÇA: Atualiza no Firebase Authentication E no Firestore (para o hash)
-                    auth.update_user(user_id, password=new_password)
-                    update_data['senha_hash'] = generate_password_hash(new_password)
-                    flash("Senha atualizada com sucesso!", 'success')
-
-            # 4. Atualiza dados básicos
-            update_data['nome'] = name
-            update_data['telefone'] = phone
-            update_data['instituicao'] = institution
-            
-            if not tem_erro and update_data:
-                # 5. Commit no Firestore
-                db.collection('usuarios').document(user_id).update(update_data)
-                
-                # Se não atualizou a senha, exibe sucesso nos dados
-                if not new_password:
-                    flash("Dados do perfil atualizados com sucesso!", 'success')
-            
-            # Redireciona para recarregar o usuário atualizado
-            return redirect(url_for('perfil'))
-                
-        except Exception as e:
-            flash(f"Ocorreu um erro inesperado ao salvar: {str(e)}", 'danger')
-            # Retorna o template para não perder os dados do formulário
-            return render_template('perfil.html', user=usuario) 
-
-    # Lógica GET: A função usuario_logado já retorna o usuário atualizado
-    return render_template('perfil.html', user=usuario)
+    return render_template('dashboard.html', user=usuario)
 
 @app.route('/progresso')
 @requires_auth
 def progresso():
     usuario = usuario_logado()
-    # MUDANÇA: progresso_db agora é um dicionário contido dentro do objeto usuario
-    progresso_db = usuario.get('progresso', {}) 
+    progresso_db = usuario.get('progresso', {})
 
-    progresso_data = calculate_progress(progresso_db) 
-@@ -456,106 +400,194 @@ def progresso():
+    progresso_data = calculate_progress(progresso_db)
 
+    context = {
+        'user': usuario,
+        'title': "Meu Progresso",
+        'progresso_data': progresso_data
+    }
     return render_template('progresso.html', **context)
 
 @app.route('/modulos')
@@ -501,428 +817,535 @@ def progresso():
 def modulos():
     usuario = usuario_logado()
     progresso = usuario.get('progresso', {})
-    
+
     progresso_data = calculate_progress(progresso)
-    modulos_list = progresso_data.get('modules', []) 
+    modulos_list = progresso_data.get('modules', [])
 
-# =========================================================
-# 6. ROTAS DE CERTIFICADO (REVISADAS)
-# =========================================================
-# O cálculo do progresso já foi adaptado, estas rotas só precisam garantir
-# que pegam o progresso como dicionário.
     return render_template('modulos.html', user=usuario, modulos=modulos_list, progresso_data=progresso_data)
 
-@app.route('/certificado')
-
 @app.route('/conteudo/<string:modulo_slug>')
 @requires_auth
-def certificado():
 def conteudo_dinamico(modulo_slug):
-    usuario = usuario_logado()
-    progresso_db = usuario.get('progresso', {})
+    # Leitura nova: o desbloqueio não pode depender do cache (no Firestore já veio no pre_carregar_pagina)
+    usuario = usuario_logado(fresco=True)
     user_id = usuario['id']
     progresso = usuario.get('progresso', {})
 
-    progresso_data = calculate_progress(progresso_db)
     modulo_config = MODULO_BY_SLUG.get(modulo_slug)
 
     if not modulo_config:
         flash('Módulo de conteúdo não encontrado.', 'danger')
         return redirect(url_for('modulos'))
 
-    certificado_disponivel = progresso_data['overall_percent'] == 100
-    data_emissao = datetime.now().strftime('%d/%m/%Y')
     # 2. Verifica a dependência (lógica de desbloqueio)
     dependency_slug = modulo_config.get('dependency_field')
     if dependency_slug:
-         # Verifica se o módulo de dependência está concluído (o campo 'concluido' é True)
-         is_dependency_met = progresso.get(dependency_slug, {}).get('concluido', False)
-         if not is_dependency_met:
-             flash(f'Você deve completar o módulo anterior primeiro para acessar este.', 'warning')
-             return redirect(url_for('modulos'))
-        
+        # Verifica se o módulo de dependência está concluído (o campo 'concluido' é True)
+        is_dependency_met = progresso.get(dependency_slug, {}).get('concluido', False)
+        if not is_dependency_met:
+            flash(f'Você deve completar o módulo anterior primeiro para acessar este.', 'warning')
+            return redirect(url_for('modulos'))
+
     # Lógica de contexto extra para o template (mantida a lógica de Projeto Final)
     extra_context = {}
 
-    context = {
-        'user': usuario,
-        'title': "Certificado",
-        'certificado_disponivel': certificado_disponivel,
-        'nome_usuario': usuario['nome'], 
-        'data_emissao': data_emissao
-    }
-    return render_template('certificado.html', **context)
     if modulo_slug == 'projeto-final':
-        respostas_projeto_modulos = {}
-        respostas_query = db.collection('respostas_projeto').where('usuario_id', '==', user_id).stream()
-        
-        for r_doc in respostas_query:
-            r = r_doc.to_dict()
-            respostas_projeto_modulos[r['modulo_slug']] = r['conteudo_resposta']
-            
+        # Lê as respostas de todos os módulos em lote
+        slugs_com_projeto = [mod['slug'] for mod in MODULO_CONFIG if mod['slug'] != 'projeto-final']
+        respostas_projeto_modulos = respostas_da_pagina(user_id, slugs_com_projeto, portfolio=True)
+
         respostas_projeto_ordenadas = []
         for mod in MODULO_CONFIG:
-            if mod['slug'] != 'projeto-final': 
+            if mod['slug'] != 'projeto-final':
                 respostas_projeto_ordenadas.append({
                     'title': mod['title'],
                     'slug': mod['slug'],
                     'resposta': respostas_projeto_modulos.get(mod['slug'], 'Nenhuma resposta salva.'),
                     'is_saved': mod['slug'] in respostas_projeto_modulos
                 })
-        
+
         extra_context = {'respostas_projeto': respostas_projeto_ordenadas}
     else:
         # Para outros módulos (1 a 5), checa se já existe uma resposta salva para preencher o campo
-        doc_id = f"{user_id}_{modulo_slug}"
-        resposta_pre_salva = get_firestore_doc('respostas_projeto', doc_id)
-        
+        resposta_pre_salva = respostas_da_pagina(user_id, [modulo_slug])
+
         extra_context = {
-            'resposta_anterior': resposta_pre_salva.get('conteudo_resposta', '') if resposta_pre_salva else ''
+            'resposta_anterior': resposta_pre_salva.get(modulo_slug, '')
         }
-        
+
     # Adiciona o status do progresso do módulo para o template
     progresso_modulo = progresso.get(modulo_slug, {'acertos': 0, 'erros': 0, 'concluido': False})
     extra_context['progresso_modulo'] = progresso_modulo
     extra_context['min_acertos'] = modulo_config.get('min_acertos_para_desbloqueio')
+    # Barra de progresso da lateral (conteudo-base.html)
+    extra_context['progresso_data'] = calculate_progress(progresso)
 
-@app.route('/gerar-certificado')
     template_name = modulo_config['template']
     return render_template(template_name, user=usuario, modulo=modulo_config, **extra_context)
 
 
 @app.route('/submeter-exercicio/<string:modulo_slug>', methods=['POST'])
 @requires_auth
-def gerar_certificado():
 def submeter_exercicio(modulo_slug):
-    usuario = usuario_logado()
+    # Leitura nova: a conclusão é decidida com os acertos atuais, não com o cache do worker
+    usuario = usuario_logado(fresco=True)
     user_id = usuario['id']
-    progresso_ref = db.collection('progresso').document(user_id)
     progresso_db = usuario.get('progresso', {})
-    progresso_data = calculate_progress(progresso_db)
-
-    if progresso_data['overall_percent'] != 100:
-        flash('Você deve concluir todos os módulos para gerar o certificado.', 'warning')
-        return redirect(url_for('certificado'))
     modulo_config = MODULO_BY_SLUG.get(modulo_slug)
-    
-    if not modulo_config or modulo_config['exercises'] == 0:
-        return jsonify({'success': False, 'message': 'Módulo não encontrado ou sem exercícios.'}), 404
-        
-    if not request.is_json:
-        return jsonify({'success': False, 'message': 'Requisição deve ser JSON.'}), 400
-        
-    user_answer = request.get_json().get('resposta', '').strip()
-    
-    # Verifica se o módulo já está concluído
+
+    erro = validar_submissao(modulo_config)
+    if erro:
+        return erro
+
+    # --- 1. Corrige a Resposta (o gabarito e o feedback ficam no servidor; o quiz mostra os dois) ---
+    is_correct, feedback = corrigir_submissao(modulo_slug)
+
+    # Verifica se o módulo já está concluído: corrige, mas não conta mais acertos/erros
     current_progress = progresso_db.get(modulo_slug, {'acertos': 0, 'erros': 0, 'concluido': False})
     if current_progress.get('concluido'):
-        return jsonify({'success': True, 'message': 'Módulo já concluído!', 'is_module_completed': True, 'new_acertos': current_progress['acertos'], 'new_erros': current_progress['erros']})
+        return json_ja_concluido(is_correct, feedback, current_progress['acertos'], current_progress['erros'])
 
-    nome_completo = usuario['nome'].upper()
-    data_conclusao_str = datetime.now().strftime('%d de \%B de \%Y')
-    carga_horaria = 24 
-    # --- 1. Corrige a Resposta e Prepara a Atualização ---
-    is_correct = check_answer(modulo_slug, user_answer) 
+    # --- Prepara a Atualização ---
 
-    latex_content = generate_latex_certificate(nome_completo, data_conclusao_str, carga_horaria)
     acertos_path = f'{modulo_slug}.acertos'
     erros_path = f'{modulo_slug}.erros'
     concluido_path = f'{modulo_slug}.concluido'
 
-    return Response(
-        latex_content,
-        mimetype='application/x-tex',
-        headers={'Content-Disposition': f'attachment;filename=Certificado_{nome_completo.replace(" ", "_")}.tex'}
-    )
     update_data = {}
-    
-    # Usa firestore.Increment para atualização atômica
-    if is_correct:
-        update_data[acertos_path] = firestore.Increment(1)
-        
-    else:
-        update_data[erros_path] = firestore.Increment(1)
+    incrementos = {acertos_path if is_correct else erros_path: 1}
+
+    if submissao_transacional is not None:
+        # Lê e atualiza o sub-mapa do módulo na mesma transação: devolve os valores reais
+        try:
+            resultado = submissao_transacional.submeter(
+                user_id, modulo_slug, is_correct, modulo_config.get('min_acertos_para_desbloqueio', 3)
+            )
+            invalidar_cache_usuario(user_id)
+        except Exception as e:
+            print(f"Erro na transação da submissão do exercício {modulo_slug}: {e}")
+            return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
+
+        if resultado['ja_concluido']:
+            return json_ja_concluido(is_correct, feedback, resultado['acertos'], resultado['erros'])
+        registrar_estatisticas(modulo_slug, resultado['acertos'] - is_correct, resultado['erros'] - (not is_correct),
+                               int(is_correct), int(not is_correct), resultado['concluido'])
+        return json_submissao(modulo_config, is_correct, feedback,
+                              resultado['acertos'], resultado['erros'], resultado['concluido'])
 
-# A função generate_latex_certificate não foi alterada, pois não toca no DB.
     # --- 2. Simula o Status Pós-Incremento para Feedback ---
-    
+
     current_acertos = current_progress.get('acertos', 0)
     current_erros = current_progress.get('erros', 0)
-    
+
+    if progress_write_buffer is not None:
+        # Soma o que ainda está no buffer write-behind e não chegou ao Firestore
+        pendente_acertos, pendente_erros = progress_write_buffer.pendentes(user_id, modulo_slug)
+        current_acertos += pendente_acertos
+        current_erros += pendente_erros
+
     new_acertos_simulated = current_acertos + (1 if is_correct else 0)
     new_erros_simulated = current_erros + (1 if not is_correct else 0)
 
-    min_acertos = modulo_config.get('min_acertos_para_desbloqueio', 3) 
-    
+    min_acertos = modulo_config.get('min_acertos_para_desbloqueio', 3)
+
     is_module_completed = False
-    flash_message = ""
-    
+
     if new_acertos_simulated >= min_acertos:
         # Marca o módulo como concluído no DB
         update_data[concluido_path] = True
         is_module_completed = True
-        flash_message = f'Parabéns! Você atingiu {min_acertos} acertos e concluiu o módulo "{modulo_config["title"]}". O próximo módulo foi desbloqueado.'
-    elif is_correct:
-         flash_message = f'Resposta correta! Faltam apenas {min_acertos - new_acertos_simulated} acertos para concluir o módulo.'
-    else:
-         flash_message = f'Resposta incorreta. Você tem {new_acertos_simulated} acerto(s) até agora. Mínimo: {min_acertos}.'
 
-# =========================================================
-# 8. ROTAS DE CONTEÚDO DE CURSO (REVISADAS)
-# =========================================================
-
-@app.route('/modulos')
-@requires_auth
-def modulos():
-    usuario = usuario_logado()
-    progresso = usuario.get('progresso', {})
-    
-    progresso_data = calculate_progress(progresso)
-    modulos_list = progresso_data.get('modules', []) 
     # --- 3. Commit e Retorno JSON ---
+    ja_concluido = False
+    try:
+        if progress_write_buffer is not None and not is_module_completed:
+            # Modo write-behind: o incremento vai no próximo lote do buffer
+            progress_write_buffer.add(user_id, modulo_slug,
+                                      acertos=incrementos.get(acertos_path, 0),
+                                      erros=incrementos.get(erros_path, 0))
+        else:
+            pendentes = {}
+            if progress_write_buffer is not None:
+                # A conclusão é gravada na hora, junto com o que estava pendente do usuário
+                pendentes = progress_write_buffer.retirar(user_id)
+                for caminho, n in pendentes.items():
+                    incrementos[caminho] = incrementos.get(caminho, 0) + n
+
+            # Incrementos atômicos (firestore.Increment no Firestore)
+            try:
+                anterior = gravar_progresso(user_id, modulo_slug, incrementos, update_data,
+                                            current_acertos, current_erros, is_module_completed)
+            except Exception:
+                if pendentes:
+                    progress_write_buffer.devolver(user_id, pendentes)
+                raise
+            if anterior is not None:
+                # Estado lido na própria escrita (mais o que estava pendente no buffer)
+                current_acertos = anterior.get('acertos', 0) + pendentes.get(acertos_path, 0)
+                current_erros = anterior.get('erros', 0) + pendentes.get(erros_path, 0)
+                ja_concluido = anterior.get('concluido', False)
+        invalidar_cache_usuario(user_id)
+        registrar_estatisticas(modulo_slug, current_acertos, current_erros,
+                               int(is_correct), int(not is_correct), is_module_completed and not ja_concluido)
+
+        # Os incrementos não devolvem o valor final: para não pagar mais uma leitura,
+        # o feedback usa os valores simulados acima.
+        return json_submissao(modulo_config, is_correct, feedback,
+                              new_acertos_simulated, new_erros_simulated, is_module_completed)
+
+    except Exception as e:
+        print(f"Erro ao salvar submissão do exercício {modulo_slug}: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
+
+# 4.1. Modo assíncrono (STORAGE_BACKEND=firestore-async, servido por asgi.py): conteúdo e
+# submissões rodam como corrotinas no event loop do worker e esperam o Firestore (AsyncClient)
+# sem prender uma thread. Depois das leituras, a lógica e o template são os das views síncronas.
+async def conteudo_dinamico_async(modulo_slug):
+    """conteudo_dinamico com usuário, progresso e respostas lidos antes, em um get_all do AsyncClient."""
+    if 'usuario_id' in session:
+        user_id = str(session['usuario_id'])
+        slugs = slugs_com_resposta(modulo_slug) if modulo_slug in MODULO_BY_SLUG else []
+        usuario, progresso, respostas = await storage.carregar_pagina_async(
+            user_id, slugs, portfolio=modulo_slug == 'projeto-final'
+        )
+        memorizar_usuario(user_id, usuario, progresso)
+        g.respostas_pagina = respostas
+    # Tudo o que a view lê já está em g: ela só decide o desbloqueio e renderiza
+    return conteudo_dinamico(modulo_slug)
+
+async def submeter_exercicio_async(modulo_slug):
+    """submeter_exercicio no modo padrão (incrementos, sem write-behind nem transação):
+       a leitura nova do progresso e a escrita passam pelo AsyncClient."""
+    usuario = await usuario_logado_async(fresco=True)
+    if usuario is None:
+        flash('Você precisa estar logado para acessar esta página.', 'warning')
+        return redirect(url_for('login'))
+    user_id = usuario['id']
+    modulo_config = MODULO_BY_SLUG.get(modulo_slug)
+
+    erro = validar_submissao(modulo_config)
+    if erro:
+        return erro
+    is_correct, feedback = corrigir_submissao(modulo_slug)
+
+    current_progress = usuario.get('progresso', {}).get(modulo_slug, {'acertos': 0, 'erros': 0, 'concluido': False})
+    if current_progress.get('concluido'):
+        return json_ja_concluido(is_correct, feedback, current_progress['acertos'], current_progress['erros'])
+
+    acertos, erros = current_progress.get('acertos', 0), current_progress.get('erros', 0)
+    is_module_completed = acertos + is_correct >= modulo_config.get('min_acertos_para_desbloqueio', 3)
+    incrementos = {f'{modulo_slug}.acertos' if is_correct else f'{modulo_slug}.erros': 1}
+    valores = {f'{modulo_slug}.concluido': True} if is_module_completed else {}
+
     try:
-        progresso_ref.update(update_data)
-        
-        # O Firestore.Increment é assíncrono, mas o resultado final é garantido.
-        # Retornamos os valores simulados para um feedback mais imediato, 
-        # ou forçamos um 'get' (o que é custoso) para ter o valor real.
-        # Para fins práticos e de desempenho, usaremos os valores simulados no feedback.
+        anterior = await gravar_progresso_async(user_id, modulo_slug, incrementos, valores,
+                                                acertos, erros, is_module_completed)
+    except Exception as e:
+        print(f"Erro ao salvar submissão do exercício {modulo_slug}: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
+
+    invalidar_cache_usuario(user_id)
+    # Estatísticas com o estado lido na própria escrita, quando houve (ver gravar_progresso)
+    antes = anterior if anterior is not None else current_progress
+    registrar_estatisticas(modulo_slug, antes.get('acertos', 0), antes.get('erros', 0), int(is_correct),
+                           int(not is_correct), is_module_completed and not antes.get('concluido', False))
+    return json_submissao(modulo_config, is_correct, feedback,
+                          acertos + is_correct, erros + (not is_correct), is_module_completed)
+
+def rotas_async():
+    """{endpoint: view async} que asgi.py atende no event loop; vazio fora do firestore-async.
+       A submissão só entra no modo padrão: write-behind e transação seguem pela view síncrona."""
+    if not isinstance(storage, AsyncFirestoreStorage):
+        return {}
+    rotas = {'conteudo_dinamico': conteudo_dinamico_async}
+    if progress_write_buffer is None and submissao_transacional is None:
+        rotas['submeter_exercicio'] = submeter_exercicio_async
+    return rotas
+
+
+@app.route('/submeter-exercicios/<string:modulo_slug>', methods=['POST'])
+@requires_auth
+def submeter_exercicios_lote(modulo_slug):
+    """Corrige todas as respostas de um módulo de uma vez e grava os totais em um único update.
+       Corpo JSON: {"respostas": ["B", "A", ...]} (no máximo uma por exercício do módulo, na ordem do banco de questões)."""
+    usuario = usuario_logado(fresco=True)
+    user_id = usuario['id']
+    progresso_db = usuario.get('progresso', {})
+    modulo_config = MODULO_BY_SLUG.get(modulo_slug)
+
+    if not modulo_config or modulo_config['exercises'] == 0:
+        return jsonify({'success': False, 'message': 'Módulo não encontrado ou sem exercícios.'}), 404
+
+    if not request.is_json:
+        return jsonify({'success': False, 'message': 'Requisição deve ser JSON.'}), 400
+
+    respostas = request.get_json().get('respostas')
+    if not isinstance(respostas, list) or not respostas:
+        return jsonify({'success': False, 'message': 'Envie a lista "respostas".'}), 400
+    if len(respostas) > modulo_config['exercises']:
+        return jsonify({'success': False, 'message': f'O módulo tem apenas {modulo_config["exercises"]} exercícios.'}), 400
+
+    current_progress = progresso_db.get(modulo_slug, {'acertos': 0, 'erros': 0, 'concluido': False})
+    if current_progress.get('concluido'):
+        return jsonify({'success': True, 'message': 'Módulo já concluído!', 'is_module_completed': True, 'new_acertos': current_progress['acertos'], 'new_erros': current_progress['erros']})
+
+    # --- 1. Corrige todas as respostas (a i-ésima resposta é da i-ésima questão do módulo no banco) ---
+    questoes = banco_questoes.do_modulo(modulo_slug)
+    resultados = [
+        {'indice': indice, 'is_correct': check_answer(
+            modulo_slug, str(resposta or '').strip(), questoes[indice]['id'] if indice < len(questoes) else None
+        )}
+        for indice, resposta in enumerate(respostas)
+    ]
+    acertos = sum(1 for r in resultados if r['is_correct'])
+    erros = len(resultados) - acertos
+    min_acertos = modulo_config.get('min_acertos_para_desbloqueio', 3)
+
+    if submissao_transacional is not None:
+        # Mesmo caminho da submissão avulsa: lê e soma o lote na transação, com os totais reais
+        try:
+            resultado = submissao_transacional.submeter_lote(user_id, modulo_slug, acertos, erros, min_acertos)
+            invalidar_cache_usuario(user_id)
+        except Exception as e:
+            print(f"Erro na transação do lote de exercícios {modulo_slug}: {e}")
+            return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
+
+        if resultado['ja_concluido']:
+            return jsonify({'success': True, 'message': 'Módulo já concluído!', 'is_module_completed': True, 'new_acertos': resultado['acertos'], 'new_erros': resultado['erros']})
+        registrar_estatisticas(modulo_slug, resultado['acertos'] - acertos, resultado['erros'] - erros,
+                               acertos, erros, resultado['concluido'])
+        if resultado['concluido']:
+            message = f'Parabéns! Você atingiu {min_acertos} acertos e concluiu o módulo "{modulo_config["title"]}". O próximo módulo foi desbloqueado.'
+        else:
+            message = f'Você acertou {acertos} de {len(resultados)}. Total: {resultado["acertos"]} acerto(s). Mínimo: {min_acertos}.'
         return jsonify({
             'success': True,
-            'message': flash_message,
-            'is_correct': is_correct,
-            # Retorna o valor *após* a submissão (simulado)
-            'new_acertos': new_acertos_simulated, 
-            'new_erros': new_erros_simulated,     
-            'is_module_completed': is_module_completed,
+            'message': message,
+            'resultados': resultados,
+            'new_acertos': resultado['acertos'],
+            'new_erros': resultado['erros'],
+            'is_module_completed': resultado['concluido'],
             'min_acertos': min_acertos
         })
 
-    return render_template('modulos.html', user=usuario, modulos=modulos_list, progresso_data=progresso_data)
+    acertos_path = f'{modulo_slug}.acertos'
+    erros_path = f'{modulo_slug}.erros'
+    incrementos = {acertos_path: acertos, erros_path: erros}
+
+    # O lote é gravado na hora: leva junto o que estiver no buffer write-behind
+    pendentes = progress_write_buffer.retirar(user_id) if progress_write_buffer is not None else {}
+    for caminho, n in pendentes.items():
+        incrementos[caminho] = incrementos.get(caminho, 0) + n
+
+    # --- 2. Simula o Status Pós-Incremento para Feedback ---
+    new_acertos_simulated = current_progress.get('acertos', 0) + pendentes.get(acertos_path, 0) + acertos
+    new_erros_simulated = current_progress.get('erros', 0) + pendentes.get(erros_path, 0) + erros
+
+    update_data = {}
+    is_module_completed = new_acertos_simulated >= min_acertos
+    if is_module_completed:
+        update_data[f'{modulo_slug}.concluido'] = True
+        message = f'Parabéns! Você atingiu {min_acertos} acertos e concluiu o módulo "{modulo_config["title"]}". O próximo módulo foi desbloqueado.'
+    else:
+        message = f'Você acertou {acertos} de {len(resultados)}. Total: {new_acertos_simulated} acerto(s). Mínimo: {min_acertos}.'
+
+    # --- 3. Commit único e Retorno JSON ---
+    acertos_antes, erros_antes = new_acertos_simulated - acertos, new_erros_simulated - erros
+    try:
+        anterior = gravar_progresso(user_id, modulo_slug, incrementos, update_data,
+                                    acertos_antes, erros_antes, is_module_completed)
+        invalidar_cache_usuario(user_id)
     except Exception as e:
-        print(f"Erro ao salvar submissão do exercício {modulo_slug}: {e}") 
+        if pendentes:
+            progress_write_buffer.devolver(user_id, pendentes)
+        print(f"Erro ao salvar lote de exercícios {modulo_slug}: {e}")
         return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
-
+    ja_concluido = False
+    if anterior is not None:
+        # Estado lido na própria escrita (mais o que estava pendente no buffer)
+        acertos_antes = anterior.get('acertos', 0) + pendentes.get(acertos_path, 0)
+        erros_antes = anterior.get('erros', 0) + pendentes.get(erros_path, 0)
+        ja_concluido = anterior.get('concluido', False)
+    registrar_estatisticas(modulo_slug, acertos_antes, erros_antes,
+                           acertos, erros, is_module_completed and not ja_concluido)
+
+    return jsonify({
+        'success': True,
+        'message': message,
+        'resultados': resultados,
+        'new_acertos': new_acertos_simulated,
+        'new_erros': new_erros_simulated,
+        'is_module_completed': is_module_completed,
+        'min_acertos': min_acertos
+    })
 
 @app.route('/salvar-projeto-modulo/<string:modulo_slug>', methods=['POST'])
 @requires_auth
 def salvar_projeto_modulo(modulo_slug):
     usuario = usuario_logado()
-    user_id = usuario['id'] # UID do Firestore
     user_id = usuario['id']
 
     if not request.is_json:
         return jsonify({'success': False, 'message': 'Requisição deve ser JSON.'}), 400
 
-    data = request.get_json() 
-    field_name = f'project_idea_{MODULO_BY_SLUG.get(modulo_slug, {}).get("order", 0)}'
-    project_idea = data.get(field_name) 
+    data = request.get_json()
+    project_idea = data.get('conteudo_resposta')
 
-    # NOTE: O campo 'field_name' não é necessário se você passa o slug. O slug deve ser suficiente.
-    project_idea = data.get('conteudo_resposta') # Mudei para um nome genérico
-    
     if not project_idea or len(project_idea.strip()) < 10:
         return jsonify({'success': False, 'message': 'Resposta muito curta ou ausente.'}), 400
 
-    # MUDANÇA: As respostas são armazenadas em um documento na coleção 'respostas_projeto'.
-    # Usamos uma chave composta (usuario_id + modulo_slug) para o ID do documento
-    doc_id = f"{user_id}_{modulo_slug}"
-    resposta_ref = db.collection('respostas_projeto').document(doc_id)
-
+    # As respostas ficam em 'respostas_projeto', um documento por (usuario_id, modulo_slug)
     try:
-        # Dados a serem salvos/atualizados
-        resposta_data = {
-            'usuario_id': user_id,
-            'modulo_slug': modulo_slug,
-            'conteudo_resposta': project_idea,
-            'data_atualizacao': firestore.SERVER_TIMESTAMP # Atualiza o timestamp
-            'data_atualizacao': firestore.SERVER_TIMESTAMP 
-        }
-
-        # Use set(data, merge=True) para criar se não existir ou atualizar se existir
-        resposta_ref.set(resposta_data, merge=True)
+        # Cria ou atualiza a resposta (e o timestamp de atualização)
+        storage.salvar_resposta(user_id, modulo_slug, project_idea)
 
         return jsonify({'success': True, 'message': 'Ideia de projeto salva com sucesso!'})
-@@ -565,115 +597,189 @@ def salvar_projeto_modulo(modulo_slug):
+    except Exception as e:
+        print(f"Erro ao salvar a resposta do projeto {modulo_slug}: {e}")
         return jsonify({'success': False, 'message': f'Erro interno ao salvar no DB: {str(e)}'}), 500
 
 
 @app.route('/concluir-modulo/<string:modulo_nome>', methods=['POST'])
+@requires_auth
+def concluir_modulo(modulo_nome):
+    """Botão "Concluir" das páginas de conteúdo. Os módulos 1 a 5 são concluídos pelos acertos
+       nos exercícios; só o Projeto Final é concluído por aqui."""
+    modulo_slug = modulo_nome.replace('_', '-')
+    if modulo_slug == 'projeto-final':
+        return concluir_projeto_final()
+    if modulo_slug not in MODULO_BY_SLUG:
+        flash(f'Erro: Módulo "{modulo_nome}" não encontrado.', 'danger')
+        return redirect(url_for('modulos'))
+    if not usuario_logado(fresco=True).get('progresso', {}).get(modulo_slug, {}).get('concluido'):
+        flash('Acerte os exercícios do módulo para concluí-lo.', 'warning')
+        return redirect(url_for('conteudo_dinamico', modulo_slug=modulo_slug))
+    return redirect(url_for('modulos'))
+
 # Rota para concluir o Projeto Final (Módulo 6), já que não é por acertos
 @app.route('/concluir-projeto-final', methods=['POST'])
 @requires_auth
-def concluir_modulo(modulo_nome):
 def concluir_projeto_final():
-    usuario = usuario_logado()
+    usuario = usuario_logado(fresco=True)
     user_id = usuario['id']
-    progresso = usuario.get('progresso', {}) # Progresso como dicionário
-    
-    slug_normalizado = modulo_nome.replace('_', '-')
-    modulo_config = MODULO_BY_SLUG.get(slug_normalizado)
     progresso = usuario.get('progresso', {})
 
     modulo_slug = 'projeto-final'
     modulo_config = MODULO_BY_SLUG.get(modulo_slug)
 
     if not modulo_config:
-        flash(f'Erro: Módulo "{modulo_nome}" não encontrado no mapeamento.', 'danger')
         flash(f'Erro: Módulo Projeto Final não encontrado.', 'danger')
         return redirect(url_for('modulos'))
 
-    db_field = modulo_config['field']
-    
-    # 1. VERIFICA DEPENDÊNCIA (usa o dicionário 'progresso')
-    dependency_field = modulo_config.get('dependency_field')
-    if dependency_field and not progresso.get(dependency_field, False):
-        flash('Você deve completar o módulo anterior primeiro para registrar a conclusão deste.', 'warning')
-        return redirect(url_for('modulos'))
     # Verifica se a dependência (Algoritmo) foi concluída
     dependency_slug = modulo_config.get('dependency_field')
     if dependency_slug and not progresso.get(dependency_slug, {}).get('concluido', False):
-         flash('Você deve completar todos os módulos anteriores para concluir o Projeto Final.', 'warning')
-         return redirect(url_for('modulos'))
+        flash('Você deve completar todos os módulos anteriores para concluir o Projeto Final.', 'warning')
+        return redirect(url_for('modulos'))
 
-    # 2. ATUALIZA o campo no documento de progresso do usuário no Firestore
     try:
-        progresso_ref = db.collection('progresso').document(user_id)
+        # Atualiza o campo 'concluido' do projeto-final (conta nas estatísticas se não estava concluído
+        # logo antes desta escrita)
+        anterior = gravar_progresso(user_id, modulo_slug, None, {f'{modulo_slug}.concluido': True},
+                                    0, 0, concluiu=True)
+        invalidar_cache_usuario(user_id)
+        if anterior is not None and not anterior.get('concluido'):
+            registrar_estatisticas(modulo_slug, 0, 0, concluiu=True)
 
-        # Atualiza o campo específico no documento
-        # Atualiza o campo 'concluido' do projeto-final
-        progresso_ref.update({
-            db_field: True
-             f'{modulo_slug}.concluido': True
-        })
-
-        # Encontra o próximo módulo (lógica de redirecionamento permanece a mesma)
-        proximo_modulo_order = modulo_config['order'] + 1
-        proximo_modulo = next((m for m in MODULO_CONFIG if m['order'] == proximo_modulo_order), None)
-        
-        if proximo_modulo:
-            flash(f'Módulo "{modulo_config["title"]}" concluído com sucesso! Prossiga para o próximo: {proximo_modulo["title"]}', 'success')
-        else:
-            flash(f'Módulo "{modulo_config["title"]}" concluído com sucesso! Você finalizou o curso!', 'success')
         flash(f'{modulo_config["title"]} concluído com sucesso! Você finalizou o curso!', 'success')
 
     except Exception as e:
-        flash(f'Erro ao concluir o módulo: {e}', 'danger')
         flash(f'Erro ao concluir o Projeto Final: {e}', 'danger')
 
     return redirect(url_for('modulos'))
 
+
 # =========================================================
-# 5. ROTAS DE CERTIFICADO (SEM ALTERAÇÕES RELEVANTES NA LÓGICA)
+# 5. ROTAS DE CERTIFICADO
 # =========================================================
 
-@app.route('/conteudo/<string:modulo_slug>')
-# Esta função precisa existir para que o código funcione, mas você não a forneceu no prompt.
-def generate_latex_certificate(nome, data, carga):
-    """Gera o conteúdo LaTeX do certificado."""
-    # Retorna um TEX de exemplo
-    return f"""\\documentclass{{article}}
-\\usepackage[utf8]{{inputenc}}
-\\usepackage[T1]{{fontenc}}
-\\begin{{document}}
-\\centering
-\\Huge CERTIFICADO DE CONCLUSÃO \\par
-\\vspace{{1cm}}
-\\Large Certificamos que \\textbf{{{nome}}} \\par
-concluiu com êxito o Curso de Pensamento Computacional. \\par
-\\vspace{{1cm}}
-\\large Carga Horária: {carga} horas. \\par
-\\vspace{{1cm}}
-\\small Emitido em: {data}
-\\end{{document}}
-"""
+# PDFs gerados uma vez por (nome, data de conclusão) e servidos do disco depois
+certificados = CertificateStore(app.config['CERTIFICADOS_DIR'], max_workers=app.config['CERTIFICADOS_WORKERS'])
+
+def registrar_data_conclusao(usuario):
+    """Retorna a data de conclusão do curso, gravando-a no progresso na primeira emissão.
+       Uma data fixa mantém o mesmo certificado (e o mesmo cache) em todos os downloads."""
+    data_conclusao = usuario.get('progresso', {}).get('data_conclusao')
+    if data_conclusao:
+        return datetime.strptime(data_conclusao, '%Y-%m-%d').date()
+
+    hoje = datetime.now().date()
+    storage.atualizar_progresso(usuario['id'], valores={'data_conclusao': hoje.isoformat()})
+    invalidar_cache_usuario(usuario['id'])
+    return hoje
 
 @app.route('/certificado')
 @requires_auth
-def conteudo_dinamico(modulo_slug):
 def certificado():
     usuario = usuario_logado()
-    user_id = usuario['id']
-    progresso = usuario.get('progresso', {})
     progresso_db = usuario.get('progresso', {})
 
-    modulo_config = MODULO_BY_SLUG.get(modulo_slug)
     progresso_data = calculate_progress(progresso_db)
-    
+
     certificado_disponivel = progresso_data['overall_percent'] == 100
     data_emissao = datetime.now().strftime('%d/%m/%Y')
-    
+
     context = {
         'user': usuario,
         'title': "Certificado",
         'certificado_disponivel': certificado_disponivel,
-        'nome_usuario': usuario['nome'], 
+        'nome_usuario': usuario['nome'],
         'data_emissao': data_emissao
     }
     return render_template('certificado.html', **context)
 
-    if not modulo_config:
-        flash('Módulo de conteúdo não encontrado.', 'danger')
-        return redirect(url_for('modulos'))
 @app.route('/gerar-certificado')
 @requires_auth
 def gerar_certificado():
-    usuario = usuario_logado()
+    usuario = usuario_logado(fresco=True)
     progresso_db = usuario.get('progresso', {})
     progresso_data = calculate_progress(progresso_db)
 
-    # 2. Verifica a dependência (lógica de desbloqueio)
-    dependency_field = modulo_config.get('dependency_field')
-    if dependency_field and not progresso.get(dependency_field, False):
-        flash(f'Você deve completar o módulo anterior primeiro.', 'warning')
-        return redirect(url_for('modulos'))
-        
-    # 3. LÓGICA ESPECÍFICA PARA O MÓDULO FINAL (carregar respostas)
-    respostas_projeto_modulos = {}
-    extra_context = {}
     if progresso_data['overall_percent'] != 100:
         flash('Você deve concluir todos os módulos para gerar o certificado.', 'warning')
         return redirect(url_for('certificado'))
 
     nome_completo = usuario['nome'].upper()
-    data_conclusao_str = datetime.now().strftime('%d de \%B de \%Y')
-    carga_horaria = 24 
+    data_conclusao_str = data_por_extenso(registrar_data_conclusao(usuario))
+    carga_horaria = 24
 
-    if modulo_slug == 'projeto-final':
-        # MUDANÇA: Busca todas as respostas do projeto deste usuário (Firestore Query)
-        respostas_query = db.collection('respostas_projeto').where('usuario_id', '==', user_id).stream()
-    latex_content = generate_latex_certificate(nome_completo, data_conclusao_str, carga_horaria)
-    
-    return Response(
-        latex_content,
-        mimetype='application/x-tex',
-        headers={'Content-Disposition': f'attachment;filename=Certificado_{nome_completo.replace(" ", "_")}.tex'}
+    try:
+        caminho_pdf, chave = certificados.obter(nome_completo, data_conclusao_str, carga_horaria)
+    except CertificadoPendente:
+        flash('Seu certificado está sendo gerado. Tente novamente em alguns segundos.', 'info')
+        return redirect(url_for('certificado'))
+
+    # conditional=True responde 304 (If-None-Match) e 206 (Range) a partir do arquivo em cache.
+    # Sem max_age o arquivo fica 'no-cache': documento pessoal, revalidado pelo ETag.
+    resposta = send_file(
+        caminho_pdf,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'Certificado_{nome_completo.replace(" ", "_")}.pdf',
+        etag=chave,
+        conditional=True
     )
+    resposta.cache_control.private = True
+    return resposta
 
 
 # =========================================================
 # 6. ROTAS DE PERFIL
 # =========================================================
 
-@app.route('/perfil', methods=['GET', 'POST']) 
+@app.route('/perfil', methods=['GET', 'POST'])
 @requires_auth
 def perfil():
-    usuario = usuario_logado()
-    
+    # Ao salvar, o e-mail atual (para o índice de e-mails) vem de uma leitura nova
+    usuario = usuario_logado(fresco=request.method == 'POST')
+
     if request.method == 'POST':
-        user_id = usuario['id'] 
+        user_id = usuario['id']
 
-        for r_doc in respostas_query:
-            r = r_doc.to_dict()
-            # Mapeia as respostas para um dicionário: {'introducao': 'texto...', 'decomposicao': 'texto...'}
-            respostas_projeto_modulos[r['modulo_slug']] = r['conteudo_resposta']
-            
-        respostas_projeto_ordenadas = []
-        for mod in MODULO_CONFIG:
-            if mod['slug'] != 'projeto-final': 
-                respostas_projeto_ordenadas.append({
-                    'title': mod['title'],
-                    'slug': mod['slug'],
-                    'resposta': respostas_projeto_modulos.get(mod['slug'], 'Nenhuma resposta salva.'),
-                    'is_saved': mod['slug'] in respostas_projeto_modulos
-                })
         name = request.form.get('name')
         email = request.form.get('email')
         phone = request.form.get('phone')
@@ -930,30 +1353,21 @@ def perfil():
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
 
-        extra_context = {'respostas_projeto': respostas_projeto_ordenadas}
-    else:
-        # Para outros módulos (1 a 5), checa se já existe uma resposta salva para preencher o campo
-        doc_id = f"{user_id}_{modulo_slug}"
-        resposta_pre_salva = get_firestore_doc('respostas_projeto', doc_id)
         tem_erro = False
 
-        extra_context = {
-            'resposta_anterior': resposta_pre_salva.get('conteudo_resposta', '') if resposta_pre_salva else ''
-        }
         try:
             update_data = {}
-            
+
             # 2. Checa e atualiza E-mail
             if email != usuario['email']:
-                email_existente_query = db.collection('usuarios').where('email', '==', email).limit(1).stream()
-                email_existente = next(email_existente_query, None)
-                
-                if email_existente and email_existente.id != user_id:
+                email_existente = buscar_uid_por_email(email)
+
+                if email_existente and email_existente != user_id:
                     flash("Este novo e-mail já está em uso por outro usuário.", 'danger')
                     tem_erro = True
                 else:
                     update_data['email'] = email
-                    
+
             # 3. Processa a mudança de senha
             if new_password:
                 if new_password != confirm_password:
@@ -963,46 +1377,320 @@ def perfil():
                     flash("A nova senha deve ter no mínimo 6 caracteres.", 'danger')
                     tem_erro = True
                 else:
-                    # Atualiza no Firebase Authentication E no Firestore (para o hash)
-                    auth.update_user(user_id, password=new_password)
-                    update_data['senha_hash'] = generate_password_hash(new_password)
+                    # Atualiza no Firebase Authentication E no storage (para o hash)
+                    if isinstance(storage, FirestoreStorage):
+                        auth.update_user(user_id, password=new_password)
+                    update_data['senha_hash'] = senhas.gerar_hash(new_password)
                     flash("Senha atualizada com sucesso!", 'success')
 
-    # 4. Renderiza o template do módulo
-    template_name = modulo_config['template']
-    return render_template(template_name, user=usuario, progresso=progresso, modulo=modulo_config, **extra_context)
             # 4. Atualiza dados básicos
             update_data['nome'] = name
             update_data['telefone'] = phone
             update_data['instituicao'] = institution
-            
+
             if not tem_erro and update_data:
-                # 5. Commit no Firestore
-                db.collection('usuarios').document(user_id).update(update_data)
-                
+                # 5. Commit no storage (usuário + índice de e-mails juntos)
+                storage.atualizar_usuario(user_id, update_data, email_antigo=usuario['email'])
+                if 'email' in update_data:
+                    atualizar_cache_email(user_id, email, email_antigo=usuario['email'])
+                invalidar_cache_usuario(user_id)
+
                 if not new_password:
                     flash("Dados do perfil atualizados com sucesso!", 'success')
-                
+
                 # Redireciona para recarregar o usuário atualizado
                 return redirect(url_for('perfil'))
-                    
+
             if tem_erro:
-                 # Se houve erro no processamento (e.g., senhas não coincidem), 
-                 # re-renderiza com os dados do formulário
-                 return render_template('perfil.html', user=usuario)
-                
+                # Se houve erro no processamento (e.g., senhas não coincidem),
+                # re-renderiza com os dados do formulário
+                return render_template('perfil.html', user=usuario)
+
         except Exception as e:
             flash(f"Ocorreu um erro inesperado ao salvar: {str(e)}", 'danger')
-            return render_template('perfil.html', user=usuario) 
+            return render_template('perfil.html', user=usuario)
 
     return render_template('perfil.html', user=usuario)
 
 
+# =========================================================
+# 7.0 API DE PROGRESSO (JSON com ETag, para polling do front-end)
+# =========================================================
+
+@app.route('/api/progresso')
+@requires_auth
+def api_progresso():
+    """calculate_progress do usuário logado em JSON. Responde 304 enquanto nada mudar."""
+    user_id = str(session['usuario_id'])
+    # Leitura nova a cada poll: o ETag tem que mudar assim que o progresso muda, em qualquer worker.
+    # O 304 ainda poupa a serialização e a transferência do JSON.
+    progresso_db = usuario_logado(fresco=True).get('progresso', {})
+
+    if progress_write_buffer is not None:
+        # Inclui as submissões que ainda estão no buffer write-behind
+        progresso_db = dict(progresso_db)
+        for slug in progress_engine.slugs:
+            pendente_acertos, pendente_erros = progress_write_buffer.pendentes(user_id, slug)
+            if pendente_acertos or pendente_erros:
+                modulo = dict(progresso_db.get(slug) or {})
+                modulo['acertos'] = modulo.get('acertos', 0) + pendente_acertos
+                modulo['erros'] = modulo.get('erros', 0) + pendente_erros
+                progresso_db[slug] = modulo
+
+    etag = progress_engine.etag(progresso_db)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(calculate_progress(progresso_db))
+    response.set_etag(etag)
+    # O navegador guarda a resposta, mas revalida sempre (e só ele: é por usuário)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/admin/estatisticas')
+@requires_admin
+def admin_estatisticas():
+    """Painel dos coordenadores: conclusão, médias e desistência por módulo."""
+    if estatisticas_curso is None:
+        abort(404)
+    return render_template('admin-estatisticas.html', user=usuario_logado(), linhas=estatisticas_curso.resumo())
+
+
+CAMPOS_EXPORTACAO = ['usuario_id', 'nome', 'email', 'modulo_slug', 'conteudo_resposta', 'data_atualizacao']
+
+@app.route('/admin/respostas.<string:formato>')
+@requires_admin
+def admin_exportar_respostas(formato):
+    """Todas as respostas do projeto em CSV ou JSONL, geradas página a página
+       (memória constante, mesmo com a coleção inteira)."""
+    if formato not in ('csv', 'jsonl'):
+        abort(404)
+    tamanho_pagina = app.config['EXPORT_PAGE_SIZE']
+
+    def gerar_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CAMPOS_EXPORTACAO)
+        writer.writeheader()
+        for pagina in storage.paginar_respostas(tamanho_pagina):
+            writer.writerows(pagina)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def gerar_jsonl():
+        for pagina in storage.paginar_respostas(tamanho_pagina):
+            yield ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in pagina)
+
+    if formato == 'csv':
+        gerador, mimetype = gerar_csv(), 'text/csv'
+    else:
+        gerador, mimetype = gerar_jsonl(), 'application/x-ndjson'
+    nome_arquivo = f"respostas-projeto-{datetime.now().strftime('%Y%m%d')}.{formato}"
+    return Response(gerador, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'})
+
+
+# =========================================================
+# 7.1 MÉTRICAS (formato Prometheus)
+# =========================================================
+
+@app.route('/metrics')
+def metrics():
+    """Requisições, latência e custo de Firestore por rota, acumulados neste processo."""
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        # Opt-in: sem METRICS_TOKEN as métricas por rota não ficam expostas
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return 'Não autorizado.\n', 401
+    return app.response_class(instrumentacao.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# =========================================================
+# 8. COMANDOS DE ADMINISTRAÇÃO (flask --app app <comando>)
+# =========================================================
+
+def firestore_stub(usuarios):
+    """Firestore em memória com 'usuarios' professores sintéticos, 2/3 com o curso concluído."""
+    from fake_firestore import FakeFirestore
+
+    stub = FakeFirestore()
+    for i in range(usuarios):
+        user_id = f'stub-{i:06d}'
+        concluido = i % 3 != 0
+        stub.collection('usuarios').document(user_id).set({'nome': f'Professor(a) {i}', 'email': f'stub{i}@exemplo.com'})
+        stub.collection('progresso').document(user_id).set({
+            m['slug']: {'acertos': m['min_acertos_para_desbloqueio'], 'erros': 0, 'concluido': concluido}
+            for m in MODULO_CONFIG
+        })
+    return stub
+
+
+@app.cli.command('certificados-turma')
+@click.argument('saida')
+@click.option('--workers', type=int, default=None, help='Processos de renderização (padrão: nº de CPUs).')
+@click.option('--pagina', 'tamanho_pagina', type=int, default=300, help='Documentos de progresso por página.')
+@click.option('--retomar', is_flag=True, help='Continua do último checkpoint gravado ao lado da saída.')
+@click.option('--stub', 'usuarios_stub', type=int, default=0, help='Usa um Firestore em memória com N professores.')
+def certificados_turma_command(saida, workers, tamanho_pagina, retomar, usuarios_stub):
+    """Gera os certificados de todos os professores com 100% do curso em SAIDA (diretório ou .zip).
+       Para o emulador, defina FIRESTORE_EMULATOR_HOST antes de rodar."""
+    banco = firestore_stub(usuarios_stub) if usuarios_stub else db
+    estatisticas = gerar_certificados_turma(
+        banco, calculate_progress, saida,
+        workers=workers, tamanho_pagina=tamanho_pagina, retomar=retomar, relatorio=click.echo
+    )
+    click.echo(f"Concluído: {estatisticas['gerados']} certificados em {estatisticas['segundos']:.1f}s "
+               f"({estatisticas['certificados_por_segundo']:.1f} certificados/s).")
+
+
+@app.cli.command('recalcular-estatisticas')
+@click.option('--pagina', 'tamanho_pagina', type=int, default=300, help='Documentos de progresso por página.')
+@click.option('--stub', 'usuarios_stub', type=int, default=0, help='Usa um Firestore em memória com N professores.')
+def recalcular_estatisticas_command(tamanho_pagina, usuarios_stub):
+    """Recalcula os contadores de estatisticas_curso lendo toda a coleção 'progresso' (backfill)."""
+    banco = firestore_stub(usuarios_stub) if usuarios_stub else db
+    estatisticas = EstatisticasCurso(banco, MODULO_CONFIG, shards=app.config['COURSE_STATS_SHARDS'])
+    resultado = estatisticas.recalcular(tamanho_pagina, relatorio=click.echo)
+    click.echo(f"Concluído: {resultado['lidos']} documentos em {resultado['segundos']:.1f}s.")
+    for linha in estatisticas.resumo():
+        click.echo(f"  {linha['slug']:15s} iniciados {linha['iniciados']:6d}  concluídos {linha['concluidos']:6d}  "
+                   f"pararam aqui {linha['pararam_aqui']:6d}")
+
+
+def importar_contas_auth(registros):
+    """Cria as contas de [(uid, usuario_data, progresso_data)] no Firebase Auth com import_users
+       (uma chamada para até 1000 contas). O login usa o senha_hash do Firestore, então as contas
+       vão sem senha. Retorna os UIDs que falharam."""
+    contas = [auth.ImportUserRecord(uid=uid, email=dados['email'], display_name=dados['nome'])
+              for uid, dados, _ in registros]
+    falhas = set()
+    for inicio in range(0, len(contas), 1000):
+        resultado = auth.import_users(contas[inicio:inicio + 1000])
+        for erro in resultado.errors:
+            conta = contas[inicio + erro.index]
+            click.echo(f'Auth recusou {conta.email}: {erro.reason}')
+            falhas.add(conta.uid)
+    return falhas
+
+
+@app.cli.command('provisionar-turma')
+@click.argument('planilha', type=click.File(encoding='utf-8-sig'))
+@click.option('--credenciais', type=click.Path(dir_okay=False), help='CSV de saída com nome, e-mail e senha temporária.')
+@click.option('--lote', 'tamanho_lote', type=int, default=300, help='Professores por lote de gravação (máx. 1000).')
+@click.option('--workers', type=int, default=None, help='Processos para o hash das senhas (padrão: nº de CPUs).')
+@click.option('--stub', is_flag=True, help='Grava em um Firestore em memória (medição de vazão, sem Auth).')
+def provisionar_turma_command(planilha, credenciais, tamanho_lote, workers, stub):
+    """Cadastra os professores da PLANILHA CSV (colunas nome, email e opcionais senha,
+       instituicao, telefone, cargo). Sem senha na planilha, gera uma temporária."""
+    if stub:
+        destino, criar_contas = FirestoreStorage(firestore_stub(0)), None
+    else:
+        destino = storage
+        criar_contas = importar_contas_auth if isinstance(storage, FirestoreStorage) else None
+
+    resultado, estatisticas = provisionar_turma(
+        destino, ler_planilha(planilha), novo_usuario, progresso_inicial, criar_contas=criar_contas,
+        tamanho_lote=min(tamanho_lote, 1000), workers=workers, relatorio=click.echo
+    )
+    if credenciais and resultado:
+        with open(credenciais, 'w', newline='', encoding='utf-8') as arquivo:
+            writer = csv.DictWriter(arquivo, fieldnames=['nome', 'email', 'senha'])
+            writer.writeheader()
+            writer.writerows(resultado)
+        click.echo(f'Credenciais em {credenciais}: distribua e apague o arquivo.')
+    elif any(c['senha'] for c in resultado):
+        click.echo('AVISO: senhas temporárias geradas, mas --credenciais não foi informado.')
+    click.echo(f"Concluído: {estatisticas['criados']} criados, {estatisticas['ja_cadastrados']} já cadastrados, "
+               f"{estatisticas['invalidas']} linhas inválidas, {estatisticas['falhas_auth']} falhas no Auth "
+               f"em {estatisticas['segundos']:.1f}s.")
+
+
+@app.cli.command('migrar-progresso')
+@click.option('--pagina', 'tamanho_pagina', type=int, default=300, help='Documentos por página (e por WriteBatch, máx. 500).')
+@click.option('--retomar', is_flag=True, help='Continua do último checkpoint.')
+@click.option('--simular', is_flag=True, help='Só mede o tamanho antes/depois, sem gravar.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+              help='Arquivo de checkpoint (padrão: instance/migracao-progresso.checkpoint.json).')
+@click.option('--stub', 'usuarios_stub', type=int, default=0, help='Usa um Firestore em memória com N professores.')
+def migrar_progresso_command(tamanho_pagina, retomar, simular, checkpoint, usuarios_stub):
+    """Converte os documentos de 'progresso' para o formato compacto (v2). Rode depois do deploy
+       que passou a gravar em v2; pode ser interrompido e retomado com --retomar."""
+    banco = firestore_stub(usuarios_stub) if usuarios_stub else db
+    if checkpoint is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        checkpoint = os.path.join(app.instance_path, 'migracao-progresso.checkpoint.json')
+    estatisticas = migrar_progresso(banco, checkpoint, min(tamanho_pagina, 500), retomar=retomar,
+                                    simular=simular, relatorio=click.echo)
+    lidos = estatisticas['lidos'] or 1
+    click.echo(f"Concluído: {estatisticas['migrados']} migrados de {estatisticas['lidos']} em {estatisticas['segundos']:.1f}s. "
+               f"Tamanho médio por documento: {estatisticas['bytes_antes'] / lidos:.0f} -> "
+               f"{estatisticas['bytes_depois'] / lidos:.0f} bytes.")
+
+
+@app.cli.command('completar-portfolios')
+@click.option('--pagina', 'tamanho_pagina', type=int, default=300, help='Usuários por página.')
+def completar_portfolios_command(tamanho_pagina):
+    """Copia para 'portfolios' as respostas salvas antes de os portfólios existirem. Rode uma vez;
+       até lá a página do projeto final lê também os documentos por módulo."""
+    if not isinstance(storage, FirestoreStorage):
+        click.echo('Só o Firestore usa portfólios: nada a fazer.')
+        return
+    estatisticas = completar_portfolios(db, slugs_com_resposta('projeto-final'), tamanho_pagina, relatorio=click.echo)
+    click.echo(f"Concluído: {estatisticas['completados']} portfólios completados de {estatisticas['lidos']} usuários "
+               f"em {estatisticas['segundos']:.1f}s.")
+
+
+@app.cli.command('construir-css')
+def construir_css_command():
+    """Gera static/css/tailwind.css com as classes do Tailwind usadas em templates/*.html."""
+    destino = os.path.join(app.static_folder, 'css', 'tailwind.css')
+    total = construir_css(os.path.join(app.root_path, app.template_folder), destino)
+    click.echo(f'{total} classes em {destino} ({os.path.getsize(destino) / 1024:.1f} KB).')
+
+
+@app.cli.command('construir-assets')
+def construir_assets_command():
+    """Gera static/dist/ (nomes com hash, .gz/.br e .webp) e o manifest. Rode no build/deploy,
+       depois de `flask construir-css`."""
+    manifest = construir_assets(app.static_folder, relatorio=click.echo)
+    original = sum(entrada['tamanho'] for entrada in manifest.values())
+    click.echo(f'{len(manifest)} arquivos em {os.path.join(app.static_folder, "dist")} ({original / 1024:.0f} KB originais).')
+    asset_pipeline.carregar()
+
+
+@app.cli.command('compilar-templates')
+def compilar_templates_command():
+    """Compila todos os templates para o cache de bytecode (rode no build/deploy)."""
+    if not app.jinja_env.bytecode_cache:
+        click.echo('JINJA_BYTECODE_CACHE_DIR não definido: nada a fazer.')
+        return
+    nomes = app.jinja_env.list_templates(extensions=['html'])
+    for nome in nomes:
+        app.jinja_env.get_template(nome)
+    click.echo(f"{len(nomes)} templates compilados em {app.config['JINJA_BYTECODE_CACHE_DIR']}.")
+
+
 # =========================================================
 # 9. EXECUÇÃO
-# 7. EXECUÇÃO
 # =========================================================
 
+def reiniciar_apos_fork():
+    """Chamado pelo gunicorn (post_fork, ver gunicorn.conf.py) em cada worker quando o
+       app foi pré-carregado no mestre: recria o que não sobrevive a um fork."""
+    firebase_client.apos_fork()
+    if isinstance(storage, SQLiteStorage):
+        storage.apos_fork()
+    if progress_write_buffer:
+        progress_write_buffer.apos_fork()
+    if buffer_estatisticas:
+        buffer_estatisticas.apos_fork()
+    senhas.apos_fork()
+
+
 if __name__ == '__main__':
     # REMOVIDO: db.create_all() 
     
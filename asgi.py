@@ -0,0 +1,137 @@
+"""Entrada ASGI do PC Teacher (modo assíncrono).
+
+    pip install -r requirements-asgi.txt
+    STORAGE_BACKEND=firestore-async uvicorn asgi:app --workers 2
+
+As rotas de app.rotas_async() (páginas de conteúdo e submissão de exercícios)
+rodam como corrotinas no event loop do worker: enquanto uma espera o Firestore
+pelo AsyncClient, o loop atende as outras, sem uma thread presa por requisição.
+O contexto de requisição do Flask (request, session, g) é um ContextVar, então
+cada tarefa do loop tem o seu; hooks, sessão e templates são os do app.
+
+As demais rotas continuam WSGI e rodam em um pool de ASGI_THREADS threads por
+worker. Sem STORAGE_BACKEND=firestore-async, rotas_async() é vazio e tudo roda
+no pool, como em um worker gthread.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+from flask import request, request_started
+from werkzeug.exceptions import HTTPException
+
+import app as pc_teacher
+
+
+class _InstanciaWsgi(WsgiToAsgiInstance):
+    """WsgiToAsgiInstance que roda o app no pool do worker: o padrão do asgiref
+       (thread_sensitive) atenderia todas as requisições WSGI em uma única thread."""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self._executor = executor
+
+    async def run_wsgi_app(self, body):
+        rodar = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        await sync_to_async(rodar, thread_sensitive=False, executor=self._executor)(self, body)
+
+
+class AdaptadorAsgi:
+    def __init__(self, flask_app, rotas_async, threads=8):
+        self.flask_app = flask_app
+        self.rotas_async = rotas_async
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+        self._url_adapter = flask_app.url_map.bind('')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+        view = self.rotas_async.get(self._endpoint(scope)) if scope['type'] == 'http' else None
+        if view is None:
+            return await _InstanciaWsgi(self.flask_app.wsgi_app, self.executor)(scope, receive, send)
+        await self._atender(view, scope, receive, send)
+
+    def _endpoint(self, scope):
+        try:
+            endpoint, _ = self._url_adapter.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            # 404, 405, redirecionamento de barra final: o Flask responde pelo caminho WSGI
+            return None
+        return endpoint
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _atender(self, view, scope, receive, send):
+        """Flask.wsgi_app para uma view async, no event loop."""
+        corpo = bytearray()
+        while True:
+            mensagem = await receive()
+            corpo += mensagem.get('body', b'')
+            if not mensagem.get('more_body'):
+                break
+        instancia = WsgiToAsgiInstance(self.flask_app.wsgi_app)
+        instancia.scope = scope
+        environ = instancia.build_environ(scope, io.BytesIO(bytes(corpo)))
+        environ[pc_teacher.ROTA_ASYNC] = True
+
+        flask_app = self.flask_app
+        ctx = flask_app.request_context(environ)
+        erro = None
+        try:
+            try:
+                ctx.push()
+                resposta = await self._despachar(view)
+            except Exception as e:
+                erro = e
+                resposta = flask_app.handle_exception(e)
+            status, cabecalhos, partes = _executar_resposta(resposta, environ)
+        finally:
+            if erro is not None and flask_app.should_ignore_error(erro):
+                erro = None
+            ctx.pop(erro)
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': partes})
+
+    async def _despachar(self, view):
+        """Flask.full_dispatch_request, com a view aguardada no loop em vez de ensure_sync."""
+        flask_app = self.flask_app
+        try:
+            request_started.send(flask_app, _async_wrapper=flask_app.ensure_sync)
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                if request.routing_exception is not None:
+                    flask_app.raise_routing_exception(request)
+                rv = await view(**request.view_args)
+        except Exception as e:
+            rv = flask_app.handle_user_exception(e)
+        return flask_app.finalize_request(rv)
+
+
+def _executar_resposta(resposta, environ):
+    """(status, cabeçalhos ASGI, corpo) da resposta do Flask, pelo protocolo WSGI."""
+    inicio = {}
+
+    def start_response(status, cabecalhos, exc_info=None):
+        inicio['status'] = int(status.split(' ', 1)[0])
+        inicio['cabecalhos'] = [(nome.lower().encode('latin1'), valor.encode('latin1')) for nome, valor in cabecalhos]
+
+    iteravel = resposta(environ, start_response)
+    try:
+        corpo = b''.join(iteravel)
+    finally:
+        if hasattr(iteravel, 'close'):
+            iteravel.close()
+    return inicio['status'], inicio['cabecalhos'], corpo
+
+
+app = AdaptadorAsgi(pc_teacher.app, pc_teacher.rotas_async(), threads=pc_teacher.app.config['ASGI_THREADS'])
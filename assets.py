@@ -0,0 +1,170 @@
+"""Pipeline dos arquivos estáticos: nomes com hash do conteúdo, variantes
+pré-comprimidas (gzip/brotli) e WebP, servidos com cache imutável.
+
+O build (`flask construir-assets`) copia cada arquivo de static/ para
+static/dist/ com o hash no nome (css/home.css -> dist/css/home.3f9c1a2b7d.css)
+e grava static/dist/manifest.json. Em tempo de execução, url_for('static', ...)
+passa a apontar para a versão com hash, e a view de estáticos escolhe a
+variante .br/.gz/.webp conforme os cabeçalhos Accept do navegador. Sem
+manifest (ex.: em desenvolvimento) tudo funciona como antes.
+
+brotli e Pillow são opcionais e ficam fora do requirements.txt (ver
+requirements-assets.txt): sem eles o build gera só gzip e as imagens originais.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PASTA_DIST = 'dist'
+COMPRIMIVEIS = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+IMAGENS_WEBP = {'.png', '.jpg', '.jpeg'}
+# Variantes menores que isto não compensam o cabeçalho Content-Encoding
+TAMANHO_MINIMO = 512
+UM_ANO = 365 * 24 * 3600
+
+
+def _hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(65536), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:10]
+
+
+def _gravar_se_menor(destino, dados, tamanho_original):
+    if len(dados) < tamanho_original * 0.9:
+        with open(destino, 'wb') as arquivo:
+            arquivo.write(dados)
+        return True
+    return False
+
+
+def construir_assets(pasta_static, relatorio=print):
+    """Gera static/dist/ e o manifest. Retorna o manifest ({original: {...}})."""
+    pasta_dist = os.path.join(pasta_static, PASTA_DIST)
+    # Build do zero: hashes antigos não ficam para trás ocupando espaço no deploy
+    shutil.rmtree(pasta_dist, ignore_errors=True)
+
+    manifest = {}
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        if os.path.abspath(raiz) == os.path.abspath(pasta_static):
+            pastas[:] = [p for p in pastas if p != PASTA_DIST]
+        for nome in sorted(arquivos):
+            origem = os.path.join(raiz, nome)
+            relativo = os.path.relpath(origem, pasta_static).replace(os.sep, '/')
+            base, extensao = os.path.splitext(relativo)
+            extensao = extensao.lower()
+            com_hash = f'{base}.{_hash_arquivo(origem)}{extensao}'
+            destino = os.path.join(pasta_dist, com_hash)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copyfile(origem, destino)
+
+            tamanho = os.path.getsize(origem)
+            entrada = {'arquivo': f'{PASTA_DIST}/{com_hash}', 'tamanho': tamanho, 'variantes': []}
+
+            if extensao in COMPRIMIVEIS and tamanho >= TAMANHO_MINIMO:
+                with open(origem, 'rb') as arquivo:
+                    dados = arquivo.read()
+                if _gravar_se_menor(destino + '.gz', gzip.compress(dados, compresslevel=9, mtime=0), tamanho):
+                    entrada['variantes'].append('gz')
+                if brotli and _gravar_se_menor(destino + '.br', brotli.compress(dados, quality=11), tamanho):
+                    entrada['variantes'].append('br')
+
+            if extensao in IMAGENS_WEBP and Image:
+                with Image.open(origem) as imagem:
+                    imagem.save(destino + '.webp', 'WEBP', quality=80, method=6)
+                if os.path.getsize(destino + '.webp') < tamanho * 0.9:
+                    entrada['variantes'].append('webp')
+                else:
+                    os.remove(destino + '.webp')
+
+            manifest[relativo] = entrada
+
+    with open(os.path.join(pasta_dist, 'manifest.json'), 'w') as arquivo:
+        json.dump(manifest, arquivo, indent=2, sort_keys=True)
+
+    if not brotli:
+        relatorio('AVISO: módulo brotli não instalado (requirements-assets.txt); só variantes gzip foram geradas.')
+    if not Image:
+        relatorio('AVISO: Pillow não instalado (requirements-assets.txt); variantes WebP não foram geradas.')
+    return manifest
+
+
+class AssetPipeline:
+    """Liga o manifest ao app: reescreve url_for('static') e serve as variantes."""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self._por_arquivo = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.carregar()
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self.servir
+
+    def carregar(self):
+        caminho = os.path.join(self.app.static_folder, PASTA_DIST, 'manifest.json')
+        if os.path.exists(caminho):
+            with open(caminho) as arquivo:
+                self.manifest = json.load(arquivo)
+        else:
+            self.manifest = {}
+        self._por_arquivo = {entrada['arquivo']: entrada for entrada in self.manifest.values()}
+
+    def _url_defaults(self, endpoint, values):
+        # Este é o "override" do url_for: só muda o filename dos estáticos conhecidos
+        if endpoint == 'static' and 'filename' in values:
+            entrada = self.manifest.get(values['filename'])
+            if entrada:
+                values['filename'] = entrada['arquivo']
+
+    def servir(self, filename):
+        entrada = self._por_arquivo.get(filename)
+        if entrada is None:
+            return self.app.send_static_file(filename)
+
+        variantes = entrada['variantes']
+        aceita_encoding = request.headers.get('Accept-Encoding', '')
+        arquivo, encoding, vary = filename, None, []
+        if 'webp' in variantes:
+            vary.append('Accept')
+            if 'image/webp' in request.headers.get('Accept', ''):
+                arquivo = filename + '.webp'
+        if 'br' in variantes or 'gz' in variantes:
+            vary.append('Accept-Encoding')
+            if 'br' in variantes and 'br' in aceita_encoding:
+                arquivo, encoding = filename + '.br', 'br'
+            elif 'gz' in variantes and 'gzip' in aceita_encoding:
+                arquivo, encoding = filename + '.gz', 'gzip'
+
+        response = send_from_directory(self.app.static_folder, arquivo, max_age=UM_ANO, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Disposition', None)
+            # O tipo é o do arquivo original, não o do .gz/.br
+            response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        elif arquivo.endswith('.webp'):
+            response.mimetype = 'image/webp'
+        if vary:
+            response.vary.update(vary)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
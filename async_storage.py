@@ -0,0 +1,87 @@
+"""Versões assíncronas (Firestore AsyncClient) das leituras e escritas das rotas
+que asgi.py atende como corrotinas (STORAGE_BACKEND=firestore-async).
+
+Enquanto uma dessas rotas espera o Firestore, o event loop do worker atende
+outras requisições: nenhuma thread fica presa na espera. O resto do app (rotas
+síncronas, jobs, comandos) continua no cliente síncrono `db`, pelos métodos
+herdados de FirestoreStorage, e grava nos mesmos documentos.
+"""
+import asyncio
+
+from progress import ler_progresso
+from storage import (FirestoreStorage, _chaves_respostas, _dados_progresso, _respostas_dos_documentos,
+                     _separar_portfolio)
+
+
+class AsyncFirestoreStorage(FirestoreStorage):
+    def __init__(self, db, criar_cliente_async, email_fallback_legado=True):
+        super().__init__(db, email_fallback_legado=email_fallback_legado)
+        self._criar_cliente_async = criar_cliente_async
+        self._loop = None
+        self._cliente = None
+
+    def cliente_async(self):
+        """AsyncClient do event loop atual. O cliente (gRPC aio) fica preso ao loop em que foi
+           criado: um loop novo (outro worker, outro asyncio.run) ganha um cliente novo."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._cliente = self._criar_cliente_async()
+            self._loop = loop
+        return self._cliente
+
+    async def get_documentos_async(self, *chaves):
+        """get_documentos pelo AsyncClient: todos os documentos em um único get_all."""
+        if not chaves:
+            return []
+        cliente = self.cliente_async()
+        refs = [cliente.collection(colecao).document(str(doc_id)) for colecao, doc_id in chaves]
+        docs_por_caminho = {}
+        async for doc in cliente.get_all(refs):
+            if doc.exists:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                docs_por_caminho[doc.reference.path] = data
+        return [docs_por_caminho.get(ref.path) for ref in refs]
+
+    async def get_usuario_e_progresso_async(self, user_id):
+        usuario, progresso = await self.get_documentos_async(('usuarios', user_id), ('progresso', user_id))
+        return usuario, ler_progresso(progresso)
+
+    async def get_respostas_async(self, user_id, slugs):
+        docs = await self.get_documentos_async(*_chaves_respostas(user_id, slugs))
+        return _respostas_dos_documentos(slugs, docs)
+
+    async def carregar_pagina_async(self, user_id, slugs_respostas=(), portfolio=False):
+        """carregar_pagina (sempre com usuário e progresso) em um único get_all."""
+        usuario, progresso, *docs = await self.get_documentos_async(
+            ('usuarios', user_id), ('progresso', user_id), *_chaves_respostas(user_id, slugs_respostas, portfolio)
+        )
+        if not portfolio:
+            return usuario, ler_progresso(progresso), _respostas_dos_documentos(slugs_respostas, docs)
+        salvas, faltando = _separar_portfolio(docs[0], slugs_respostas)
+        if faltando:
+            salvas = {**(await self.get_respostas_async(user_id, faltando)), **salvas}
+        return usuario, ler_progresso(progresso), salvas
+
+    async def atualizar_progresso_async(self, user_id, incrementos=None, valores=None):
+        update_data = _dados_progresso(incrementos, valores)
+        if update_data:
+            await self.cliente_async().collection('progresso').document(user_id).update(update_data)
+
+    async def atualizar_progresso_com_anterior_async(self, user_id, modulo_slug, incrementos=None, valores=None,
+                                                     tentativas=5):
+        """atualizar_progresso_com_anterior pelo AsyncClient (mesma pré-condição e novas tentativas)."""
+        from google.api_core.exceptions import FailedPrecondition
+
+        cliente = self.cliente_async()
+        referencia = cliente.collection('progresso').document(user_id)
+        update_data = _dados_progresso(incrementos, valores)
+        for tentativa in range(tentativas):
+            snapshot = await referencia.get()
+            anterior = (ler_progresso(snapshot.to_dict()) or {}).get(modulo_slug) or {}
+            try:
+                await referencia.update(update_data, option=cliente.write_option(last_update_time=snapshot.update_time))
+                return anterior
+            except FailedPrecondition:
+                if tentativa == tentativas - 1:
+                    raise
@@ -0,0 +1,157 @@
+"""Requisições por segundo de um worker: views síncronas (WSGI) x modo assíncrono (asgi.py).
+
+Uso (na raiz do projeto, com requirements-asgi.txt instalado):
+    python benchmarks/bench_async.py [--professores 200] [--latencia-ms 20] [--segundos 3]
+
+Tudo roda em um processo, que faz o papel de um worker, sobre o Firestore em
+memória do loadtest.py com `--latencia-ms` por chamada. A carga é a de uma
+turma fazendo os exercícios: cada iteração abre /conteudo/<slug> e envia
+uma resposta (errada, para toda submissão gravar) em /submeter-exercicio.
+
+    sync      N threads chamando o app WSGI, como um worker gthread
+              (--threads N; 1 thread = worker sync do gunicorn)
+    async     o AdaptadorAsgi de asgi.py com STORAGE_BACKEND=firestore-async:
+              C requisições em andamento no mesmo event loop
+
+O HTTP em si (gunicorn/uvicorn) fica de fora nos dois casos: só o app e a
+espera pelo Firestore entram na conta.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import pc_teacher, preparar_banco  # noqa: E402
+
+from asgi import AdaptadorAsgi  # noqa: E402
+from async_storage import AsyncFirestoreStorage  # noqa: E402
+from fake_firestore import FakeAsyncFirestore  # noqa: E402
+from storage import FirestoreStorage  # noqa: E402
+
+SLUGS = [m['slug'] for m in pc_teacher.MODULO_CONFIG]
+
+
+def roteiro(rng, professores):
+    """(quem abre a página, slug, quem responde, questão, resposta errada) de uma iteração.
+       Professores pares concluíram o curso (ver preparar_banco): todas as páginas abrem.
+       Os ímpares não concluíram nada, e com respostas erradas toda submissão grava."""
+    leitor = rng.randrange(0, professores, 2)
+    autor = rng.randrange(1, professores, 2)
+    questao = rng.choice(pc_teacher.banco_questoes.do_modulo('introducao'))
+    errada = next(opcao['letra'] for opcao in questao['opcoes'] if not opcao['correta'])
+    return f'prof-{leitor:05d}', rng.choice(SLUGS), f'prof-{autor:05d}', questao['id'], errada
+
+
+def preparar(professores, latencia, assincrono):
+    fake = preparar_banco(professores, latencia)
+    pc_teacher.db = fake
+    pc_teacher.storage = (AsyncFirestoreStorage(fake, lambda: FakeAsyncFirestore(fake)) if assincrono
+                          else FirestoreStorage(fake))
+    pc_teacher.usuario_cache.clear()
+    return fake
+
+
+def cookie(user_id):
+    serializador = pc_teacher.app.session_interface.get_signing_serializer(pc_teacher.app)
+    return f"{pc_teacher.app.config['SESSION_COOKIE_NAME']}={serializador.dumps({'usuario_id': user_id})}"
+
+
+def rodar_sync(professores, latencia, threads, segundos):
+    preparar(professores, latencia, assincrono=False)
+    contagem = [0] * threads
+    fim = time.perf_counter() + segundos
+    barreira = threading.Barrier(threads)
+
+    def thread(indice):
+        rng = random.Random(indice)
+        cliente = pc_teacher.app.test_client(use_cookies=False)
+        barreira.wait()
+        while time.perf_counter() < fim:
+            leitor, slug, autor, questao_id, resposta = roteiro(rng, professores)
+            assert cliente.get(f'/conteudo/{slug}', headers={'Cookie': cookie(leitor)}).status_code == 200
+            assert cliente.post('/submeter-exercicio/introducao', headers={'Cookie': cookie(autor)},
+                                json={'questao_id': questao_id, 'resposta': resposta}).status_code == 200
+            contagem[indice] += 2
+
+    inicio = time.perf_counter()
+    pool = [threading.Thread(target=thread, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(contagem) / (time.perf_counter() - inicio)
+
+
+async def requisitar(adaptador, metodo, caminho, cookie_sessao, corpo=b''):
+    cabecalhos = [(b'host', b'localhost'), (b'cookie', cookie_sessao.encode())]
+    if corpo:
+        cabecalhos += [(b'content-type', b'application/json'), (b'content-length', str(len(corpo)).encode())]
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo,
+             'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'',
+             'root_path': '', 'headers': cabecalhos, 'server': ('localhost', 80), 'client': ('127.0.0.1', 5000)}
+    mensagens = [{'type': 'http.request', 'body': corpo, 'more_body': False}]
+    status = []
+
+    async def receive():
+        return mensagens.pop(0) if mensagens else {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+
+    await adaptador(scope, receive, send)
+    return status[0]
+
+
+def rodar_async(professores, latencia, em_andamento, segundos):
+    preparar(professores, latencia, assincrono=True)
+    adaptador = AdaptadorAsgi(pc_teacher.app, pc_teacher.rotas_async())
+    assert set(adaptador.rotas_async) == {'conteudo_dinamico', 'submeter_exercicio'}
+    contagem = [0] * em_andamento
+
+    async def cliente(indice, fim):
+        rng = random.Random(indice)
+        while time.perf_counter() < fim:
+            leitor, slug, autor, questao_id, resposta = roteiro(rng, professores)
+            assert await requisitar(adaptador, 'GET', f'/conteudo/{slug}', cookie(leitor)) == 200
+            corpo = json.dumps({'questao_id': questao_id, 'resposta': resposta}).encode()
+            assert await requisitar(adaptador, 'POST', '/submeter-exercicio/introducao', cookie(autor), corpo) == 200
+            contagem[indice] += 2
+
+    async def todos():
+        fim = time.perf_counter() + segundos
+        await asyncio.gather(*(cliente(i, fim) for i in range(em_andamento)))
+
+    inicio = time.perf_counter()
+    asyncio.run(todos())
+    adaptador.executor.shutdown()
+    return sum(contagem) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--professores', type=int, default=200)
+    parser.add_argument('--latencia-ms', type=float, default=20.0, help='Latência por chamada ao Firestore.')
+    parser.add_argument('--segundos', type=float, default=3.0, help='Duração de cada medição.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--em-andamento', type=int, nargs='+', default=[8, 32, 128])
+    args = parser.parse_args()
+    latencia = args.latencia_ms / 1000
+
+    print(f'{args.professores} professores, latência do Firestore {args.latencia_ms} ms por chamada, '
+          f'{args.segundos:.0f} s por medição\n')
+    for threads in args.threads:
+        print(f'sync   {threads:4d} threads       {rodar_sync(args.professores, latencia, threads, args.segundos):8.1f} req/s')
+    for em_andamento in args.em_andamento:
+        print(f'async  {em_andamento:4d} em andamento   '
+              f'{rodar_async(args.professores, latencia, em_andamento, args.segundos):8.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Logins por segundo sob rajada: verificação na thread x PasswordPool.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_login.py [logins_simultaneos] [workers_do_pool ...]
+
+Simula um worker gthread recebendo `logins_simultaneos` logins ao mesmo tempo
+(padrão 40, uma turma entrando junto) enquanto outra thread atende uma rota
+leve em loop. Para cada configuração mostra logins/s, logins/s por núcleo
+usado e o p95 da rota leve durante a rajada: com o hash na thread, o GIL
+faz a rota leve esperar pelos KDFs.
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from password_pool import PasswordPool  # noqa: E402
+
+SENHA = 'senha-do-professor'
+
+
+def rota_leve():
+    # Algo do tamanho de um render pequeno: só CPU em Python, sem I/O
+    return sum(i * i for i in range(2000))
+
+
+def rodar(nome, senhas, senha_hash, logins):
+    barreira = threading.Barrier(logins + 1)
+    fim = threading.Event()
+    latencias_leves = []
+
+    def login():
+        barreira.wait()
+        assert senhas.verificar(senha_hash, SENHA)
+
+    def outra_rota():
+        barreira.wait()
+        while not fim.is_set():
+            inicio = time.perf_counter()
+            rota_leve()
+            latencias_leves.append(time.perf_counter() - inicio)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    leve = threading.Thread(target=outra_rota)
+    leve.start()
+    for thread in threads:
+        thread.start()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    fim.set()
+    leve.join()
+
+    if nome is None:
+        return
+    nucleos = min(max(senhas.workers, 1), os.cpu_count() or 1)
+    latencias_leves.sort()
+    p95 = latencias_leves[max(int(len(latencias_leves) * 0.95) - 1, 0)] * 1000
+    print(f'{nome:18s} {logins / duracao:7.1f} logins/s  {logins / duracao / nucleos:6.1f} por núcleo  '
+          f'rota leve p50 {statistics.median(latencias_leves) * 1000:6.2f} ms  p95 {p95:6.2f} ms')
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    configuracoes = [int(n) for n in sys.argv[2:]] or [0, 1, 2, os.cpu_count() or 1]
+
+    senha_hash = generate_password_hash(SENHA)
+    print(f'{logins} logins simultâneos, {os.cpu_count()} CPUs, hash {senha_hash.split("$")[0]}')
+    for workers in dict.fromkeys(configuracoes):
+        senhas = PasswordPool(workers=workers, fila=logins, timeout=120)
+        if workers:
+            # Sobe os processos antes de medir (o spawn acontece uma vez por worker do gunicorn)
+            rodar(None, senhas, senha_hash, workers)
+        rodar('na thread' if workers == 0 else f'pool de {workers}', senhas, senha_hash, logins)
+
+
+if __name__ == '__main__':
+    main()
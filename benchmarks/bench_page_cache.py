@@ -0,0 +1,92 @@
+"""Tempo de app da página inicial com e sem o cache de páginas públicas.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_page_cache.py [requisicoes]
+
+Monta um app Flask mínimo com os templates do projeto (as rotas citadas nos
+templates viram stubs; as páginas públicas renderizam de verdade) e mede,
+por chamada WSGI direta (sem servidor), o tempo de app de '/' para: render sem cache,
+acerto no LRU em memória, acerto no disco (memória fria, como outro worker
+do gunicorn), revalidação com If-None-Match (304) e visitante logado, que
+passa direto pela view.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from flask import Flask, render_template  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from page_cache import CachePaginas, versao_templates  # noqa: E402
+
+PAGINAS = {
+    'index': ('/', 'index.html'),
+    'dashboard': ('/dashboard', 'dashboard.html'),
+    'infor_curso_decomposicao': ('/infor-curso-decomposicao', 'infor-curso-decomposicao.html'),
+    'infor_curso_rec_padrao': ('/infor-curso-rec-padrao', 'infor-curso-rec-padrao.html'),
+    'infor_curso_abstracao': ('/infor-curso-abstracao', 'infor-curso-abstracao.html'),
+    'infor_curso_algoritmo': ('/infor-curso-algoritmo', 'infor-curso-algoritmo.html'),
+}
+
+
+def criar_app(cache=None):
+    app = Flask('bench', template_folder=os.path.join(RAIZ, 'templates'), static_folder=os.path.join(RAIZ, 'static'))
+    app.config['SECRET_KEY'] = 'bench'
+    for rota in ['cadastro', 'certificado', 'login', 'logout', 'modulos', 'perfil', 'progresso']:
+        app.add_url_rule(f'/{rota}', rota, lambda: '')
+    for endpoint, (caminho, template) in PAGINAS.items():
+        app.add_url_rule(caminho, endpoint, lambda template=template: render_template(template, user=None))
+    if cache is not None:
+        cache.init_app(app, PAGINAS)
+    return app
+
+
+def medir(app, requisicoes, preparar=None, headers=None):
+    environ = EnvironBuilder('/', headers=headers).get_environ()
+    status = []
+
+    def start_response(linha_status, cabecalhos):
+        status[:] = [linha_status.split()[0]]
+
+    amostras = []
+    for _ in range(requisicoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        corpo = b''.join(app.wsgi_app(dict(environ), start_response))
+        amostras.append(time.perf_counter() - inicio)
+    return amostras, status[0], corpo
+
+
+def mostrar(nome, amostras, status, corpo):
+    amostras.sort()
+    p95 = amostras[max(int(len(amostras) * 0.95) - 1, 0)]
+    print(f'{nome:22s} {status}  p50 {statistics.median(amostras) * 1000:7.3f} ms  '
+          f'p95 {p95 * 1000:7.3f} ms  ({len(corpo)} bytes)')
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    versao = versao_templates(os.path.join(RAIZ, 'templates'))
+
+    mostrar('sem cache', *medir(criar_app(), requisicoes))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        cache = CachePaginas(versao, pasta=pasta)
+        app = criar_app(cache)
+        etag = app.test_client().get('/').headers['ETag']
+        mostrar('cache em memória', *medir(app, requisicoes))
+        mostrar('If-None-Match (304)', *medir(app, requisicoes, headers={'If-None-Match': etag}))
+        mostrar('cache em disco', *medir(app, requisicoes, preparar=cache.memoria.clear))
+
+        cookie = app.session_interface.get_signing_serializer(app).dumps({'usuario_id': 'u1'})
+        mostrar('logado (sem cache)', *medir(app, requisicoes, headers={'Cookie': f'session={cookie}'}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Micro-benchmark de calculate_progress: implementação antiga x ProgressEngine.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_progress.py [quantidade_de_progressos]
+
+Gera milhares de documentos 'progresso' sintéticos no formato do Firestore e
+mede o custo por chamada da versão que percorria MODULO_CONFIG a cada
+requisição e da versão pré-compilada/memorizada.
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress import ProgressEngine  # noqa: E402
+
+# Mesma forma de MODULO_CONFIG em app.py (5 módulos com exercícios + Projeto Final)
+SLUGS = ['introducao', 'decomposicao', 'rec-padrao', 'abstracao', 'algoritmo', 'projeto-final']
+MODULO_CONFIG = [
+    {
+        'title': f'{i + 1}. Módulo {slug}',
+        'slug': slug,
+        'order': i + 1,
+        'description': 'x' * 80,
+        'lessons': 1,
+        'exercises': 0 if slug == 'projeto-final' else 5,
+        'dependency_field': SLUGS[i - 1] if i else None,
+        'min_acertos_para_desbloqueio': 0 if slug == 'projeto-final' else 3,
+    }
+    for i, slug in enumerate(SLUGS)
+]
+
+
+def calculate_progress_antigo(progresso_db):
+    """Versão anterior: recalcula totais e reconstrói tudo a cada chamada."""
+    total_modules = len(MODULO_CONFIG)
+    completed_modules = 0
+    total_lessons = sum(m['lessons'] for m in MODULO_CONFIG)
+    total_exercises = sum(m['exercises'] for m in MODULO_CONFIG)
+    completed_lessons = 0
+    completed_exercises = 0
+    total_acertos = 0
+    total_erros = 0
+    dynamic_modules = []
+    last_module_was_completed = True
+
+    for module_config in MODULO_CONFIG:
+        slug = module_config['slug']
+        module_progress = progresso_db.get(slug, {'acertos': 0, 'erros': 0, 'concluido': False})
+        is_completed = module_progress.get('concluido', False)
+        acertos = module_progress.get('acertos', 0)
+        erros = module_progress.get('erros', 0)
+        if module_config['order'] == 1:
+            is_unlocked = True
+        else:
+            is_unlocked = last_module_was_completed
+        total_acertos += acertos
+        total_erros += erros
+        if is_completed:
+            completed_modules += 1
+            completed_lessons += module_config['lessons']
+            completed_exercises += module_config['exercises']
+        dynamic_modules.append({
+            'title': module_config['title'],
+            'description': module_config['description'],
+            'slug': slug,
+            'order': module_config['order'],
+            'is_unlocked': is_unlocked,
+            'is_completed': is_completed,
+            'lessons': module_config['lessons'],
+            'exercises': module_config['exercises'],
+            'min_acertos': module_config['min_acertos_para_desbloqueio'],
+            'acertos': acertos,
+            'erros': erros,
+            'exercises_done': acertos + erros,
+        })
+        last_module_was_completed = is_completed
+
+    return {
+        'overall_percent': int((completed_modules / total_modules) * 100) if total_modules > 0 else 0,
+        'completed_modules': completed_modules,
+        'total_modules': total_modules,
+        'completed_lessons': completed_lessons,
+        'total_lessons': total_lessons,
+        'completed_exercises': completed_exercises,
+        'total_acertos': total_acertos,
+        'total_erros': total_erros,
+        'total_exercises': total_exercises,
+        'modules': dynamic_modules,
+    }
+
+
+def progresso_sintetico(rng):
+    """Um aluno que avançou até um módulo aleatório, com acertos/erros plausíveis."""
+    atual = rng.randrange(len(SLUGS) + 1)
+    doc = {'id': f'uid{rng.randrange(10 ** 9)}', 'introducao_concluido': False}
+    for i, slug in enumerate(SLUGS):
+        if slug == 'projeto-final':
+            doc[slug] = {'concluido': i < atual}
+        elif i < atual:
+            doc[slug] = {'acertos': 3, 'erros': rng.randrange(3), 'concluido': True}
+        elif i == atual:
+            doc[slug] = {'acertos': rng.randrange(3), 'erros': rng.randrange(4), 'concluido': False}
+        else:
+            doc[slug] = {'acertos': 0, 'erros': 0, 'concluido': False}
+    return doc
+
+
+def medir(func, docs, repeticoes=5):
+    def rodada():
+        for doc in docs:
+            func(doc)
+    melhor = min(timeit.repeat(rodada, number=1, repeat=repeticoes))
+    return melhor / len(docs) * 1e6
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    docs = [progresso_sintetico(rng) for _ in range(quantidade)]
+
+    engine = ProgressEngine(MODULO_CONFIG)
+    for doc in docs:
+        assert engine.calculate(doc) == calculate_progress_antigo(doc)
+
+    antigo = medir(calculate_progress_antigo, docs)
+    sem_memo = medir(lambda doc: engine._calcular(engine.fingerprint(doc)), docs)
+    novo = medir(engine.calculate, docs)
+
+    print(f'{quantidade} documentos sintéticos, {engine.cache_info().currsize} estados distintos')
+    print(f'  antigo (recalcula tudo)   : {antigo:7.2f} us/chamada')
+    print(f'  pré-compilado, sem memo   : {sem_memo:7.2f} us/chamada')
+    print(f'  pré-compilado + memo      : {novo:7.2f} us/chamada  ({antigo / novo:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
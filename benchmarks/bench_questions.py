@@ -0,0 +1,94 @@
+"""Banco de questões: carga e correção com milhares de questões.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_questions.py [quantidade_de_questoes] [respostas_corrigidas]
+
+Gera um banco sintético (5 opções por questão, espalhado pelos módulos), grava
+em JSON num diretório temporário e mede a carga completa (leitura, validação e
+pré-compilação do gabarito). Depois corrige respostas sorteadas (letra, número
+ou texto da opção) com BancoDeQuestoes.corrigir e com uma busca linear pelas
+questões e opções, como seria sem o índice.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_bank import LETRAS, BancoDeQuestoes, normalizar_resposta  # noqa: E402
+
+SLUGS = ['introducao', 'decomposicao', 'rec-padrao', 'abstracao', 'algoritmo', 'projeto-final']
+
+
+def banco_sintetico(quantidade):
+    modulos = {slug: [] for slug in SLUGS}
+    for n in range(quantidade):
+        slug = SLUGS[n % len(SLUGS)]
+        modulos[slug].append({
+            'id': f'{slug}-{len(modulos[slug]) + 1}',
+            'banca': 'BANCA - 2024',
+            'enunciado': f'Enunciado da questão {n} ' + 'x' * 200,
+            'opcoes': [
+                {'texto': f'Alternativa {letra} da questão {n} ' + 'y' * 80, 'feedback': 'z' * 120}
+                for letra in LETRAS[:5]
+            ],
+            'correta': random.choice(LETRAS[:5]),
+        })
+    return {'versao': 1, 'modulos': modulos}
+
+
+def corrigir_linear(dados, questao_id, resposta):
+    """Sem índice: procura a questão e depois a opção a cada resposta."""
+    chave = normalizar_resposta(resposta)
+    for questoes in dados['modulos'].values():
+        for questao in questoes:
+            if questao['id'] != questao_id:
+                continue
+            for posicao, (letra, opcao) in enumerate(zip(LETRAS, questao['opcoes']), start=1):
+                if chave in (normalizar_resposta(letra), str(posicao), normalizar_resposta(opcao['texto'])):
+                    return letra == questao['correta']
+            return None
+    return None
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    respostas = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    random.seed(42)
+
+    dados = banco_sintetico(quantidade)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'questoes.json')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False)
+        tamanho = os.path.getsize(caminho)
+
+        inicio = time.perf_counter()
+        banco = BancoDeQuestoes.carregar(caminho)
+        carga = time.perf_counter() - inicio
+    print(f'{len(banco)} questões ({tamanho / 1024:.0f} KB): carga em {carga * 1000:.1f} ms')
+
+    todas = [q for questoes in dados['modulos'].values() for q in questoes]
+    amostra = []
+    for questao in random.choices(todas, k=respostas):
+        posicao = random.randrange(5)
+        resposta = random.choice([LETRAS[posicao], str(posicao + 1), questao['opcoes'][posicao]['texto']])
+        amostra.append((questao['id'], resposta))
+
+    esperado = [corrigir_linear(dados, questao_id, resposta) for questao_id, resposta in amostra]
+    assert [banco.corrigir(questao_id, resposta) for questao_id, resposta in amostra] == esperado
+
+    for nome, funcao in [
+        ('busca linear', lambda: [corrigir_linear(dados, q, r) for q, r in amostra]),
+        ('banco indexado', lambda: [banco.corrigir(q, r) for q, r in amostra]),
+    ]:
+        melhor = min(timeit.repeat(funcao, number=1, repeat=3))
+        print(f'{nome:15s} {melhor / respostas * 1e6:9.2f} µs/resposta  ({respostas / melhor:,.0f} respostas/s)')
+
+
+if __name__ == '__main__':
+    main()
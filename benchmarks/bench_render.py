@@ -0,0 +1,127 @@
+"""Tempo de render das páginas /conteudo/<slug> com e sem cache de fragmentos.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_render.py [threads] [renders_por_thread]
+
+Monta um app Flask mínimo com os templates do projeto (as rotas citadas nos
+templates viram stubs) e renderiza os módulos em paralelo, como um worker
+com várias threads. Também mede o carregamento a frio dos templates com e
+sem o cache de bytecode em disco (equivalente ao primeiro hit após o
+reinício de um worker).
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from flask import Flask, render_template  # noqa: E402
+from jinja2 import FileSystemBytecodeCache  # noqa: E402
+
+from fragment_cache import FragmentCacheExtension, limpar_fragmentos  # noqa: E402
+from question_bank import BancoDeQuestoes  # noqa: E402
+
+MODULOS = [
+    ('introducao', 'conteudo-introducao.html'),
+    ('decomposicao', 'conteudo-decomposicao.html'),
+    ('rec-padrao', 'conteudo-rec-padrao.html'),
+    ('abstracao', 'conteudo-abstracao.html'),
+    ('algoritmo', 'conteudo-algoritmo.html'),
+    ('projeto-final', 'conteudo-projeto-final.html'),
+]
+USUARIO = {'id': 'u1', 'nome': 'Maria da Silva', 'email': 'maria@escola.exemplo'}
+RESPOSTAS_PROJETO = [
+    {'title': f'Módulo {i}', 'slug': slug, 'resposta': 'Resposta do projeto ' * 20, 'is_saved': True}
+    for i, (slug, _) in enumerate(MODULOS[:-1], start=1)
+]
+
+
+def criar_app(bytecode_dir=None):
+    app = Flask('bench', template_folder=os.path.join(RAIZ, 'templates'), static_folder=os.path.join(RAIZ, 'static'))
+    if bytecode_dir:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    # As questões dos módulos vêm do banco (templates/questoes-modulo.html), como em app.py
+    app.jinja_env.globals['banco_questoes'] = BancoDeQuestoes.carregar(os.path.join(RAIZ, 'data', 'questoes.json'))
+    for rota in ['perfil', 'modulos', 'progresso', 'certificado', 'logout', 'dashboard', 'index']:
+        app.add_url_rule(f'/{rota}', rota, lambda: '')
+    app.add_url_rule('/concluir-modulo/<modulo_nome>', 'concluir_modulo', lambda modulo_nome: '')
+    return app
+
+
+def renderizar(app, slug, template):
+    with app.test_request_context(f'/conteudo/{slug}'):
+        return render_template(
+            template, user=USUARIO, modulo={'slug': slug},
+            progresso_modulo={'acertos': 1, 'erros': 0, 'concluido': False}, min_acertos=3, resposta_anterior='',
+            respostas_projeto=RESPOSTAS_PROJETO,
+        )
+
+
+def medir_concorrencia(app, threads, renders):
+    amostras = []
+    lock = threading.Lock()
+    barreira = threading.Barrier(threads)
+
+    def trabalhador(numero):
+        locais = []
+        barreira.wait()
+        for i in range(renders):
+            slug, template = MODULOS[(numero + i) % len(MODULOS)]
+            inicio = time.perf_counter()
+            renderizar(app, slug, template)
+            locais.append(time.perf_counter() - inicio)
+        with lock:
+            amostras.extend(locais)
+
+    inicio = time.perf_counter()
+    lista = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    amostras.sort()
+    return (amostras[len(amostras) // 2] * 1000, amostras[int(len(amostras) * 0.99)] * 1000,
+            len(amostras) / duracao)
+
+
+def carga_a_frio(bytecode_dir):
+    app = criar_app(bytecode_dir)
+    inicio = time.perf_counter()
+    for _, template in MODULOS:
+        app.jinja_env.get_template(template)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    renders = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app = criar_app()
+    # Aquece o cache de templates compilados do Environment (não é o que está sendo medido)
+    app.jinja_env.fragmentos_ativos = False
+    for slug, template in MODULOS:
+        renderizar(app, slug, template)
+
+    print(f'{threads} threads x {renders} renders')
+    p50, p99, vazao = medir_concorrencia(app, threads, renders)
+    print(f'  sem cache de fragmentos   p50 {p50:6.2f} ms   p99 {p99:6.2f} ms   {vazao:8.0f} páginas/s')
+
+    app.jinja_env.fragmentos_ativos = True
+    limpar_fragmentos(app.jinja_env)
+    p50, p99, vazao = medir_concorrencia(app, threads, renders)
+    print(f'  com cache de fragmentos   p50 {p50:6.2f} ms   p99 {p99:6.2f} ms   {vazao:8.0f} páginas/s')
+
+    bytecode_dir = tempfile.mkdtemp()
+    sem_cache = carga_a_frio(None)
+    carga_a_frio(bytecode_dir)  # popula o cache em disco
+    com_cache = carga_a_frio(bytecode_dir)
+    print(f'  carga a frio dos templates: {sem_cache:.1f} ms sem bytecode cache, {com_cache:.1f} ms com')
+
+
+if __name__ == '__main__':
+    main()
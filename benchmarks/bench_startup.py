@@ -0,0 +1,67 @@
+"""Tempo do import do app até a primeira resposta, com e sem o Firebase carregado.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_startup.py [repeticoes]
+
+Cada medição roda em um processo Python novo (como um worker do gunicorn
+recém-criado): importa o app e atende GET / pelo test client. Compara
+FIREBASE_LAZY=1 (padrão: nada do Firebase no boot) com FIREBASE_LAZY=0
+(credenciais, initialize_app e cliente do Firestore no import) e mede à
+parte o custo de só importar os módulos do Firebase Admin SDK.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRIMEIRA_RESPOSTA = """
+import sys, time, json
+inicio = time.perf_counter()
+import app
+resposta = app.app.test_client().get('/')
+fim = time.perf_counter()
+print(json.dumps({'segundos': fim - inicio, 'status': resposta.status_code,
+                  'firebase_carregado': 'firebase_admin.firestore' in sys.modules}))
+"""
+
+SO_FIREBASE = """
+import time, json
+inicio = time.perf_counter()
+import firebase_admin.firestore, firebase_admin.auth
+print(json.dumps({'segundos': time.perf_counter() - inicio}))
+"""
+
+
+def medir(codigo, repeticoes, env_extra=None):
+    env = dict(os.environ, **(env_extra or {}))
+    resultados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, env=env,
+                               capture_output=True, text=True, check=True)
+        # O app imprime avisos (credenciais etc.): o resultado é a última linha
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    return resultados
+
+
+def resumo(nome, resultados):
+    tempos = sorted(r['segundos'] * 1000 for r in resultados)
+    extra = ''
+    if 'firebase_carregado' in resultados[0]:
+        extra = f"   firebase carregado: {'sim' if resultados[0]['firebase_carregado'] else 'não'}" \
+                f"   status: {resultados[0]['status']}"
+    print(f'  {nome:38s} mediana {statistics.median(tempos):7.1f} ms   mín {tempos[0]:7.1f} ms{extra}')
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{repeticoes} processos por medição')
+    resumo('import do Firebase Admin SDK', medir(SO_FIREBASE, repeticoes))
+    resumo('app -> 1ª resposta, FIREBASE_LAZY=1', medir(PRIMEIRA_RESPOSTA, repeticoes, {'FIREBASE_LAZY': '1'}))
+    resumo('app -> 1ª resposta, FIREBASE_LAZY=0', medir(PRIMEIRA_RESPOSTA, repeticoes, {'FIREBASE_LAZY': '0'}))
+
+
+if __name__ == '__main__':
+    main()
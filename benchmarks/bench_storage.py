@@ -0,0 +1,55 @@
+"""Latência das operações do storage SQLite (leituras e escritas locais).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_storage.py [usuarios] [caminho_do_banco]
+
+Cria um banco temporário com N professores e mede, por operação, a leitura
+usuário+progresso usada em toda página autenticada, a busca por e-mail do
+login e o incremento de uma submissão de exercício.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage  # noqa: E402
+
+SLUGS = ['introducao', 'decomposicao', 'rec-padrao', 'abstracao', 'algoritmo']
+
+
+def medir(nome, operacao, repeticoes):
+    amostras = []
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        operacao(i)
+        amostras.append(time.perf_counter() - inicio)
+    amostras.sort()
+    print(f'  {nome:28s} p50 {amostras[len(amostras) // 2] * 1e6:7.1f} us   '
+          f'p99 {amostras[int(len(amostras) * 0.99)] * 1e6:7.1f} us')
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    caminho = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), 'bench.db')
+    storage = SQLiteStorage(caminho)
+
+    for i in range(usuarios):
+        storage.criar_usuario(
+            f'u{i}',
+            {'nome': f'Professor(a) {i}', 'email': f'prof{i}@escola.br', 'senha_hash': 'x' * 100},
+            {slug: {'acertos': 0, 'erros': 0, 'concluido': False} for slug in SLUGS},
+        )
+
+    rng = random.Random(1)
+    print(f'SQLite WAL em {caminho} com {usuarios} usuários')
+    medir('get_usuario_e_progresso', lambda i: storage.get_usuario_e_progresso(f'u{rng.randrange(usuarios)}'), 20000)
+    medir('buscar_uid_por_email', lambda i: storage.buscar_uid_por_email(f'prof{rng.randrange(usuarios)}@escola.br'), 20000)
+    medir('atualizar_progresso', lambda i: storage.atualizar_progresso(
+        f'u{rng.randrange(usuarios)}', {f'{rng.choice(SLUGS)}.acertos': 1}), 5000)
+
+
+if __name__ == '__main__':
+    main()
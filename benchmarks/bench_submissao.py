@@ -0,0 +1,119 @@
+"""Benchmark das submissões de exercício: firestore.Increment x transação.
+
+Roda contra o emulador do Firestore (nunca contra produção):
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/bench_submissao.py \\
+        --usuarios 30 --threads 16 --submissoes 40
+
+Cada thread envia submissões para usuários sorteados. Com poucos usuários e
+muitas threads simula-se contenção (ex.: várias abas do mesmo professor).
+Ao final confere se os contadores gravados batem com o que foi enviado.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore  # noqa: E402
+
+from submission_tx import TransactionalSubmitter  # noqa: E402
+
+SLUG = 'introducao'
+# Alto o bastante para o módulo não ser concluído no meio da medição
+MIN_ACERTOS = 10 ** 9
+
+
+def preparar(db, usuarios):
+    batch = db.batch()
+    for i in range(usuarios):
+        batch.set(db.collection('progresso').document(f'bench-{i}'),
+                  {SLUG: {'acertos': 0, 'erros': 0, 'concluido': False}})
+    batch.commit()
+
+
+def via_increment(db, user_id, is_correct):
+    campo = f'{SLUG}.acertos' if is_correct else f'{SLUG}.erros'
+    db.collection('progresso').document(user_id).update({campo: firestore.Increment(1)})
+
+
+def rodar(nome, submeter, usuarios, threads, submissoes):
+    latencias = []
+    enviados = {}
+    lock = threading.Lock()
+
+    def trabalhador(semente):
+        rng = random.Random(semente)
+        for _ in range(submissoes):
+            user_id = f'bench-{rng.randrange(usuarios)}'
+            is_correct = rng.random() < 0.6
+            inicio = time.perf_counter()
+            submeter(user_id, is_correct)
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+                a, e = enviados.get(user_id, (0, 0))
+                enviados[user_id] = (a + is_correct, e + (not is_correct))
+
+    inicio = time.perf_counter()
+    pool = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    total = len(latencias)
+    print(f'{nome:12s} {total / duracao:8.1f} submissões/s  '
+          f'p50 {statistics.median(latencias) * 1000:6.1f} ms  '
+          f'p95 {latencias[int(total * 0.95) - 1] * 1000:6.1f} ms')
+    return enviados
+
+
+def conferir(db, enviados):
+    divergentes = 0
+    for user_id, (acertos, erros) in enviados.items():
+        modulo = db.collection('progresso').document(user_id).get().to_dict()[SLUG]
+        if (modulo['acertos'], modulo['erros']) != (acertos, erros):
+            divergentes += 1
+    return divergentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=30)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--submissoes', type=int, default=40, help='submissões por thread')
+    parser.add_argument('--max-attempts', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        sys.exit('Defina FIRESTORE_EMULATOR_HOST: este benchmark só roda contra o emulador.')
+
+    db = firestore.Client(project=os.environ.get('GCLOUD_PROJECT', 'demo-pcteacher'))
+
+    preparar(db, args.usuarios)
+    enviados = rodar('increment', lambda uid, ok: via_increment(db, uid, ok),
+                     args.usuarios, args.threads, args.submissoes)
+    print(f'{"":12s} usuários com contadores divergentes: {conferir(db, enviados)}')
+
+    preparar(db, args.usuarios)
+    submitter = TransactionalSubmitter(db, max_attempts=args.max_attempts)
+
+    def via_transacao(uid, ok):
+        try:
+            submitter.submeter(uid, SLUG, ok, MIN_ACERTOS)
+        except ValueError:
+            pass  # retentativas esgotadas: contabilizado em metricas['falhas']
+
+    enviados = rodar('transaction', via_transacao, args.usuarios, args.threads, args.submissoes)
+    print(f'{"":12s} métricas de contenção: {submitter.metricas}')
+    print(f'{"":12s} usuários com contadores divergentes (inclui falhas): {conferir(db, enviados)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Teste de carga das rotas do PC Teacher com um Firestore em memória.
+
+Uso (na raiz do projeto):
+    python benchmarks/loadtest.py [--professores 60] [--latencia-ms 8] [--cenario login ...]
+    python benchmarks/loadtest.py --salvar-baseline      # grava benchmarks/baselines.json
+    python benchmarks/loadtest.py --estrito              # sai com erro se houver regressão
+
+Roda o app Flask pelo test client, trocando o banco por fake_firestore com
+latência por chamada (simula a ida e volta da rede até o Firestore). Cada
+cenário reproduz um momento de sala de aula, com uma thread por professor:
+
+    login        todos os professores entram ao mesmo tempo
+    navegacao    dashboard, módulos, progresso e o conteúdo de cada módulo
+    submissoes   rajada de respostas de exercícios no mesmo módulo
+    certificados download do PDF por quem concluiu o curso
+
+Para cada rota são reportados p50/p95/p99, requisições por segundo e chamadas
+ao Firestore por requisição. Os números são comparados com baselines.json;
+p95 mais de --tolerancia acima da baseline, ou mais chamadas por requisição,
+contam como regressão.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# O storage padrão é trocado pelo fake depois do import; sqlite evita tocar no Firestore real
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'loadtest.db'))
+os.environ.setdefault('CERTIFICADOS_DIR', tempfile.mkdtemp())
+# Todos os professores saem do mesmo IP (o test client): sem limite de tentativas de login
+os.environ.setdefault('LOGIN_THROTTLE_IP_BURST', '0')
+os.environ.setdefault('LOGIN_THROTTLE_EMAIL_BURST', '0')
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app as pc_teacher  # noqa: E402
+from fake_firestore import FakeFirestore  # noqa: E402
+from storage import FirestoreStorage  # noqa: E402
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SENHA = 'senha-de-teste'
+CENARIOS = ['login', 'navegacao', 'submissoes', 'certificados']
+
+
+def preparar_banco(professores, latencia):
+    """Popula o fake com professores: metade com o curso concluído, metade no início."""
+    fake = FakeFirestore()
+    # Mesmo hash para todos: o custo do login é o real, o setup não
+    senha_hash = generate_password_hash(SENHA)
+    for i in range(professores):
+        user_id = f'prof-{i:05d}'
+        email = f'prof{i}@escola.exemplo'
+        concluido = i % 2 == 0
+        fake.collection('usuarios').document(user_id).set({
+            'nome': f'Professor(a) {i}', 'email': email, 'senha_hash': senha_hash,
+        })
+        fake.collection('emails').document(email).set({'usuario_id': user_id})
+        fake.collection('progresso').document(user_id).set({
+            m['slug']: {
+                'acertos': m['min_acertos_para_desbloqueio'] if concluido else 0,
+                'erros': 0,
+                'concluido': concluido,
+            }
+            for m in pc_teacher.MODULO_CONFIG
+        })
+    fake.latencia = latencia
+    fake.chamadas.clear()
+    return fake
+
+
+class Coletor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras = defaultdict(list)
+        self.chamadas = defaultdict(int)
+        self.erros = defaultdict(int)
+
+    def registrar(self, rota, segundos, chamadas, ok):
+        with self._lock:
+            self.amostras[rota].append(segundos)
+            self.chamadas[rota] += sum(chamadas.values())
+            if not ok:
+                self.erros[rota] += 1
+
+
+def requisitar(cliente, fake, coletor, rota, metodo, url, **kwargs):
+    chamadas = fake.contar_chamadas_da_thread()
+    inicio = time.perf_counter()
+    resposta = getattr(cliente, metodo)(url, **kwargs)
+    decorrido = time.perf_counter() - inicio
+    coletor.registrar(rota, decorrido, chamadas, resposta.status_code < 400)
+    return resposta
+
+
+def entrar(cliente, fake, coletor, numero, rota='POST /login'):
+    return requisitar(cliente, fake, coletor, rota, 'post', '/login',
+                      data={'email': f'prof{numero}@escola.exemplo', 'senha': SENHA})
+
+
+def cenario_login(cliente, fake, coletor, numero, repeticoes):
+    for _ in range(repeticoes):
+        entrar(cliente, fake, coletor, numero)
+        cliente.get('/logout')
+
+
+def cenario_navegacao(cliente, fake, coletor, numero, repeticoes):
+    entrar(cliente, fake, Coletor(), numero)
+    slugs = [m['slug'] for m in pc_teacher.MODULO_CONFIG]
+    for _ in range(repeticoes):
+        requisitar(cliente, fake, coletor, 'GET /dashboard', 'get', '/dashboard')
+        requisitar(cliente, fake, coletor, 'GET /modulos', 'get', '/modulos')
+        for slug in slugs:
+            requisitar(cliente, fake, coletor, 'GET /conteudo/<slug>', 'get', f'/conteudo/{slug}')
+        requisitar(cliente, fake, coletor, 'GET /progresso', 'get', '/progresso')
+
+
+def cenario_submissoes(cliente, fake, coletor, numero, repeticoes):
+    # Professores ímpares ainda não concluíram nenhum módulo: toda submissão grava
+    numero |= 1
+    entrar(cliente, fake, Coletor(), numero)
+    questoes = pc_teacher.banco_questoes.do_modulo('introducao')
+    for i in range(repeticoes):
+        # Acerto e erro alternados: com 5 repetições ninguém chega aos 3 acertos da conclusão
+        questao = questoes[i % len(questoes)]
+        resposta = questao['correta'] if i % 2 else next(
+            opcao['letra'] for opcao in questao['opcoes'] if not opcao['correta'])
+        requisitar(cliente, fake, coletor, 'POST /submeter-exercicio/<slug>', 'post',
+                   '/submeter-exercicio/introducao',
+                   json={'resposta': resposta, 'questao_id': questao['id']})
+
+
+def cenario_certificados(cliente, fake, coletor, numero, repeticoes):
+    # Só os professores pares concluíram o curso (ver preparar_banco)
+    numero -= numero % 2
+    entrar(cliente, fake, Coletor(), numero)
+    for _ in range(repeticoes):
+        requisitar(cliente, fake, coletor, 'GET /gerar-certificado', 'get', '/gerar-certificado')
+
+
+def rodar_cenario(nome, professores, repeticoes, latencia):
+    fake = preparar_banco(professores, latencia)
+    pc_teacher.db = fake
+    pc_teacher.storage = FirestoreStorage(fake)
+    pc_teacher.usuario_cache.clear()
+    pc_teacher.email_uid_cache.clear()
+
+    executar = globals()[f'cenario_{nome}']
+    coletor = Coletor()
+    barreira = threading.Barrier(professores)
+
+    def professor(numero):
+        cliente = pc_teacher.app.test_client()
+        barreira.wait()
+        executar(cliente, fake, coletor, numero, repeticoes)
+
+    threads = [threading.Thread(target=professor, args=(i,)) for i in range(professores)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    resultado = {}
+    for rota, amostras in sorted(coletor.amostras.items()):
+        amostras.sort()
+        total = len(amostras)
+        resultado[rota] = {
+            'requisicoes': total,
+            'p50_ms': round(amostras[int(total * 0.50)] * 1000, 2),
+            'p95_ms': round(amostras[min(int(total * 0.95), total - 1)] * 1000, 2),
+            'p99_ms': round(amostras[min(int(total * 0.99), total - 1)] * 1000, 2),
+            'rps': round(total / duracao, 1),
+            'firestore_por_req': round(coletor.chamadas[rota] / total, 2),
+            'erros': coletor.erros[rota],
+        }
+    return resultado
+
+
+def comparar(cenario, rota, atual, baselines, tolerancia):
+    base = baselines.get(cenario, {}).get(rota)
+    if not base:
+        return '(sem baseline)', False
+    regressao = (atual['p95_ms'] > base['p95_ms'] * (1 + tolerancia)
+                 or atual['firestore_por_req'] > base['firestore_por_req'])
+    variacao = (atual['p95_ms'] / base['p95_ms'] - 1) * 100 if base['p95_ms'] else 0.0
+    marca = 'REGRESSÃO' if regressao else 'ok'
+    return f'p95 {variacao:+.0f}% vs baseline, firestore {base["firestore_por_req"]} -> ' \
+           f'{atual["firestore_por_req"]}  {marca}', regressao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cenario', action='append', choices=CENARIOS,
+                        help='Cenário a rodar (pode repetir). Padrão: todos.')
+    parser.add_argument('--professores', type=int, default=40, help='Professores simultâneos.')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Repetições por professor.')
+    parser.add_argument('--latencia-ms', type=float, default=5.0, help='Latência por chamada ao Firestore.')
+    parser.add_argument('--tolerancia', type=float, default=0.20, help='Aumento de p95 aceito (0.20 = 20%%).')
+    parser.add_argument('--salvar-baseline', action='store_true', help='Grava os resultados em baselines.json.')
+    parser.add_argument('--estrito', action='store_true', help='Código de saída 1 se houver regressão.')
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as arquivo:
+            baselines = json.load(arquivo)
+
+    print(f'{args.professores} professores x {args.repeticoes} repetições, '
+          f'latência do Firestore {args.latencia_ms} ms por chamada\n')
+    resultados = {}
+    houve_regressao = False
+    for cenario in args.cenario or CENARIOS:
+        resultados[cenario] = rodar_cenario(cenario, args.professores, args.repeticoes, args.latencia_ms / 1000)
+        print(f'[{cenario}]')
+        for rota, atual in resultados[cenario].items():
+            comparacao, regressao = comparar(cenario, rota, atual, baselines, args.tolerancia)
+            houve_regressao |= regressao
+            print(f'  {rota:34s} p50 {atual["p50_ms"]:7.1f} ms  p95 {atual["p95_ms"]:7.1f} ms  '
+                  f'p99 {atual["p99_ms"]:7.1f} ms  {atual["rps"]:7.1f} req/s  '
+                  f'{atual["firestore_por_req"]:4.1f} firestore/req  {atual["erros"]} erros')
+            print(f'  {"":34s} {comparacao}')
+        print()
+
+    if args.salvar_baseline:
+        baselines.update(resultados)
+        with open(BASELINES, 'w') as arquivo:
+            json.dump(baselines, arquivo, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f'Baselines gravadas em {BASELINES}')
+
+    if args.estrito and houve_regressao:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
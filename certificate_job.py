@@ -0,0 +1,173 @@
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from certificates import certificate_key, data_por_extenso, render_certificate_pdf
+from firestore_paging import paginar_colecao
+from progress import ler_progresso
+
+
+def _renderizar(args):
+    # Roda nos processos do pool: precisa ser uma função de módulo (picklable)
+    user_id, nome, data, carga = args
+    chave = certificate_key(nome, data, carga)
+    return user_id, render_certificate_pdf(nome, data, carga, codigo=chave[:16].upper())
+
+
+class _SaidaDiretorio:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        os.makedirs(caminho, exist_ok=True)
+
+    def existentes(self):
+        return {nome[:-4] for nome in os.listdir(self.caminho) if nome.endswith('.pdf')}
+
+    def gravar(self, user_id, pdf):
+        destino = os.path.join(self.caminho, f'{user_id}.pdf')
+        with open(destino + '.tmp', 'wb') as arquivo:
+            arquivo.write(pdf)
+        os.replace(destino + '.tmp', destino)
+
+    def fechar(self):
+        pass
+
+
+class _SaidaZip:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._zip = zipfile.ZipFile(caminho, 'a', compression=zipfile.ZIP_DEFLATED)
+
+    def existentes(self):
+        return {nome[:-4] for nome in self._zip.namelist() if nome.endswith('.pdf')}
+
+    def gravar(self, user_id, pdf):
+        self._zip.writestr(f'{user_id}.pdf', pdf)
+
+    def fechar(self):
+        self._zip.close()
+
+
+def gerar_certificados_turma(db, calcular_progresso, saida, carga_horaria=24, workers=None,
+                             tamanho_pagina=300, retomar=False, relatorio=print):
+    """Gera o PDF de todos os professores com 100% do curso concluído.
+
+    Percorre 'progresso' em páginas, busca os nomes em 'usuarios' com get_all
+    e renderiza os PDFs em um pool de processos. Quem ainda não tem
+    data_conclusao recebe a de hoje, gravada no progresso antes do PDF (como
+    em /gerar-certificado): o certificado do job e o do download têm a mesma
+    data e a mesma chave de cache. `saida` é um diretório ou um
+    arquivo .zip; certificados já presentes na saída são pulados, e com
+    `retomar` a leitura continua da última página registrada no checkpoint
+    (<saida>.checkpoint.json). Retorna um dict com as estatísticas do job.
+    """
+    from google.api_core.exceptions import FailedPrecondition
+
+    saida_destino = _SaidaZip(saida) if saida.endswith('.zip') else _SaidaDiretorio(saida)
+    checkpoint = f'{saida.rstrip(os.sep)}.checkpoint.json'
+    inicio_apos_id = None
+    if retomar and os.path.exists(checkpoint):
+        with open(checkpoint) as arquivo:
+            inicio_apos_id = json.load(arquivo).get('ultimo_id')
+
+    existentes = saida_destino.existentes()
+    estatisticas = {'lidos': 0, 'concluidos': 0, 'gerados': 0, 'pulados': 0, 'conflitos': 0}
+    inicio = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for pagina in paginar_colecao(db.collection('progresso'), tamanho_pagina, inicio_apos_id):
+                estatisticas['lidos'] += len(pagina)
+
+                concluidos = {}
+                for snapshot in pagina:
+                    progresso_db = ler_progresso(snapshot.to_dict()) or {}
+                    if calcular_progresso(progresso_db)['overall_percent'] != 100:
+                        continue
+                    estatisticas['concluidos'] += 1
+                    if snapshot.id in existentes:
+                        estatisticas['pulados'] += 1
+                        continue
+                    concluidos[snapshot.id] = (snapshot, progresso_db)
+
+                if concluidos:
+                    datas = _datas_de_conclusao(db, concluidos, FailedPrecondition)
+                    estatisticas['conflitos'] += sum(1 for data in datas.values() if data is None)
+                    refs = [db.collection('usuarios').document(user_id) for user_id in concluidos]
+                    usuarios = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+                    tarefas = []
+                    for user_id in concluidos:
+                        if user_id not in usuarios or datas.get(user_id) is None:
+                            continue
+                        nome = usuarios[user_id].get('nome', '').upper()
+                        tarefas.append((user_id, nome, data_por_extenso(datas[user_id]), carga_horaria))
+
+                    for user_id, pdf in pool.map(_renderizar, tarefas, chunksize=8):
+                        saida_destino.gravar(user_id, pdf)
+                        estatisticas['gerados'] += 1
+
+                with open(checkpoint, 'w') as arquivo:
+                    json.dump({'ultimo_id': pagina[-1].id}, arquivo)
+
+                decorrido = time.perf_counter() - inicio
+                relatorio(f"{estatisticas['lidos']} lidos, {estatisticas['concluidos']} concluídos, "
+                          f"{estatisticas['gerados']} gerados, {estatisticas['pulados']} já existentes "
+                          f"({estatisticas['gerados'] / decorrido:.1f} certificados/s)")
+    finally:
+        saida_destino.fechar()
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    if estatisticas['conflitos']:
+        relatorio(f"AVISO: {estatisticas['conflitos']} progressos mudaram a cada tentativa de gravar a data de "
+                  f"conclusão; os certificados deles ficaram de fora. Rode de novo para gerá-los.")
+    estatisticas['certificados_por_segundo'] = estatisticas['gerados'] / estatisticas['segundos'] if estatisticas['segundos'] else 0.0
+    return estatisticas
+
+
+def _datas_de_conclusao(db, concluidos, falha_precondicao, tamanho_batch=500):
+    """{user_id: date} para {user_id: (snapshot, progresso_db)}. As datas que faltam viram a de
+       hoje e são gravadas em WriteBatches de até `tamanho_batch` updates (o limite do
+       Firestore é 500), com a pré-condição last_update_time de cada snapshot. Se um lote
+       falhar (alguém gravou no meio, talvez a própria data), cada documento dele é relido
+       (ver _fixar_data_conclusao). None: não foi possível fixar a data."""
+    hoje = datetime.now().date()
+    datas = {}
+    sem_data = []
+    for user_id, (snapshot, progresso_db) in concluidos.items():
+        data_conclusao = progresso_db.get('data_conclusao')
+        if data_conclusao:
+            datas[user_id] = datetime.strptime(data_conclusao, '%Y-%m-%d').date()
+            continue
+        sem_data.append(snapshot)
+
+    for inicio in range(0, len(sem_data), tamanho_batch):
+        parte = sem_data[inicio:inicio + tamanho_batch]
+        batch = db.batch()
+        for snapshot in parte:
+            batch.update(snapshot.reference, {'data_conclusao': hoje.isoformat()},
+                         option=db.write_option(last_update_time=snapshot.update_time))
+        try:
+            batch.commit()
+            datas.update((snapshot.id, hoje) for snapshot in parte)
+        except falha_precondicao:
+            for snapshot in parte:
+                datas[snapshot.id] = _fixar_data_conclusao(db, snapshot.reference, hoje, falha_precondicao)
+    return datas
+
+
+def _fixar_data_conclusao(db, referencia, hoje, falha_precondicao, tentativas=5):
+    """Relê o progresso: devolve a data já gravada ou grava `hoje` com a pré-condição."""
+    for _ in range(tentativas):
+        snapshot = referencia.get()
+        data_conclusao = (ler_progresso(snapshot.to_dict()) or {}).get('data_conclusao')
+        if data_conclusao:
+            return datetime.strptime(data_conclusao, '%Y-%m-%d').date()
+        try:
+            referencia.update({'data_conclusao': hoje.isoformat()},
+                              option=db.write_option(last_update_time=snapshot.update_time))
+            return hoje
+        except falha_precondicao:
+            continue
+    return None
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturoTimeout
+
+# Mude quando o layout do PDF mudar: invalida todo o cache em disco
+TEMPLATE_VERSION = '1'
+
+MESES = [
+    'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+    'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro',
+]
+
+# Larguras (1/1000 em) dos caracteres ASCII 32..126 das fontes padrão do PDF
+_LARGURAS = {
+    'Helvetica': [
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ],
+    'Helvetica-Bold': [
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ],
+}
+
+# A4 paisagem, em pontos
+LARGURA_PAGINA, ALTURA_PAGINA = 842, 595
+MARGEM = 50
+
+
+class CertificadoPendente(Exception):
+    """O certificado ainda não está pronto (fila cheia ou geração em andamento)."""
+
+
+def data_por_extenso(data):
+    return f'{data.day:02d} de {MESES[data.month - 1]} de {data.year}'
+
+
+def certificate_key(nome, data, carga):
+    """Hash do conteúdo do certificado: nome do arquivo em cache e ETag."""
+    conteudo = '\x1f'.join([TEMPLATE_VERSION, nome, data, str(carga)])
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def _largura_texto(texto, fonte, tamanho):
+    larguras = _LARGURAS[fonte]
+    total = 0
+    for caractere in texto:
+        # Acentos não mudam a largura da letra base nas fontes padrão
+        base = unicodedata.normalize('NFD', caractere)[0]
+        codigo = ord(base)
+        total += larguras[codigo - 32] if 32 <= codigo <= 126 else 556
+    return total * tamanho / 1000
+
+
+def _texto_pdf(texto):
+    bruto = texto.encode('cp1252', errors='replace')
+    return bruto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _linha_centralizada(texto, fonte, tamanho, y):
+    # Reduz a fonte de nomes longos até caber entre as margens
+    while tamanho > 8 and _largura_texto(texto, fonte, tamanho) > LARGURA_PAGINA - 2 * MARGEM - 40:
+        tamanho -= 1
+    x = (LARGURA_PAGINA - _largura_texto(texto, fonte, tamanho)) / 2
+    apelido = 'F2' if fonte == 'Helvetica-Bold' else 'F1'
+    return b'BT /%s %d Tf %.2f %d Td (%s) Tj ET\n' % (apelido.encode(), tamanho, x, y, _texto_pdf(texto))
+
+
+def render_certificate_pdf(nome, data, carga, codigo=''):
+    """Gera o PDF (bytes) do certificado sem dependências externas.
+       Usa as fontes padrão Helvetica com WinAnsiEncoding (acentos do português)."""
+    conteudo = b''.join([
+        b'0.31 0.27 0.9 RG 4 w 25 25 792 545 re S\n',
+        b'0.06 0.73 0.51 RG 1.5 w 35 35 772 525 re S\n',
+        b'0.12 0.16 0.22 rg\n',
+        _linha_centralizada('CERTIFICADO DE CONCLUSÃO', 'Helvetica-Bold', 34, 440),
+        _linha_centralizada('Certificamos que', 'Helvetica', 16, 375),
+        _linha_centralizada(nome, 'Helvetica-Bold', 28, 325),
+        _linha_centralizada('concluiu com êxito o Curso de Pensamento Computacional.', 'Helvetica', 16, 280),
+        _linha_centralizada(f'Carga Horária: {carga} horas.', 'Helvetica', 14, 220),
+        _linha_centralizada(f'Emitido em: {data}', 'Helvetica', 12, 160),
+        _linha_centralizada('PC Teacher', 'Helvetica-Bold', 14, 100),
+        _linha_centralizada(f'Código de verificação: {codigo}', 'Helvetica', 8, 60) if codigo else b'',
+    ])
+
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+        b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>' % (LARGURA_PAGINA, ALTURA_PAGINA),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Length %d >>\nstream\n%sendstream' % (len(conteudo), conteudo),
+    ]
+
+    pdf = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (numero, objeto)
+    inicio_xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    for posicao in posicoes:
+        pdf += b'%010d 00000 n \n' % posicao
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref)
+    return bytes(pdf)
+
+
+class CertificateStore:
+    """Cache em disco dos PDFs de certificado, indexado pelo hash do conteúdo.
+
+    A geração roda em um pool limitado de threads; pedidos iguais em paralelo
+    compartilham o mesmo Future, e com mais de `max_pendentes` gerações na
+    fila novos pedidos recebem CertificadoPendente em vez de travar o worker.
+    """
+
+    def __init__(self, diretorio, max_workers=2, max_pendentes=32):
+        self.diretorio = diretorio
+        self.max_pendentes = max_pendentes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='certificados')
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, f'{chave}.pdf')
+
+    def obter(self, nome, data, carga, timeout=10):
+        """Retorna (caminho_do_pdf, chave), gerando o arquivo se ainda não existir."""
+        chave = certificate_key(nome, data, carga)
+        caminho = self.caminho(chave)
+        if os.path.exists(caminho):
+            return caminho, chave
+
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            novo = futuro is None
+            if novo:
+                if len(self._em_andamento) >= self.max_pendentes:
+                    raise CertificadoPendente(chave)
+                futuro = self._pool.submit(self._gerar, nome, data, carga, chave)
+                self._em_andamento[chave] = futuro
+        if novo:
+            # Fora do lock: se a geração já terminou, o callback roda aqui mesmo e pega o lock
+            futuro.add_done_callback(lambda _, chave=chave: self._concluir(chave))
+
+        try:
+            return futuro.result(timeout=timeout), chave
+        except FuturoTimeout:
+            raise CertificadoPendente(chave)
+
+    def _concluir(self, chave):
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+
+    def _gerar(self, nome, data, carga, chave):
+        pdf = render_certificate_pdf(nome, data, carga, codigo=chave[:16].upper())
+        caminho = self.caminho(chave)
+        # Escrita atômica: outro worker nunca lê um PDF pela metade
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(pdf)
+        os.replace(temporario, caminho)
+        return caminho
@@ -0,0 +1,134 @@
+"""Estatísticas agregadas do curso para os coordenadores.
+
+Em vez de ler todos os documentos de 'progresso' a cada consulta, as rotas
+de submissão e de conclusão somam incrementos (delta_submissao) em um buffer
+do processo, e a thread do buffer grava o total em
+estatisticas_curso/shard-<n> a cada poucos segundos, fora da requisição
+(ver registrar_estatisticas em app.py). Cada escrita cai em um shard sorteado: um
+documento só do Firestore aguenta ~1 escrita/s sustentada, e todos os
+professores escrevem nos mesmos contadores. O painel soma os shards (um
+get_all de poucos documentos).
+
+Por módulo: iniciados (fizeram ao menos um exercício), concluidos, acertos
+e erros. As taxas, médias e o ponto de desistência saem desses totais.
+
+`recalcular()` relê a coleção 'progresso' em páginas e regrava os shards a
+partir do zero (backfill ou correção de divergências).
+"""
+import random
+import time
+
+from firestore_paging import paginar_colecao
+from progress import ler_progresso
+
+COLECAO = 'estatisticas_curso'
+CAMPOS = ('iniciados', 'concluidos', 'acertos', 'erros')
+
+
+def _aninhar(planos, valor):
+    """{'slug.campo': n} -> {'slug': {'campo': valor(n)}} (set com merge não aceita caminhos)."""
+    aninhado = {}
+    for caminho, n in planos.items():
+        *pais, campo = caminho.split('.')
+        alvo = aninhado
+        for parte in pais:
+            alvo = alvo.setdefault(parte, {})
+        alvo[campo] = valor(n)
+    return aninhado
+
+
+class EstatisticasCurso:
+    def __init__(self, db, modulo_config, shards=8):
+        self.db = db
+        self.modulos = [(m['slug'], m['title']) for m in sorted(modulo_config, key=lambda m: m['order'])]
+        self.shards = shards
+
+    def _shard(self, numero):
+        return self.db.collection(COLECAO).document(f'shard-{numero}')
+
+    # --- Escrita incremental ---
+
+    @staticmethod
+    def delta_submissao(modulo_slug, acertos_antes, erros_antes, acertos=0, erros=0, concluiu=False):
+        """Incrementos de uma submissão (ou conclusão) de um módulo, dado o estado anterior."""
+        delta = {f'{modulo_slug}.acertos': acertos, f'{modulo_slug}.erros': erros}
+        if acertos_antes + erros_antes == 0 and (acertos + erros > 0 or concluiu):
+            delta[f'{modulo_slug}.iniciados'] = 1
+        if concluiu:
+            delta[f'{modulo_slug}.concluidos'] = 1
+        return {caminho: n for caminho, n in delta.items() if n}
+
+    def registrar(self, delta):
+        """Soma {'slug.campo': n} em um shard sorteado."""
+        from google.cloud import firestore
+
+        if delta:
+            self._shard(random.randrange(self.shards)).set(_aninhar(delta, firestore.Increment), merge=True)
+
+    # --- Leitura ---
+
+    def totais(self):
+        """Soma dos shards: {slug: {campo: n}}."""
+        totais = {slug: dict.fromkeys(CAMPOS, 0) for slug, _ in self.modulos}
+        for snapshot in self.db.get_all([self._shard(n) for n in range(self.shards)]):
+            if not snapshot.exists:
+                continue
+            for slug, campos in (snapshot.to_dict() or {}).items():
+                if slug in totais and isinstance(campos, dict):
+                    for campo in CAMPOS:
+                        totais[slug][campo] += campos.get(campo) or 0
+        return totais
+
+    def resumo(self):
+        """Linhas do painel, na ordem do curso. 'pararam_aqui' é quem chegou ao módulo
+           (concluiu o anterior, ou iniciou o primeiro) e não o concluiu."""
+        totais = self.totais()
+        linhas = []
+        chegaram = None
+        for slug, titulo in self.modulos:
+            t = totais[slug]
+            if chegaram is None:
+                chegaram = t['iniciados']
+            linhas.append({
+                'slug': slug,
+                'title': titulo,
+                **t,
+                'taxa_conclusao': t['concluidos'] / t['iniciados'] if t['iniciados'] else 0.0,
+                'media_acertos': t['acertos'] / t['iniciados'] if t['iniciados'] else 0.0,
+                'media_erros': t['erros'] / t['iniciados'] if t['iniciados'] else 0.0,
+                'pararam_aqui': max(chegaram - t['concluidos'], 0),
+            })
+            chegaram = t['concluidos']
+        return linhas
+
+    # --- Recálculo completo ---
+
+    def recalcular(self, tamanho_pagina=300, relatorio=print):
+        """Recalcula tudo a partir de 'progresso' e substitui os shards.
+           Submissões feitas durante o recálculo podem ficar de fora: rode fora do horário de aula."""
+        totais = {slug: dict.fromkeys(CAMPOS, 0) for slug, _ in self.modulos}
+        lidos = 0
+        inicio = time.perf_counter()
+        for pagina in paginar_colecao(self.db.collection('progresso'), tamanho_pagina):
+            for snapshot in pagina:
+                progresso_db = ler_progresso(snapshot.to_dict()) or {}
+                for slug, _ in self.modulos:
+                    modulo = progresso_db.get(slug)
+                    if not isinstance(modulo, dict):
+                        continue
+                    acertos = modulo.get('acertos') or 0
+                    erros = modulo.get('erros') or 0
+                    concluido = bool(modulo.get('concluido'))
+                    totais[slug]['acertos'] += acertos
+                    totais[slug]['erros'] += erros
+                    totais[slug]['iniciados'] += 1 if acertos + erros > 0 or concluido else 0
+                    totais[slug]['concluidos'] += 1 if concluido else 0
+            lidos += len(pagina)
+            relatorio(f'{lidos} documentos de progresso lidos...')
+
+        batch = self.db.batch()
+        batch.set(self._shard(0), totais)
+        for numero in range(1, self.shards):
+            batch.delete(self._shard(numero))
+        batch.commit()
+        return {'lidos': lidos, 'segundos': time.perf_counter() - inicio}
@@ -0,0 +1,324 @@
+"""Gera um CSS enxuto com as classes utilitárias do Tailwind usadas nos templates.
+
+Substitui o https://cdn.tailwindcss.com, que compila o CSS no navegador a cada
+página. Como o Tailwind, o build varre os templates (atributos class e strings
+do JavaScript, ex.: classList.add('bg-green-100')) e só emite as classes que
+aparecem lá. Implementa o subconjunto do Tailwind v3 usado pelo PC Teacher:
+espaçamento, cores (com modificador de opacidade /N), tipografia, bordas,
+sombras, display/flex, transições e as variantes hover:, focus: e sm/md/lg/xl.
+
+Classes desconhecidas são ignoradas (podem ser classes próprias, como
+.sidebar-item). Para usar uma utilidade nova nos templates, acrescente a regra
+aqui e rode `flask construir-css`.
+"""
+import glob
+import os
+import re
+
+# Tema: paleta padrão do Tailwind v3 (só as cores usadas) + extend do PC Teacher
+CORES = {
+    'transparent': 'transparent',
+    'black': '#000000',
+    'white': '#ffffff',
+    'gray': {50: '#f9fafb', 100: '#f3f4f6', 200: '#e5e7eb', 300: '#d1d5db', 400: '#9ca3af',
+             500: '#6b7280', 600: '#4b5563', 700: '#374151', 800: '#1f2937', 900: '#111827'},
+    'red': {50: '#fef2f2', 100: '#fee2e2', 200: '#fecaca', 300: '#fca5a5', 400: '#f87171',
+            500: '#ef4444', 600: '#dc2626', 700: '#b91c1c', 800: '#991b1b', 900: '#7f1d1d'},
+    'yellow': {50: '#fefce8', 100: '#fef9c3', 200: '#fef08a', 300: '#fde047', 400: '#facc15',
+               500: '#eab308', 600: '#ca8a04', 700: '#a16207', 800: '#854d0e', 900: '#713f12'},
+    'green': {50: '#f0fdf4', 100: '#dcfce7', 200: '#bbf7d0', 300: '#86efac', 400: '#4ade80',
+              500: '#22c55e', 600: '#16a34a', 700: '#15803d', 800: '#166534', 900: '#14532d'},
+    'blue': {50: '#eff6ff', 100: '#dbeafe', 200: '#bfdbfe', 300: '#93c5fd', 400: '#60a5fa',
+             500: '#3b82f6', 600: '#2563eb', 700: '#1d4ed8', 800: '#1e40af', 900: '#1e3a8a'},
+    'indigo': {50: '#eef2ff', 100: '#e0e7ff', 200: '#c7d2fe', 300: '#a5b4fc', 400: '#818cf8',
+               500: '#6366f1', 600: '#4f46e5', 700: '#4338ca', 800: '#3730a3', 900: '#312e81'},
+    'primary-indigo': '#4f46e5',
+    'secondary-green': '#10b981',
+    'dark-gray': '#1f2937',
+    'light-bg': '#f7f9fc',
+}
+FONTE_SANS = "Poppins, sans-serif"
+
+# Ordem das cores no tema: decide quem vence quando duas classes da mesma família
+# estão no elemento (ex.: bg-gray-100 + bg-red-100 -> vermelho, como no Tailwind)
+_ORDEM_CORES = {nome: i for i, nome in enumerate(CORES)}
+
+TAMANHOS_TEXTO = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+}
+PESOS = {'normal': 400, 'medium': 500, 'semibold': 600, 'bold': 700, 'extrabold': 800}
+SOMBRAS = {
+    'shadow-sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+    'shadow': '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+    'shadow-md': '0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+    'shadow-lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+    'shadow-xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+    'shadow-inner': 'inset 0 2px 4px 0 rgb(0 0 0 / 0.05)',
+    'shadow-none': '0 0 #0000',
+}
+ARREDONDADOS = {'rounded-none': '0px', 'rounded-sm': '0.125rem', 'rounded': '0.25rem', 'rounded-md': '0.375rem',
+                'rounded-lg': '0.5rem', 'rounded-xl': '0.75rem', 'rounded-2xl': '1rem', 'rounded-full': '9999px'}
+BREAKPOINTS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px'}
+PSEUDOS = ['hover', 'focus']
+
+# Utilidades sem parâmetro: classe -> declarações
+FIXAS = {
+    'block': 'display:block', 'inline-block': 'display:inline-block', 'inline': 'display:inline',
+    'flex': 'display:flex', 'inline-flex': 'display:inline-flex', 'grid': 'display:grid', 'hidden': 'display:none',
+    'flex-grow': 'flex-grow:1', 'flex-1': 'flex:1 1 0%', 'flex-col': 'flex-direction:column', 'flex-wrap': 'flex-wrap:wrap',
+    'items-center': 'align-items:center', 'items-start': 'align-items:flex-start',
+    'justify-center': 'justify-content:center', 'justify-between': 'justify-content:space-between',
+    'text-left': 'text-align:left', 'text-center': 'text-align:center', 'text-right': 'text-align:right',
+    'italic': 'font-style:italic', 'underline': 'text-decoration-line:underline',
+    'cursor-pointer': 'cursor:pointer', 'pointer-events-none': 'pointer-events:none',
+    'object-contain': 'object-fit:contain', 'object-cover': 'object-fit:cover',
+    'overflow-hidden': 'overflow:hidden', 'overflow-x-auto': 'overflow-x:auto',
+    'relative': 'position:relative', 'absolute': 'position:absolute', 'fixed': 'position:fixed',
+    'min-h-screen': 'min-height:100vh', 'h-screen': 'height:100vh',
+    'transition': 'transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,'
+                  'opacity,box-shadow,transform,filter,backdrop-filter;'
+                  'transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms',
+}
+
+# Família de cada utilidade, na ordem em que o Tailwind emite os plugins
+FAMILIAS = [
+    'pointer-events', 'position', 'margem', 'display', 'altura', 'largura', 'flex', 'cursor', 'alinhamento',
+    'space', 'overflow', 'rounded', 'border-width', 'border-color', 'bg', 'object', 'padding', 'text-align',
+    'font-size', 'font-weight', 'font-style', 'text-color', 'decoration', 'opacity', 'shadow', 'ring',
+    'transition', 'duration',
+]
+_FAMILIA_FIXAS = {
+    'pointer-events-none': 'pointer-events', 'relative': 'position', 'absolute': 'position', 'fixed': 'position',
+    'block': 'display', 'inline-block': 'display', 'inline': 'display', 'flex': 'display',
+    'inline-flex': 'display', 'grid': 'display', 'hidden': 'display', 'min-h-screen': 'altura', 'h-screen': 'altura',
+    'flex-grow': 'flex', 'flex-1': 'flex', 'flex-col': 'flex', 'flex-wrap': 'flex', 'cursor-pointer': 'cursor',
+    'items-center': 'alinhamento', 'items-start': 'alinhamento', 'justify-center': 'alinhamento',
+    'justify-between': 'alinhamento', 'overflow-hidden': 'overflow', 'overflow-x-auto': 'overflow',
+    'object-contain': 'object', 'object-cover': 'object', 'text-left': 'text-align', 'text-center': 'text-align',
+    'text-right': 'text-align', 'italic': 'font-style', 'underline': 'decoration', 'transition': 'transition',
+}
+
+PREFLIGHT = """*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}
+::before,::after{--tw-content:''}
+html{line-height:1.5;-webkit-text-size-adjust:100%;-moz-tab-size:4;tab-size:4;font-family:""" + FONTE_SANS + """}
+body{margin:0;line-height:inherit}
+hr{height:0;color:inherit;border-top-width:1px}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+code,kbd,samp,pre{font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,monospace;font-size:1em}
+small{font-size:80%}
+table{text-indent:0;border-color:inherit;border-collapse:collapse}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}
+button,select{text-transform:none}
+button,[type='button'],[type='reset'],[type='submit']{-webkit-appearance:button;background-color:transparent;background-image:none}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+fieldset{margin:0;padding:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role="button"]{cursor:pointer}
+:disabled{cursor:default}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%;height:auto}
+[hidden]{display:none}
+"""
+
+_CANDIDATO = re.compile(r'[A-Za-z0-9_:/.\-]+')
+
+
+def _espaco(valor):
+    if valor == 'auto':
+        return 'auto'
+    if valor == 'px':
+        return '1px'
+    if valor == '0':
+        return '0px'
+    try:
+        numero = float(valor)
+    except ValueError:
+        return None
+    return f'{numero / 4:g}rem'
+
+
+def _cor(nome):
+    """'gray-100', 'secondary-green' ou 'secondary-green/10' -> (css, chave de ordem) ou None."""
+    nome, _, opacidade = nome.partition('/')
+    if nome in CORES and isinstance(CORES[nome], str):
+        hexa, ordem = CORES[nome], (_ORDEM_CORES[nome], 0)
+    else:
+        familia, _, tom = nome.rpartition('-')
+        paleta = CORES.get(familia)
+        if not isinstance(paleta, dict) or not tom.isdigit() or int(tom) not in paleta:
+            return None
+        hexa, ordem = paleta[int(tom)], (_ORDEM_CORES[familia], int(tom))
+    if not opacidade:
+        return hexa, ordem
+    if not opacidade.isdigit() or not hexa.startswith('#'):
+        return None
+    r, g, b = (int(hexa[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgb({r} {g} {b} / {int(opacidade) / 100:g})', ordem + (int(opacidade),)
+
+
+def _regra(classe):
+    """Retorna (família, chave de ordem, seletor-sufixo, declarações) ou None."""
+    if classe in FIXAS:
+        return _FAMILIA_FIXAS[classe], (), '', FIXAS[classe]
+    if classe in SOMBRAS:
+        return 'shadow', (list(SOMBRAS).index(classe),), '', f'box-shadow:{SOMBRAS[classe]}'
+    if classe in ARREDONDADOS:
+        return 'rounded', (list(ARREDONDADOS).index(classe),), '', f'border-radius:{ARREDONDADOS[classe]}'
+
+    m = re.fullmatch(r'(m|mx|my|mt|mr|mb|ml|p|px|py|pt|pr|pb|pl)-(.+)', classe)
+    if m:
+        prefixo, valor = m.groups()
+        tamanho = _espaco(valor)
+        if tamanho is None:
+            return None
+        propriedade = 'margin' if prefixo[0] == 'm' else 'padding'
+        lados = {'': [''], 'x': ['-left', '-right'], 'y': ['-top', '-bottom'],
+                 't': ['-top'], 'r': ['-right'], 'b': ['-bottom'], 'l': ['-left']}[prefixo[1:]]
+        familia = 'margem' if propriedade == 'margin' else 'padding'
+        # m-* antes de mx/my antes de mt/mr/mb/ml: os lados específicos vencem
+        ordem = (len(prefixo) > 1, prefixo in ('mt', 'mr', 'mb', 'ml', 'pt', 'pr', 'pb', 'pl'),
+                 float(valor) if valor not in ('auto', 'px') else 0)
+        return familia, ordem, '', ';'.join(f'{propriedade}{lado}:{tamanho}' for lado in lados)
+
+    m = re.fullmatch(r'space-(x|y)-(.+)', classe)
+    if m:
+        eixo, valor = m.groups()
+        tamanho = _espaco(valor)
+        if tamanho is None:
+            return None
+        inicio, fim = ('top', 'bottom') if eixo == 'y' else ('left', 'right')
+        return ('space', (float(valor),), ' > :not([hidden]) ~ :not([hidden])',
+                f'margin-{inicio}:{tamanho};margin-{fim}:0px')
+
+    m = re.fullmatch(r'(h|w|max-h|min-h|max-w)-(.+)', classe)
+    if m:
+        dimensao, valor = m.groups()
+        propriedade = {'h': 'height', 'w': 'width', 'max-h': 'max-height', 'min-h': 'min-height', 'max-w': 'max-width'}[dimensao]
+        especiais = {'full': '100%', 'auto': 'auto', 'screen': '100vh' if 'h' in dimensao else '100vw'}
+        tamanho = especiais.get(valor) or _espaco(valor)
+        if tamanho is None:
+            return None
+        familia = 'largura' if 'w' in dimensao else 'altura'
+        return familia, (dimensao,), '', f'{propriedade}:{tamanho}'
+
+    m = re.fullmatch(r'text-(.+)', classe)
+    if m:
+        valor = m.group(1)
+        if valor in TAMANHOS_TEXTO:
+            tamanho, altura = TAMANHOS_TEXTO[valor]
+            return 'font-size', (list(TAMANHOS_TEXTO).index(valor),), '', f'font-size:{tamanho};line-height:{altura}'
+        cor = _cor(valor)
+        if cor:
+            return 'text-color', cor[1], '', f'color:{cor[0]}'
+        return None
+
+    m = re.fullmatch(r'font-(.+)', classe)
+    if m and m.group(1) in PESOS:
+        return 'font-weight', (PESOS[m.group(1)],), '', f'font-weight:{PESOS[m.group(1)]}'
+
+    m = re.fullmatch(r'bg-(.+)', classe)
+    if m:
+        cor = _cor(m.group(1))
+        if cor:
+            return 'bg', cor[1], '', f'background-color:{cor[0]}'
+        return None
+
+    m = re.fullmatch(r'border(?:-([trbl]))?(?:-(\d+))?', classe)
+    if m:
+        lado, largura = m.groups()
+        propriedade = {None: 'border-width', 't': 'border-top-width', 'r': 'border-right-width',
+                       'b': 'border-bottom-width', 'l': 'border-left-width'}[lado]
+        return 'border-width', (lado is not None, int(largura or 1)), '', f'{propriedade}:{largura or 1}px'
+
+    m = re.fullmatch(r'border-(.+)', classe)
+    if m:
+        cor = _cor(m.group(1))
+        if cor:
+            return 'border-color', cor[1], '', f'border-color:{cor[0]}'
+        return None
+
+    m = re.fullmatch(r'ring-(.+)', classe)
+    if m:
+        cor = _cor(m.group(1))
+        if cor:
+            return 'ring', cor[1], '', f'--tw-ring-color:{cor[0]}'
+        return None
+
+    m = re.fullmatch(r'opacity-(\d+)', classe)
+    if m:
+        return 'opacity', (int(m.group(1)),), '', f'opacity:{int(m.group(1)) / 100:g}'
+
+    m = re.fullmatch(r'duration-(\d+)', classe)
+    if m:
+        return 'duration', (int(m.group(1)),), '', f'transition-duration:{m.group(1)}ms'
+
+    return None
+
+
+def _escapar(classe):
+    return re.sub(r'([:/.])', r'\\\1', classe)
+
+
+def candidatos(pasta_templates):
+    """Todos os tokens que podem ser classes, de todos os templates."""
+    tokens = set()
+    for caminho in sorted(glob.glob(os.path.join(pasta_templates, '*.html'))):
+        with open(caminho, encoding='utf-8') as arquivo:
+            tokens.update(_CANDIDATO.findall(arquivo.read()))
+    return tokens
+
+
+def _regra_com_variante(classe):
+    """Como _regra, aceitando um prefixo de variante (hover:, focus:, sm:, md:, lg:, xl:)."""
+    *variantes, base = classe.split(':')
+    if len(variantes) > 1 or (variantes and variantes[0] not in PSEUDOS and variantes[0] not in BREAKPOINTS):
+        return None
+    regra = _regra(base)
+    if regra is None:
+        return None
+    return (variantes[0] if variantes else ''), regra
+
+
+def gerar_css(classes):
+    """CSS minificado (preflight + utilidades). Retorna (css, classes emitidas)."""
+    regras = []
+    for classe in classes:
+        encontrada = _regra_com_variante(classe)
+        if encontrada is None:
+            continue
+        variante, (familia, ordem, sufixo, declaracoes) = encontrada
+        pseudo = f':{variante}' if variante in PSEUDOS else ''
+        breakpoint = variante if variante in BREAKPOINTS else ''
+        # Como no Tailwind: base < hover/focus < breakpoints; dentro de cada grupo, pela ordem dos plugins
+        chave = (list(BREAKPOINTS).index(breakpoint) + 1 if breakpoint else 0,
+                 PSEUDOS.index(variante) + 1 if pseudo else 0,
+                 FAMILIAS.index(familia), ordem, classe)
+        regras.append((chave, breakpoint, f'.{_escapar(classe)}{pseudo}{sufixo}{{{declaracoes}}}'))
+
+    regras.sort()
+    saida = [PREFLIGHT.replace('\n', '')]
+    por_breakpoint = {}
+    for _, breakpoint, css in regras:
+        if breakpoint:
+            por_breakpoint.setdefault(breakpoint, []).append(css)
+        else:
+            saida.append(css)
+    for breakpoint in BREAKPOINTS:
+        if breakpoint in por_breakpoint:
+            saida.append(f'@media (min-width:{BREAKPOINTS[breakpoint]}){{{"".join(por_breakpoint[breakpoint])}}}')
+    return '\n'.join(saida) + '\n', len(regras)
+
+
+def construir_css(pasta_templates, destino):
+    """Varre os templates e grava o CSS em `destino`. Retorna o número de classes emitidas."""
+    css, total = gerar_css(sorted(candidatos(pasta_templates)))
+    with open(destino, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('/* Gerado por `flask construir-css` a partir de templates/*.html. Não edite à mão. */\n')
+        arquivo.write(css)
+    return total
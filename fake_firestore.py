@@ -0,0 +1,346 @@
+"""Firestore em memória para rodar jobs e benchmarks sem rede nem credenciais.
+
+Implementa só o subconjunto da API usado pelo PC Teacher: collection/document,
+get/set/update/delete, where('==')/order_by/start_after/limit/stream, get_all
+e batch. FakeAsyncFirestore é a versão AsyncClient (get_all, get, set e update)
+sobre os mesmos dados. Increment, SERVER_TIMESTAMP e DELETE_FIELD do google-cloud-firestore
+são aplicados quando a biblioteca estiver instalada. Cada documento tem um
+update_time (um contador), e updates aceitam
+option=write_option(last_update_time=...): se o documento mudou, o commit
+falha com FailedPrecondition. create() falha com Conflict se o documento já existe.
+Como no Firestore, um WriteBatch aceita no máximo 500 operações (InvalidArgument).
+
+Cada ida ao "servidor" (get, set, update, delete, query, get_all, commit) é
+contada em `chamadas` e pode simular a latência de rede com `latencia`
+(segundos, ou um callable que retorna segundos). No FakeAsyncFirestore a espera
+é um asyncio.sleep: não prende a thread do event loop.
+"""
+import asyncio
+import copy
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    from google.api_core.exceptions import Conflict, FailedPrecondition, InvalidArgument
+except ImportError:  # pragma: no cover - sem google-cloud-firestore
+    class FailedPrecondition(Exception):
+        pass
+
+    class Conflict(Exception):
+        pass
+
+    class InvalidArgument(Exception):
+        pass
+
+LIMITE_BATCH = 500
+
+
+def _aplicar_valor(atual, valor):
+    nome_tipo = type(valor).__name__
+    if nome_tipo == 'Increment':
+        return (atual or 0) + valor.value
+    if nome_tipo == 'Sentinel' and 'server timestamp' in repr(valor).lower():
+        return datetime.now(timezone.utc)
+    if isinstance(valor, dict):
+        return {k: _aplicar_valor(None, v) for k, v in valor.items()}
+    return valor
+
+
+def _apagar(valor):
+    return type(valor).__name__ == 'Sentinel' and 'delete' in repr(valor).lower()
+
+
+def _mesclar(destino, origem):
+    for chave, valor in origem.items():
+        if isinstance(valor, dict) and isinstance(destino.get(chave), dict):
+            _mesclar(destino[chave], valor)
+        else:
+            destino[chave] = _aplicar_valor(destino.get(chave), valor)
+
+
+class FakeWriteOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, campo):
+        valor = self._data
+        for parte in campo.split('.'):
+            valor = valor.get(parte) if isinstance(valor, dict) else None
+        return valor
+
+
+class FakeDocumentReference:
+    def __init__(self, client, colecao, doc_id):
+        self._client = client
+        self._colecao = colecao
+        self.id = doc_id
+        self.path = f'{colecao}/{doc_id}'
+
+    def get(self, transaction=None):
+        self._client._rpc('get')
+        return self._snapshot()
+
+    def set(self, data, merge=False):
+        self._client._rpc('set')
+        self._set(data, merge)
+
+    def update(self, data, option=None):
+        self._client._rpc('update')
+        self._update(data, option)
+
+    def create(self, data):
+        self._client._rpc('create')
+        with self._client._lock:
+            if self.id in self._client._dados(self._colecao):
+                raise Conflict(f'Documento já existe: {self.path}')
+            self._set(data)
+
+    def delete(self):
+        self._client._rpc('delete')
+        self._delete()
+
+    def _snapshot(self):
+        with self._client._lock:
+            return FakeSnapshot(self, copy.deepcopy(self._client._dados(self._colecao).get(self.id)),
+                                self._client._tempos.get(self.path))
+
+    def _set(self, data, merge=False):
+        with self._client._lock:
+            docs = self._client._dados(self._colecao)
+            if merge and self.id in docs:
+                _mesclar(docs[self.id], data)
+            else:
+                docs[self.id] = _aplicar_valor(None, data)
+            self._client._tocar(self.path)
+
+    def _update(self, data, option=None):
+        with self._client._lock:
+            docs = self._client._dados(self._colecao)
+            if self.id not in docs:
+                raise KeyError(f'Documento inexistente: {self.path}')
+            if option is not None and self._client._tempos.get(self.path) != option.last_update_time:
+                raise FailedPrecondition(f'Documento alterado desde a leitura: {self.path}')
+            self._client._tocar(self.path)
+            for caminho, valor in data.items():
+                alvo = docs[self.id]
+                *pais, campo = caminho.split('.')
+                for parte in pais:
+                    alvo = alvo.setdefault(parte, {})
+                if _apagar(valor):
+                    alvo.pop(campo, None)
+                else:
+                    alvo[campo] = _aplicar_valor(alvo.get(campo), valor)
+
+    def _delete(self):
+        with self._client._lock:
+            self._client._dados(self._colecao).pop(self.id, None)
+            self._client._tempos.pop(self.path, None)
+
+
+class FakeQuery:
+    def __init__(self, client, colecao, filtros=(), limite=None, depois_de=None):
+        self._client = client
+        self._colecao = colecao
+        self._filtros = filtros
+        self._limite = limite
+        self._depois_de = depois_de
+
+    def _copiar(self, **mudancas):
+        atributos = {'filtros': self._filtros, 'limite': self._limite, 'depois_de': self._depois_de}
+        atributos.update(mudancas)
+        return FakeQuery(self._client, self._colecao, **atributos)
+
+    def where(self, campo, operador, valor):
+        if operador != '==':
+            raise NotImplementedError(f'Operador não suportado no fake: {operador}')
+        return self._copiar(filtros=self._filtros + ((campo, valor),))
+
+    def order_by(self, campo):
+        # Só ordenação por ID do documento ('__name__'), que é a ordem usada na paginação
+        return self
+
+    def limit(self, limite):
+        return self._copiar(limite=limite)
+
+    def start_after(self, cursor):
+        # Snapshot ou {'__name__': id/referência}, como no cliente real
+        if isinstance(cursor, dict):
+            nome = cursor['__name__']
+            return self._copiar(depois_de=nome if isinstance(nome, str) else nome.id)
+        return self._copiar(depois_de=cursor.id)
+
+    def stream(self):
+        self._client._rpc('query')
+        with self._client._lock:
+            itens = sorted(self._client._dados(self._colecao).items())
+            resultado = []
+            for doc_id, data in itens:
+                if self._depois_de is not None and doc_id <= self._depois_de:
+                    continue
+                ref = FakeDocumentReference(self._client, self._colecao, doc_id)
+                snapshot = FakeSnapshot(ref, copy.deepcopy(data), self._client._tempos.get(ref.path))
+                if all(snapshot.get(campo) == valor for campo, valor in self._filtros):
+                    resultado.append(snapshot)
+                    if self._limite is not None and len(resultado) >= self._limite:
+                        break
+        return iter(resultado)
+
+    get = stream
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, colecao):
+        super().__init__(client, colecao)
+        self.id = colecao
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._client, self._colecao, str(doc_id))
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._operacoes = []
+
+    def set(self, ref, data, merge=False):
+        self._operacoes.append((ref, None, lambda: ref._set(data, merge=merge)))
+
+    def update(self, ref, data, option=None):
+        self._operacoes.append((ref, option, lambda: ref._update(data)))
+
+    def delete(self, ref):
+        self._operacoes.append((ref, None, ref._delete))
+
+    def commit(self):
+        self._client._rpc('commit')
+        if len(self._operacoes) > LIMITE_BATCH:
+            raise InvalidArgument(f'maximum {LIMITE_BATCH} writes allowed per request')
+        # Lote atômico: nenhuma outra operação enxerga um estado intermediário
+        with self._client._lock:
+            # Pré-condições primeiro: se uma falhar, nada do lote é gravado
+            for ref, option, _ in self._operacoes:
+                if option is not None and self._client._tempos.get(ref.path) != option.last_update_time:
+                    raise FailedPrecondition(f'Documento alterado desde a leitura: {ref.path}')
+            for _, _, operacao in self._operacoes:
+                operacao()
+        self._operacoes = []
+
+
+class FakeFirestore:
+    def __init__(self, latencia=0):
+        self._colecoes = {}
+        self._tempos = {}
+        self._relogio = 0
+        self._lock = threading.RLock()
+        self._lock_chamadas = threading.Lock()
+        self._local = threading.local()
+        self.latencia = latencia
+        self.chamadas = {}
+
+    def _dados(self, colecao):
+        return self._colecoes.setdefault(colecao, {})
+
+    def _tocar(self, caminho):
+        # Chamado com o _lock já adquirido
+        self._relogio += 1
+        self._tempos[caminho] = self._relogio
+
+    def write_option(self, last_update_time):
+        return FakeWriteOption(last_update_time)
+
+    def _contar(self, tipo):
+        """Conta a chamada e retorna a latência simulada dela (segundos)."""
+        with self._lock_chamadas:
+            self.chamadas[tipo] = self.chamadas.get(tipo, 0) + 1
+        por_thread = getattr(self._local, 'chamadas', None)
+        if por_thread is not None:
+            por_thread[tipo] = por_thread.get(tipo, 0) + 1
+        return self.latencia() if callable(self.latencia) else self.latencia
+
+    def _rpc(self, tipo):
+        atraso = self._contar(tipo)
+        if atraso:
+            time.sleep(atraso)
+
+    async def _rpc_async(self, tipo):
+        atraso = self._contar(tipo)
+        if atraso:
+            await asyncio.sleep(atraso)
+
+    def contar_chamadas_da_thread(self):
+        """Passa a contar, só para a thread atual, as chamadas feitas a partir de agora.
+           Retorna o dict que será preenchido (ex.: chamadas de uma única requisição)."""
+        self._local.chamadas = {}
+        return self._local.chamadas
+
+    def collection(self, nome):
+        return FakeCollectionReference(self, nome)
+
+    def get_all(self, refs):
+        self._rpc('get_all')
+        with self._lock:
+            return iter([ref._snapshot() for ref in refs])
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, ref):
+        self._ref = ref
+        self.id = ref.id
+        self.path = ref.path
+
+    async def get(self, transaction=None):
+        await self._ref._client._rpc_async('get')
+        return self._ref._snapshot()
+
+    async def set(self, data, merge=False):
+        await self._ref._client._rpc_async('set')
+        self._ref._set(data, merge)
+
+    async def update(self, data, option=None):
+        await self._ref._client._rpc_async('update')
+        self._ref._update(data, option)
+
+
+class FakeAsyncCollectionReference:
+    def __init__(self, colecao):
+        self._colecao = colecao
+        self.id = colecao.id
+
+    def document(self, doc_id):
+        return FakeAsyncDocumentReference(self._colecao.document(doc_id))
+
+
+class FakeAsyncFirestore:
+    """AsyncClient sobre os dados, contadores e latência de um FakeFirestore."""
+
+    def __init__(self, fake):
+        self._fake = fake
+
+    def write_option(self, last_update_time):
+        return FakeWriteOption(last_update_time)
+
+    def collection(self, nome):
+        return FakeAsyncCollectionReference(self._fake.collection(nome))
+
+    async def get_all(self, refs):
+        await self._fake._rpc_async('get_all')
+        with self._fake._lock:
+            snapshots = [ref._ref._snapshot() for ref in refs]
+        for snapshot in snapshots:
+            yield snapshot
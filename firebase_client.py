@@ -0,0 +1,133 @@
+"""Inicialização preguiçosa e thread-safe do Firebase Admin SDK.
+
+Nada do Firebase é importado ou inicializado no import do app: `db`, `auth` e
+`firestore` são proxies que carregam os módulos, leem as credenciais e criam o
+cliente na primeira vez em que são usados. Isso deixa o boot dos workers (e o
+cold start do Render) livre do import do google-cloud-firestore e do parse
+das credenciais; rotas que não tocam no banco nunca pagam esse custo.
+
+Com gunicorn --preload, aquecer() roda no processo mestre e os workers herdam
+os módulos importados e as credenciais já lidas. O cliente do Firestore
+(gRPC) não sobrevive a um fork: cada worker cria o seu no primeiro uso.
+"""
+import importlib
+import json
+import os
+import threading
+
+PROJECT_ID = 'pc-teacher-6c75f'
+
+_lock = threading.RLock()
+_app = None
+_db = None
+_db_pid = None
+
+
+def carregar_credenciais():
+    """Credenciais da variável FIREBASE_CONFIG_JSON (produção) ou de serviceAccountKey.json."""
+    from firebase_admin import credentials
+
+    try:
+        # 1. Tenta carregar da variável de ambiente (USO EM PRODUÇÃO)
+        service_account_json = os.environ.get('FIREBASE_CONFIG_JSON')
+        if service_account_json:
+            cred = credentials.Certificate(json.loads(service_account_json))
+            print("INFO: Credenciais carregadas da variável de ambiente 'FIREBASE_CONFIG_JSON'.")
+        else:
+            # 2. Tenta carregar de um arquivo local (USO EM DESENVOLVIMENTO)
+            cred = credentials.Certificate('serviceAccountKey.json')
+            print("INFO: Credenciais carregadas do arquivo local 'serviceAccountKey.json'.")
+        return cred
+    except FileNotFoundError:
+        print("AVISO: Arquivo 'serviceAccountKey.json' não encontrado localmente.")
+    except Exception as e:
+        # Este erro pode ocorrer se o JSON da variável de ambiente for mal-formado
+        print(f"ERRO ao carregar credenciais: {e}")
+    return None
+
+
+def obter_app():
+    """Retorna o app do Firebase, inicializando-o uma única vez por processo."""
+    global _app
+    if _app is not None:
+        return _app
+    with _lock:
+        if _app is None:
+            import firebase_admin
+
+            if firebase_admin._apps:
+                _app = firebase_admin.get_app()
+            else:
+                cred = carregar_credenciais()
+                if cred is None:
+                    print("ERRO CRÍTICO: Firebase Admin SDK não foi inicializado. Verifique as credenciais.")
+                    raise RuntimeError('Firebase Admin SDK não inicializado: credenciais ausentes ou inválidas.')
+                _app = firebase_admin.initialize_app(cred, {'projectId': PROJECT_ID})
+    return _app
+
+
+def obter_db():
+    """Cliente do Firestore deste processo (recriado após um fork)."""
+    global _db, _db_pid
+    if _db is not None and _db_pid == os.getpid():
+        return _db
+    with _lock:
+        if _db is None or _db_pid != os.getpid():
+            app = obter_app()
+            from firebase_admin import firestore
+
+            _db = firestore.client(app)
+            _db_pid = os.getpid()
+    return _db
+
+
+def criar_cliente_async():
+    """Novo AsyncClient do Firestore, com as credenciais do app. Crie dentro do event loop
+       que vai usá-lo (ver async_storage.py): o cliente não pode ser trocado de loop."""
+    from google.cloud import firestore as cloud_firestore
+
+    app = obter_app()
+    return cloud_firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+
+
+def aquecer(criar_cliente=False):
+    """Importa os módulos e inicializa o app agora (ex.: no mestre do gunicorn --preload).
+       Com criar_cliente, cria também o cliente do Firestore (só fora de processos que vão dar fork)."""
+    importlib.import_module('firebase_admin.firestore')
+    importlib.import_module('firebase_admin.auth')
+    obter_app()
+    if criar_cliente:
+        obter_db()
+
+
+def apos_fork():
+    """Chamado no worker recém-criado: descarta o cliente gRPC herdado do mestre."""
+    global _db, _db_pid, _lock
+    _lock = threading.RLock()
+    _db = None
+    _db_pid = None
+
+
+class _Preguicoso:
+    """Repassa atributos ao objeto devolvido por `fabrica`, chamada só no primeiro uso."""
+
+    def __init__(self, fabrica, nome):
+        self._fabrica = fabrica
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        return getattr(self._fabrica(), atributo)
+
+    def __repr__(self):
+        return f'<{self._nome} (inicialização preguiçosa)>'
+
+
+def _auth():
+    # firebase_admin.auth usa o app padrão: ele precisa existir antes da chamada
+    obter_app()
+    return importlib.import_module('firebase_admin.auth')
+
+
+db = _Preguicoso(obter_db, 'firestore.Client')
+auth = _Preguicoso(_auth, 'firebase_admin.auth')
+firestore = _Preguicoso(lambda: importlib.import_module('firebase_admin.firestore'), 'firebase_admin.firestore')
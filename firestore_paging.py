@@ -0,0 +1,21 @@
+def paginar_colecao(colecao_ref, tamanho_pagina=300, inicio_apos_id=None):
+    """Percorre uma coleção inteira em páginas ordenadas pelo ID do documento.
+
+    Gera listas de DocumentSnapshot com no máximo `tamanho_pagina` itens, sem
+    manter a coleção em memória. `inicio_apos_id` retoma a partir do documento
+    seguinte ao ID informado (ex.: último ID salvo em um checkpoint). O cursor é
+    só o ID ({'__name__': id}), não um snapshot: o documento do checkpoint pode
+    ter sido apagado desde então, e a retomada não gasta uma leitura com ele.
+    """
+    consulta = colecao_ref.order_by('__name__').limit(tamanho_pagina)
+    ultimo_id = inicio_apos_id
+
+    while True:
+        pagina_consulta = consulta.start_after({'__name__': ultimo_id}) if ultimo_id else consulta
+        pagina = list(pagina_consulta.stream())
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamanho_pagina:
+            return
+        ultimo_id = pagina[-1].id
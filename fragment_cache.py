@@ -0,0 +1,49 @@
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCacheExtension(Extension):
+    """Tag {% fragmento chave, ... %}...{% endfragmento %}: renderiza o trecho uma
+    vez por processo e reaproveita o HTML nas próximas requisições.
+
+    Use só em trechos que não dependem do usuário (o corpo estático dos
+    módulos, por exemplo). Se alguma parte da chave for vazia ou indefinida, o
+    trecho é renderizado normalmente, sem cache. `env.fragmentos_ativos = False`
+    desliga o cache (ex.: em debug, para ver mudanças nos templates).
+    """
+
+    tags = {'fragmento'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragmentos={}, fragmentos_ativos=True, fragmentos_lock=threading.Lock())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        corpo = parser.parse_statements(['name:endfragmento'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_renderizar', [nodes.List(partes)]), [], [], corpo
+        ).set_lineno(lineno)
+
+    def _renderizar(self, partes, caller):
+        env = self.environment
+        if not env.fragmentos_ativos or not all(partes):
+            return caller()
+        chave = tuple(str(parte) for parte in partes)
+        html = env.fragmentos.get(chave)
+        if html is None:
+            # Duas requisições podem renderizar o mesmo trecho em paralelo: o resultado é igual
+            html = caller()
+            with env.fragmentos_lock:
+                env.fragmentos[chave] = html
+        return html
+
+
+def limpar_fragmentos(env):
+    with env.fragmentos_lock:
+        env.fragmentos.clear()
@@ -0,0 +1,37 @@
+"""Configuração do gunicorn (lida automaticamente de ./gunicorn.conf.py).
+
+Com GUNICORN_PRELOAD=1 o app é importado uma vez no processo mestre e os
+workers nascem por fork já com módulos, templates e credenciais do Firebase
+carregados: o boot de cada worker cai para quase zero. O cliente do
+Firestore (gRPC) é sempre criado dentro de cada worker, no primeiro uso.
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+
+
+def on_starting(server):
+    # O buffer write-behind das submissões é por processo (ver write_buffer.py)
+    from write_buffer import exigir_worker_unico
+
+    exigir_worker_unico(server.cfg.workers, float(os.environ.get('SUBMISSION_WRITE_BEHIND_WINDOW', 0)))
+
+
+def when_ready(server):
+    # Roda no mestre depois de carregar o app e antes de criar os workers
+    if preload_app and os.environ.get('FIREBASE_PRELOAD', '1') == '1':
+        import firebase_client
+
+        try:
+            firebase_client.aquecer()
+            server.log.info('Firebase pré-carregado no mestre.')
+        except Exception as e:
+            # Sem credenciais o app continua subindo; o erro reaparece no primeiro uso
+            server.log.warning(f'Firebase não pré-carregado: {e}')
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+
+        app.reiniciar_apos_fork()
@@ -0,0 +1,333 @@
+import contextvars
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+# Limites (segundos) do histograma de duração das requisições em /metrics
+FAIXAS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def tamanho_documento(valor):
+    """Tamanho aproximado em bytes, pelas regras de armazenamento do Firestore
+       (string = bytes UTF-8 + 1, número/data = 8, bool/null = 1, map = nomes + valores)."""
+    if valor is None or isinstance(valor, bool):
+        return 1
+    if isinstance(valor, str):
+        return len(valor.encode('utf-8')) + 1
+    if isinstance(valor, (int, float, datetime, date)):
+        return 8
+    if isinstance(valor, dict):
+        return sum(len(str(chave).encode('utf-8')) + 1 + tamanho_documento(item) for chave, item in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_documento(item) for item in valor)
+    if isinstance(valor, bytes):
+        return len(valor)
+    # Sentinelas (Increment, SERVER_TIMESTAMP) e referências
+    return 8
+
+
+class Instrumentacao:
+    """Contabiliza as chamadas ao Firestore da requisição atual e acumula os
+    totais por rota expostos em /metrics.
+
+    A requisição atual fica em um ContextVar: por thread nas rotas síncronas e
+    por tarefa no event loop do asgi.py, onde várias requisições se alternam
+    na mesma thread.
+
+    O fluxo é iniciar() no começo da requisição, registrar() a cada chamada
+    (feito por InstrumentedFirestore) e finalizar() no fim, que devolve o
+    resumo da requisição e o soma às métricas da rota.
+    """
+
+    def __init__(self):
+        self._atual = contextvars.ContextVar(f'instrumentacao_{id(self)}', default=None)
+        self._lock = threading.Lock()
+        self.requisicoes = defaultdict(int)       # (rota, método, status) -> total
+        self.duracao = defaultdict(lambda: [0] * (len(FAIXAS_DURACAO) + 1))  # rota -> contagens por faixa
+        self.duracao_soma = defaultdict(float)    # rota -> segundos
+        self.chamadas = defaultdict(int)          # (rota, operação) -> total
+        self.bytes = defaultdict(int)             # (rota, 'lidos'|'gravados') -> total
+        self.segundos_firestore = defaultdict(float)  # rota -> segundos
+
+    def iniciar(self):
+        self._atual.set({'chamadas': defaultdict(int), 'lidos': 0, 'gravados': 0, 'segundos': 0.0})
+
+    def registrar(self, operacao, segundos, lidos=0, gravados=0):
+        atual = self._atual.get()
+        if atual is None:
+            # Fora de requisição (jobs, threads de fundo): conta na rota '-'
+            with self._lock:
+                self.chamadas[('-', operacao)] += 1
+                self.bytes[('-', 'lidos')] += lidos
+                self.bytes[('-', 'gravados')] += gravados
+                self.segundos_firestore['-'] += segundos
+            return
+        atual['chamadas'][operacao] += 1
+        atual['lidos'] += lidos
+        atual['gravados'] += gravados
+        atual['segundos'] += segundos
+
+    def finalizar(self, rota, metodo, status, segundos):
+        """Encerra a contagem da requisição e retorna o resumo (ou None se não iniciada)."""
+        atual = self._atual.get()
+        self._atual.set(None)
+        if atual is None:
+            return None
+
+        faixa = next((i for i, limite in enumerate(FAIXAS_DURACAO) if segundos <= limite), len(FAIXAS_DURACAO))
+        with self._lock:
+            self.requisicoes[(rota, metodo, status)] += 1
+            self.duracao[rota][faixa] += 1
+            self.duracao_soma[rota] += segundos
+            for operacao, total in atual['chamadas'].items():
+                self.chamadas[(rota, operacao)] += total
+            self.bytes[(rota, 'lidos')] += atual['lidos']
+            self.bytes[(rota, 'gravados')] += atual['gravados']
+            self.segundos_firestore[rota] += atual['segundos']
+
+        atual['total_chamadas'] = sum(atual['chamadas'].values())
+        return atual
+
+    def prometheus(self):
+        """Métricas no formato texto do Prometheus (text/plain; version=0.0.4)."""
+        linhas = []
+
+        def bloco(nome, tipo, ajuda):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+
+        with self._lock:
+            bloco('pcteacher_requests_total', 'counter', 'Requisições atendidas.')
+            for (rota, metodo, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f'pcteacher_requests_total{{route="{rota}",method="{metodo}",status="{status}"}} {total}')
+
+            bloco('pcteacher_request_duration_seconds', 'histogram', 'Duração das requisições.')
+            for rota, contagens in sorted(self.duracao.items()):
+                acumulado = 0
+                for limite, total in zip(FAIXAS_DURACAO + ('+Inf',), contagens):
+                    acumulado += total
+                    linhas.append(f'pcteacher_request_duration_seconds_bucket{{route="{rota}",le="{limite}"}} {acumulado}')
+                linhas.append(f'pcteacher_request_duration_seconds_sum{{route="{rota}"}} {self.duracao_soma[rota]:.6f}')
+                linhas.append(f'pcteacher_request_duration_seconds_count{{route="{rota}"}} {acumulado}')
+
+            bloco('pcteacher_firestore_calls_total', 'counter', 'Chamadas ao Firestore por rota e operação.')
+            for (rota, operacao), total in sorted(self.chamadas.items()):
+                linhas.append(f'pcteacher_firestore_calls_total{{route="{rota}",op="{operacao}"}} {total}')
+
+            bloco('pcteacher_firestore_bytes_total', 'counter', 'Bytes (estimados) lidos e gravados no Firestore.')
+            for (rota, direcao), total in sorted(self.bytes.items()):
+                linhas.append(f'pcteacher_firestore_bytes_total{{route="{rota}",direction="{direcao}"}} {total}')
+
+            bloco('pcteacher_firestore_seconds_total', 'counter', 'Tempo gasto esperando o Firestore.')
+            for rota, segundos in sorted(self.segundos_firestore.items()):
+                linhas.append(f'pcteacher_firestore_seconds_total{{route="{rota}"}} {segundos:.6f}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+def _original(objeto):
+    return getattr(objeto, '_alvo', objeto)
+
+
+class _Instrumentado:
+    """Repassa tudo ao objeto original; subclasses interceptam só as chamadas de rede."""
+
+    def __init__(self, alvo, instrumentacao):
+        self._alvo = alvo
+        self._instrumentacao = instrumentacao
+
+    def __getattr__(self, nome):
+        return getattr(self._alvo, nome)
+
+    def _medir(self, operacao, funcao, *args, gravados=0, **kwargs):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        return self._registrar(operacao, inicio, resultado, gravados)
+
+    async def _medir_async(self, operacao, funcao, *args, gravados=0, **kwargs):
+        inicio = time.perf_counter()
+        resultado = await funcao(*args, **kwargs)
+        return self._registrar(operacao, inicio, resultado, gravados)
+
+    def _registrar(self, operacao, inicio, resultado, gravados):
+        lidos = 0
+        if operacao == 'get' and getattr(resultado, 'exists', False):
+            lidos = tamanho_documento(resultado.to_dict())
+        self._instrumentacao.registrar(operacao, time.perf_counter() - inicio, lidos=lidos, gravados=gravados)
+        return resultado
+
+
+class _DocumentoInstrumentado(_Instrumentado):
+    def get(self, *args, **kwargs):
+        return self._medir('get', self._alvo.get, *args, **kwargs)
+
+    def set(self, data, *args, **kwargs):
+        return self._medir('set', self._alvo.set, data, *args, gravados=tamanho_documento(data), **kwargs)
+
+    def update(self, data, *args, **kwargs):
+        return self._medir('update', self._alvo.update, data, *args, gravados=tamanho_documento(data), **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._medir('delete', self._alvo.delete, *args, **kwargs)
+
+    def collection(self, nome):
+        return _ConsultaInstrumentada(self._alvo.collection(nome), self._instrumentacao)
+
+
+class _ConsultaInstrumentada(_Instrumentado):
+    def document(self, doc_id=None):
+        return _DocumentoInstrumentado(self._alvo.document(doc_id), self._instrumentacao)
+
+    def where(self, *args, **kwargs):
+        return _ConsultaInstrumentada(self._alvo.where(*args, **kwargs), self._instrumentacao)
+
+    def order_by(self, *args, **kwargs):
+        return _ConsultaInstrumentada(self._alvo.order_by(*args, **kwargs), self._instrumentacao)
+
+    def limit(self, *args, **kwargs):
+        return _ConsultaInstrumentada(self._alvo.limit(*args, **kwargs), self._instrumentacao)
+
+    def start_after(self, *args, **kwargs):
+        return _ConsultaInstrumentada(self._alvo.start_after(*args, **kwargs), self._instrumentacao)
+
+    def stream(self, *args, **kwargs):
+        # O tempo da query inclui o consumo do iterador (os documentos chegam aos poucos)
+        segundos, lidos = 0.0, 0
+        inicio = time.perf_counter()
+        try:
+            for snapshot in self._alvo.stream(*args, **kwargs):
+                segundos += time.perf_counter() - inicio
+                lidos += tamanho_documento(snapshot.to_dict())
+                yield snapshot
+                inicio = time.perf_counter()
+            segundos += time.perf_counter() - inicio
+        finally:
+            self._instrumentacao.registrar('query', segundos, lidos=lidos)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+
+class _BatchInstrumentado(_Instrumentado):
+    def __init__(self, alvo, instrumentacao):
+        super().__init__(alvo, instrumentacao)
+        self._gravados = 0
+
+    def set(self, ref, data, *args, **kwargs):
+        self._gravados += tamanho_documento(data)
+        return self._alvo.set(_original(ref), data, *args, **kwargs)
+
+    def update(self, ref, data, *args, **kwargs):
+        self._gravados += tamanho_documento(data)
+        return self._alvo.update(_original(ref), data, *args, **kwargs)
+
+    def delete(self, ref, *args, **kwargs):
+        return self._alvo.delete(_original(ref), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        gravados, self._gravados = self._gravados, 0
+        return self._medir('commit', self._alvo.commit, *args, gravados=gravados, **kwargs)
+
+
+class InstrumentedFirestore(_Instrumentado):
+    """Envolve o cliente do Firestore (real ou fake) contando chamadas, bytes e
+    tempo em `instrumentacao`. Transações passam direto: as leituras feitas com
+    ref.get(transaction=...) são contadas, os commits da transação não."""
+
+    def collection(self, nome):
+        return _ConsultaInstrumentada(self._alvo.collection(nome), self._instrumentacao)
+
+    def document(self, caminho):
+        return _DocumentoInstrumentado(self._alvo.document(caminho), self._instrumentacao)
+
+    def batch(self):
+        return _BatchInstrumentado(self._alvo.batch(), self._instrumentacao)
+
+    def get_all(self, refs, *args, **kwargs):
+        inicio = time.perf_counter()
+        snapshots = list(self._alvo.get_all([_original(ref) for ref in refs], *args, **kwargs))
+        lidos = sum(tamanho_documento(snapshot.to_dict()) for snapshot in snapshots if snapshot.exists)
+        self._instrumentacao.registrar('get_all', time.perf_counter() - inicio, lidos=lidos)
+        return iter(snapshots)
+
+
+class PerfiladorLento:
+    """Perfila com cProfile uma amostra das requisições e grava o .prof das que
+    passarem de `limite_ms` em `diretorio` (abra com snakeviz ou pstats).
+
+    Só uma requisição é perfilada por vez no processo: o Python não permite
+    dois perfiladores ativos, e as demais seguem sem custo extra.
+    """
+
+    def __init__(self, diretorio, limite_ms, amostragem=0.05):
+        self.diretorio = diretorio
+        self.limite = limite_ms / 1000
+        self.amostragem = amostragem
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Retorna o perfilador ativo para esta requisição, ou None se não foi sorteada."""
+        if random.random() >= self.amostragem or not self._lock.acquire(blocking=False):
+            return None
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Outro perfilador (ex.: depurador) já está ativo
+            self._lock.release()
+            return None
+        return perfilador
+
+    def finalizar(self, perfilador, rota, segundos):
+        """Para o perfilador; retorna o caminho do dump se a requisição foi lenta."""
+        perfilador.disable()
+        try:
+            if segundos < self.limite:
+                return None
+            os.makedirs(self.diretorio, exist_ok=True)
+            nome_rota = rota.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'index'
+            caminho = os.path.join(
+                self.diretorio, f'{datetime.now():%Y%m%d-%H%M%S}-{nome_rota}-{int(segundos * 1000)}ms.prof'
+            )
+            perfilador.dump_stats(caminho)
+            return caminho
+        finally:
+            self._lock.release()
+
+
+class _DocumentoAsyncInstrumentado(_Instrumentado):
+    async def get(self, *args, **kwargs):
+        return await self._medir_async('get', self._alvo.get, *args, **kwargs)
+
+    async def set(self, data, *args, **kwargs):
+        return await self._medir_async('set', self._alvo.set, data, *args, gravados=tamanho_documento(data), **kwargs)
+
+    async def update(self, data, *args, **kwargs):
+        return await self._medir_async('update', self._alvo.update, data, *args,
+                                       gravados=tamanho_documento(data), **kwargs)
+
+
+class _ColecaoAsyncInstrumentada(_Instrumentado):
+    def document(self, doc_id=None):
+        return _DocumentoAsyncInstrumentado(self._alvo.document(doc_id), self._instrumentacao)
+
+
+class InstrumentedAsyncFirestore(_Instrumentado):
+    """InstrumentedFirestore para o AsyncClient das rotas async (get_all e get/set/update
+    de documentos, o que async_storage.py usa). O tempo é o de espera da requisição,
+    que inclui o que o event loop fez por outras requisições no meio."""
+
+    def collection(self, nome):
+        return _ColecaoAsyncInstrumentada(self._alvo.collection(nome), self._instrumentacao)
+
+    async def get_all(self, refs, *args, **kwargs):
+        inicio = time.perf_counter()
+        snapshots = [snapshot async for snapshot in self._alvo.get_all([_original(ref) for ref in refs], *args, **kwargs)]
+        lidos = sum(tamanho_documento(snapshot.to_dict()) for snapshot in snapshots if snapshot.exists)
+        self._instrumentacao.registrar('get_all', time.perf_counter() - inicio, lidos=lidos)
+        for snapshot in snapshots:
+            yield snapshot
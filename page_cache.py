@@ -0,0 +1,176 @@
+"""Cache de página inteira para visitantes anônimos (landing e páginas públicas).
+
+A maior parte do tráfego da página inicial e das páginas infor-curso-* é de
+visitantes sem login, e o HTML deles é sempre o mesmo. A primeira requisição
+anônima renderiza normalmente; o corpo vai para um LRU em memória (e, se
+houver `pasta`, para um arquivo compartilhado entre os workers do
+gunicorn). As seguintes recebem os bytes prontos, com ETag e Cache-Control
+para o navegador e a CDN.
+
+A chave é a rota mais a versão dos templates (ver versao_templates): um
+deploy que muda um template ou os estáticos gera chaves novas, e as antigas
+saem do LRU / são ignoradas no disco. `init_app` liga o cache às rotas
+públicas; requisições com usuário na sessão, ou com mensagens flash
+pendentes, passam direto pela view.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from flask import g, request, session
+
+from cache import TTLCache
+
+
+def versao_templates(pasta, *extras):
+    """Hash curto dos templates (nome, tamanho e mtime de cada arquivo) e de `extras`
+       (ex.: o manifest dos estáticos, cujos nomes com hash aparecem no HTML)."""
+    digest = hashlib.sha256()
+    for raiz, _, arquivos in sorted(os.walk(pasta)):
+        for nome in sorted(arquivos):
+            info = os.stat(os.path.join(raiz, nome))
+            digest.update(f'{os.path.relpath(os.path.join(raiz, nome), pasta)}:{info.st_size}:{info.st_mtime_ns};'.encode())
+    for extra in extras:
+        digest.update(repr(extra).encode())
+    return digest.hexdigest()[:12]
+
+
+class PaginaEmCache:
+    __slots__ = ('corpo', 'mimetype', 'etag')
+
+    def __init__(self, corpo, mimetype, etag=None):
+        self.corpo = corpo
+        self.mimetype = mimetype
+        self.etag = etag or hashlib.sha256(corpo).hexdigest()[:20]
+
+
+class CachePaginas:
+    """LRU de páginas renderizadas, com TTL, opcionalmente espelhado em `pasta`.
+
+    ttl <= 0 ou maxsize <= 0 desativa o cache. No disco, cada página é um
+    arquivo '<hash da chave>.html' gravado de forma atômica; a idade vem do
+    mtime, então um worker não serve o que outro gravou há mais de `ttl`.
+    """
+
+    def __init__(self, versao, maxsize=64, ttl=300, pasta=None, max_age=60):
+        self.versao = versao
+        self.memoria = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.pasta = pasta
+        self.max_age = max_age
+        self.endpoints = frozenset()
+        if pasta and self.enabled:
+            os.makedirs(pasta, exist_ok=True)
+
+    def init_app(self, app, endpoints):
+        """Serve `endpoints` do cache para visitantes anônimos. Registre depois dos
+           before_request que devem rodar em toda requisição (métricas, perfil)."""
+        self.app = app
+        self.endpoints = frozenset(endpoints)
+        app.before_request(self._servir)
+        app.after_request(self._guardar)
+
+    @property
+    def enabled(self):
+        return self.memoria.enabled
+
+    def chave(self, rota):
+        return f'{self.versao}:{rota}'
+
+    def _arquivo(self, chave):
+        return os.path.join(self.pasta, hashlib.sha256(chave.encode()).hexdigest()[:32] + '.html')
+
+    def get(self, rota):
+        if not self.enabled:
+            return None
+        chave = self.chave(rota)
+        pagina = self.memoria.get(chave)
+        if pagina is None and self.pasta:
+            pagina = self._ler_disco(chave)
+            if pagina is not None:
+                self.memoria.set(chave, pagina)
+        return pagina
+
+    def set(self, rota, corpo, mimetype):
+        if not self.enabled:
+            return None
+        chave = self.chave(rota)
+        pagina = PaginaEmCache(corpo, mimetype)
+        self.memoria.set(chave, pagina)
+        if self.pasta:
+            self._gravar_disco(chave, pagina)
+        return pagina
+
+    def clear(self):
+        self.memoria.clear()
+        if self.pasta and os.path.isdir(self.pasta):
+            for nome in os.listdir(self.pasta):
+                if nome.endswith('.html'):
+                    os.remove(os.path.join(self.pasta, nome))
+
+    # --- Flask ---
+
+    @staticmethod
+    def anonima():
+        # '_flashes': a página mostraria a mensagem (ex.: "Você saiu da sua conta.")
+        return 'usuario_id' not in session and '_flashes' not in session
+
+    def _cabecalhos(self, response, pagina):
+        response.set_etag(pagina.etag)
+        # Igual para todo visitante anônimo: navegador e CDN podem guardar. A sessão
+        # lida acima acrescenta 'Vary: Cookie', então quem tem cookie não recebe a cópia da CDN.
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response
+
+    def _servir(self):
+        if (not self.enabled or request.endpoint not in self.endpoints
+                or request.method not in ('GET', 'HEAD') or not self.anonima()):
+            return None
+        rota = request.script_root + request.path
+        pagina = self.get(rota)
+        if pagina is None:
+            g.pagina_publica = rota
+            return None
+        if request.if_none_match.contains(pagina.etag):
+            return self._cabecalhos(self.app.response_class(status=304), pagina)
+        return self._cabecalhos(self.app.response_class(pagina.corpo, mimetype=pagina.mimetype), pagina)
+
+    def _guardar(self, response):
+        rota = g.pop('pagina_publica', None)
+        if (rota is None or response.status_code != 200 or response.direct_passthrough
+                or not self.anonima()):
+            return response
+        pagina = self.set(rota, response.get_data(), response.mimetype)
+        if pagina is not None:
+            self._cabecalhos(response, pagina)
+        return response
+
+    # --- Disco ---
+
+    def _ler_disco(self, chave):
+        caminho = self._arquivo(chave)
+        try:
+            if time.time() - os.path.getmtime(caminho) > self.ttl:
+                return None
+            with open(caminho, 'rb') as arquivo:
+                # Primeira linha: a chave completa (contra colisão do hash) e o mimetype
+                cabecalho, corpo = arquivo.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        chave_arquivo, _, mimetype = cabecalho.decode().partition('\t')
+        if chave_arquivo != chave:
+            return None
+        return PaginaEmCache(corpo, mimetype)
+
+    def _gravar_disco(self, chave, pagina):
+        try:
+            descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(f'{chave}\t{pagina.mimetype}\n'.encode())
+                arquivo.write(pagina.corpo)
+            os.replace(temporario, self._arquivo(chave))
+        except OSError as e:
+            # Sem disco o cache em memória continua valendo
+            print(f"AVISO: não foi possível gravar a página em cache ({chave}): {e}")
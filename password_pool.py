@@ -0,0 +1,81 @@
+"""Hash e verificação de senhas fora da thread da requisição.
+
+generate_password_hash/check_password_hash (scrypt/PBKDF2) são lentos de
+propósito. O hashlib libera o GIL durante o KDF, mas cada hash ocupa um
+núcleo inteiro: numa rajada de logins, todas as threads do worker (gthread)
+calculam hashes ao mesmo tempo e as rotas que não tocam em senha disputam a
+CPU com elas. PasswordPool manda esse trabalho para um pool de processos
+pequeno e limitado, que usa no máximo `workers` núcleos; a thread da
+requisição só espera o resultado.
+
+O limite vale por worker: no máximo `workers` hashes rodando e `fila`
+esperando. A vaga só é devolvida quando o hash termina no pool, mesmo que
+quem pediu já tenha desistido. Sem vaga em `timeout` segundos, ou sem
+resultado em `timeout` segundos, a chamada levanta PoolDeSenhasOcupado em
+vez de empilhar trabalho que o servidor não vai conseguir entregar. Com
+workers=0 tudo roda na própria thread (desenvolvimento).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PoolDeSenhasOcupado(RuntimeError):
+    """Todas as vagas do pool estão ocupadas há mais de `timeout` segundos."""
+
+
+class PasswordPool:
+    def __init__(self, workers=1, fila=8, timeout=10):
+        self.workers = workers
+        self.timeout = timeout
+        self._vagas_total = workers + fila
+        self._vagas = threading.BoundedSemaphore(self._vagas_total)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _obter_pool(self):
+        # Criado no primeiro uso e recriado após um fork (gunicorn --preload)
+        if self._pool is not None and self._pool_pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # spawn: o filho não herda as threads (e locks) do worker
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+        return self._pool
+
+    def apos_fork(self):
+        """No worker recém-criado: o pool e os semáforos do mestre não valem aqui."""
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(self._vagas_total)
+        self._pool = None
+        self._pool_pid = None
+
+    def _executar(self, funcao, *args):
+        if self.workers <= 0:
+            return funcao(*args)
+        vagas = self._vagas
+        if not vagas.acquire(timeout=self.timeout):
+            raise PoolDeSenhasOcupado('Muitas operações de senha em andamento.')
+        try:
+            future = self._obter_pool().submit(funcao, *args)
+        except BaseException:
+            vagas.release()
+            raise
+        # A vaga volta quando o processo termina, não quando a requisição desiste
+        future.add_done_callback(lambda _: vagas.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PoolDeSenhasOcupado('Operação de senha demorou demais.') from None
+
+    def gerar_hash(self, senha):
+        return self._executar(generate_password_hash, senha)
+
+    def verificar(self, senha_hash, senha):
+        return self._executar(check_password_hash, senha_hash, senha)
@@ -0,0 +1,80 @@
+import time
+
+from firestore_paging import paginar_colecao
+
+
+def completar_portfolios(db, slugs, tamanho_pagina=300, relatorio=print):
+    """Preenche 'portfolios/{user_id}' com as respostas antigas de 'respostas_projeto'.
+
+    Rode uma vez depois do deploy que criou os portfólios: até lá, quem salvou
+    respostas antes só tem no portfólio as que salvou depois (ou nenhum
+    portfólio), e a leitura soma os documentos por módulo a cada acesso (ver
+    FirestoreStorage.get_portfolio). Percorre 'usuarios' em páginas, lê os
+    portfólios da página em um get_all e completa só os que não têm
+    'completo'. Só entram os módulos que ainda não estão no portfólio (o que
+    salvar_resposta gravou lá é sempre o mais novo), e a gravação leva a
+    pré-condição last_update_time do portfólio lido (ou é um create, se ele
+    não existe): se uma resposta for salva no meio, o portfólio é relido e
+    completado de novo (ver _completar_portfolio). Retorna um dict com as
+    estatísticas.
+    """
+    from google.api_core.exceptions import Conflict, FailedPrecondition
+
+    estatisticas = {'lidos': 0, 'completados': 0, 'ja_completos': 0, 'conflitos': 0}
+    inicio = time.perf_counter()
+
+    for pagina in paginar_colecao(db.collection('usuarios'), tamanho_pagina):
+        refs = [db.collection('portfolios').document(usuario.id) for usuario in pagina]
+        completos = {snapshot.id for snapshot in db.get_all(refs)
+                     if snapshot.exists and (snapshot.to_dict() or {}).get('completo')}
+        for referencia in refs:
+            if referencia.id in completos:
+                estatisticas['ja_completos'] += 1
+                continue
+            resultado = _completar_portfolio(db, referencia, slugs, (Conflict, FailedPrecondition))
+            if resultado:
+                estatisticas['completados'] += 1
+            elif resultado is None:
+                estatisticas['ja_completos'] += 1
+            else:
+                estatisticas['conflitos'] += 1
+        estatisticas['lidos'] += len(pagina)
+
+        decorrido = time.perf_counter() - inicio
+        relatorio(f"{estatisticas['lidos']} usuários, {estatisticas['completados']} portfólios completados "
+                  f"({estatisticas['lidos'] / decorrido:.0f} usuários/s)")
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    if estatisticas['conflitos']:
+        relatorio(f"AVISO: {estatisticas['conflitos']} portfólios mudaram a cada tentativa e seguem incompletos "
+                  f"(a leitura continua somando os documentos por módulo). Rode de novo para completá-los.")
+    return estatisticas
+
+
+def _completar_portfolio(db, referencia, slugs, falhas, tentativas=5):
+    """Relê e completa um portfólio. True se gravou, None se já estava completo e False se
+       ele mudou em todas as `tentativas`."""
+    user_id = referencia.id
+    for _ in range(tentativas):
+        snapshot = referencia.get()
+        portfolio = (snapshot.to_dict() or {}) if snapshot.exists else {}
+        if portfolio.get('completo'):
+            return None
+        salvas = portfolio.get('respostas') or {}
+        faltando = [slug for slug in slugs if slug not in salvas]
+        antigas = {}
+        if faltando:
+            for doc in db.get_all([db.collection('respostas_projeto').document(f'{user_id}_{slug}') for slug in faltando]):
+                if doc.exists:
+                    antigas[doc.id[len(user_id) + 1:]] = (doc.to_dict() or {}).get('conteudo_resposta')
+        try:
+            if snapshot.exists:
+                update_data = {f'respostas.{slug}': conteudo for slug, conteudo in antigas.items()}
+                update_data['completo'] = True
+                referencia.update(update_data, option=db.write_option(last_update_time=snapshot.update_time))
+            else:
+                referencia.create({'respostas': antigas, 'completo': True})
+            return True
+        except falhas:
+            continue
+    return False
@@ -0,0 +1,222 @@
+import hashlib
+from functools import lru_cache
+
+
+class ModuloCompilado:
+    """Parte estática de um item de MODULO_CONFIG, pré-calculada na importação."""
+
+    __slots__ = (
+        'slug', 'title', 'description', 'order', 'lessons', 'exercises',
+        'min_acertos', 'dependency',
+    )
+
+    def __init__(self, module_config):
+        self.slug = module_config['slug']
+        self.title = module_config['title']
+        self.description = module_config['description']
+        self.order = module_config['order']
+        self.lessons = module_config['lessons']
+        self.exercises = module_config['exercises']
+        self.min_acertos = module_config['min_acertos_para_desbloqueio']
+        self.dependency = module_config.get('dependency_field')
+
+
+class ProgressEngine:
+    """Calcula as métricas de progresso do curso a partir do documento 'progresso'.
+
+    Os totais e a cadeia de dependências são calculados uma única vez. O
+    resultado é memorizado pela "impressão digital" do progresso (concluido,
+    acertos e erros de cada módulo), então alunos no mesmo estado reutilizam
+    a mesma estrutura. O dict retornado é compartilhado: trate-o como somente
+    leitura.
+    """
+
+    def __init__(self, modulo_config, cache_size=4096):
+        self.modulos = tuple(ModuloCompilado(m) for m in modulo_config)
+        self.slugs = tuple(m.slug for m in self.modulos)
+        self.total_modules = len(self.modulos)
+        self.total_lessons = sum(m.lessons for m in self.modulos)
+        self.total_exercises = sum(m.exercises for m in self.modulos)
+        self._calcular_memo = lru_cache(maxsize=cache_size)(self._calcular)
+        # Muda a ETag de todos quando a configuração dos módulos muda (novo deploy)
+        self._versao = repr(tuple(tuple(getattr(m, campo) for campo in ModuloCompilado.__slots__)
+                                  for m in self.modulos))
+
+    def fingerprint(self, progresso_db):
+        """Reduz o documento de progresso aos campos que influenciam o cálculo."""
+        chave = []
+        for slug in self.slugs:
+            module_progress = progresso_db.get(slug) or {}
+            chave.append((
+                module_progress.get('concluido', False),
+                module_progress.get('acertos', 0),
+                module_progress.get('erros', 0),
+            ))
+        return tuple(chave)
+
+    def etag(self, progresso_db):
+        """ETag forte de calculate(progresso_db): igual enquanto a impressão digital não mudar."""
+        conteudo = self._versao + repr(self.fingerprint(progresso_db))
+        return hashlib.sha256(conteudo.encode()).hexdigest()[:20]
+
+    def calculate(self, progresso_db):
+        chave = self.fingerprint(progresso_db)
+        try:
+            return self._calcular_memo(chave)
+        except TypeError:
+            # Valor não "hasheável" vindo do banco: calcula sem memorizar
+            return self._calcular(chave)
+
+    def cache_info(self):
+        return self._calcular_memo.cache_info()
+
+    def _calcular(self, chave):
+        completed_modules = 0
+        completed_lessons = 0
+        completed_exercises = 0
+        total_acertos = 0
+        total_erros = 0
+
+        dynamic_modules = []
+
+        # Rastreia o progresso para a lógica de desbloqueio
+        last_module_was_completed = True
+
+        for modulo, (is_completed, acertos, erros) in zip(self.modulos, chave):
+            # Um módulo está desbloqueado se é o primeiro ou se o anterior foi concluído
+            is_unlocked = True if modulo.order == 1 else last_module_was_completed
+
+            total_acertos += acertos
+            total_erros += erros
+
+            if is_completed:
+                completed_modules += 1
+                completed_lessons += modulo.lessons
+                completed_exercises += modulo.exercises
+
+            dynamic_modules.append({
+                'title': modulo.title,
+                'description': modulo.description,
+                'slug': modulo.slug,
+                'order': modulo.order,
+                'is_unlocked': is_unlocked,
+                'is_completed': is_completed,
+                'lessons': modulo.lessons,
+                'exercises': modulo.exercises,
+                'min_acertos': modulo.min_acertos,
+                'acertos': acertos,
+                'erros': erros,
+                'exercises_done': acertos + erros,
+            })
+
+            last_module_was_completed = is_completed
+
+        total_modules = self.total_modules
+        overall_progress_percent = int((completed_modules / total_modules) * 100) if total_modules > 0 else 0
+
+        return {
+            'overall_percent': overall_progress_percent,
+            'completed_modules': completed_modules,
+            'total_modules': total_modules,
+            'completed_lessons': completed_lessons,
+            'total_lessons': self.total_lessons,
+            'completed_exercises': completed_exercises,
+            'total_acertos': total_acertos,
+            'total_erros': total_erros,
+            'total_exercises': self.total_exercises,
+            'modules': dynamic_modules,
+        }
+
+
+# --- Formato do documento 'progresso' ---
+#
+# v1 (legado): um mapa por módulo, mais os booleanos antigos:
+#   {'introducao': {'acertos': 3, 'erros': 1, 'concluido': True}, 'introducao_concluido': True, ...}
+# v2 (compacto): um mapa por contador; zeros e módulos não concluídos são omitidos:
+#   {'v': 2, 'a': {'introducao': 3}, 'e': {'introducao': 1}, 'c': {'introducao': True}}
+#
+# As escritas usam sempre os caminhos v2 (caminho_progresso). Um documento v1 que
+# recebe escritas novas fica "misto" até ser migrado; ler_progresso soma as duas
+# versões, e o resto do app só enxerga o formato expandido (um mapa por módulo).
+
+VERSAO_PROGRESSO = 2
+MAPAS_V2 = {'acertos': 'a', 'erros': 'e', 'concluido': 'c'}
+
+
+def caminho_progresso(caminho):
+    """'slug.acertos' -> 'a.slug' (idem erros e concluido). Outros caminhos não mudam."""
+    slug, _, campo = caminho.rpartition('.')
+    mapa = MAPAS_V2.get(campo)
+    return f'{mapa}.{slug}' if mapa and slug else caminho
+
+
+def _campo_legado(chave):
+    return chave.endswith('_concluido')
+
+
+def ler_progresso(doc):
+    """Documento 'progresso' em v1, v2 ou misto -> formato expandido
+       ({slug: {'acertos', 'erros', 'concluido'}, 'data_conclusao': ..., 'id': ...}).
+       As três versões dão a mesma estrutura: sem os booleanos legados, com os três
+       campos em todo módulo e sem os módulos zerados (que o v2 não grava)."""
+    if not doc:
+        return doc
+    progresso = {}
+    modulos = set()
+    for chave, valor in doc.items():
+        if chave == 'v' or chave in MAPAS_V2.values() or _campo_legado(chave):
+            continue
+        if isinstance(valor, dict) and valor.keys() & MAPAS_V2.keys():
+            modulos.add(chave)
+        progresso[chave] = dict(valor) if isinstance(valor, dict) else valor
+    for campo, mapa in MAPAS_V2.items():
+        for slug, valor in (doc.get(mapa) or {}).items():
+            modulos.add(slug)
+            modulo = progresso.setdefault(slug, {})
+            if campo == 'concluido':
+                modulo['concluido'] = bool(modulo.get('concluido')) or bool(valor)
+            else:
+                modulo[campo] = (modulo.get(campo) or 0) + (valor or 0)
+    for slug in modulos:
+        modulo = progresso[slug]
+        for campo, padrao in (('acertos', 0), ('erros', 0), ('concluido', False)):
+            modulo.setdefault(campo, padrao)
+        if not (modulo['acertos'] or modulo['erros'] or modulo['concluido']):
+            del progresso[slug]
+    return progresso
+
+
+def compactar_progresso(progresso):
+    """Formato expandido (ou qualquer versão) -> documento v2."""
+    compacto = {'v': VERSAO_PROGRESSO}
+    for chave, valor in (ler_progresso(progresso) or {}).items():
+        if isinstance(valor, dict) and valor.keys() & MAPAS_V2.keys():
+            for campo, mapa in MAPAS_V2.items():
+                if valor.get(campo):
+                    compacto.setdefault(mapa, {})[chave] = True if campo == 'concluido' else valor[campo]
+        elif chave != 'id' and not _campo_legado(chave):
+            compacto[chave] = valor
+    return compacto
+
+
+def migracao_progresso(doc, incremento, apagar):
+    """Campos do update() que converte um documento v1/misto em v2, ou None se já for v2.
+
+    Os contadores v1 entram nos mapas v2 com `incremento` (firestore.Increment) e os
+    campos v1 são apagados com `apagar` (firestore.DELETE_FIELD): escritas concorrentes
+    nos mapas v2 não se perdem.
+    """
+    if doc.get('v') == VERSAO_PROGRESSO:
+        return None
+    update_data = {'v': VERSAO_PROGRESSO}
+    for chave, valor in doc.items():
+        if chave in MAPAS_V2.values() or chave in ('v', 'id'):
+            continue
+        if isinstance(valor, dict) and valor.keys() & MAPAS_V2.keys():
+            for campo, mapa in MAPAS_V2.items():
+                if valor.get(campo):
+                    update_data[f'{mapa}.{chave}'] = True if campo == 'concluido' else incremento(valor[campo])
+            update_data[chave] = apagar
+        elif _campo_legado(chave):
+            update_data[chave] = apagar
+    return update_data
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+
+from firestore_paging import paginar_colecao
+from instrumentation import tamanho_documento
+from progress import compactar_progresso, migracao_progresso
+
+
+def migrar_progresso(db, checkpoint, tamanho_pagina=300, retomar=False, simular=False, relatorio=print):
+    """Converte a coleção 'progresso' para o formato compacto (v2, ver progress.py).
+
+    Percorre a coleção em páginas e grava cada página em um WriteBatch. Os
+    contadores v1 são somados com Increment e os campos v1 apagados, e cada
+    update leva a pré-condição last_update_time do snapshot lido: se uma
+    submissão (ex.: a transacional, que já soma o v1 e o apaga) gravar o
+    documento entre a leitura e o commit, o lote falha em vez de contar o v1
+    duas vezes, e os documentos da página são relidos e migrados um a um (ver
+    _migrar_documento). Documentos já em v2 são pulados. Depois de cada
+    página o último ID vai para `checkpoint`, e com `retomar` a leitura
+    continua de lá. Com `simular`, só mede. Retorna um dict com as
+    estatísticas (inclui bytes antes/depois e documentos em conflito).
+    """
+    from google.api_core.exceptions import FailedPrecondition
+    from google.cloud import firestore
+
+    inicio_apos_id = None
+    if retomar and os.path.exists(checkpoint):
+        with open(checkpoint) as arquivo:
+            inicio_apos_id = json.load(arquivo).get('ultimo_id')
+
+    estatisticas = {'lidos': 0, 'migrados': 0, 'ja_v2': 0, 'conflitos': 0, 'bytes_antes': 0, 'bytes_depois': 0}
+    inicio = time.perf_counter()
+
+    for pagina in paginar_colecao(db.collection('progresso'), tamanho_pagina, inicio_apos_id):
+        batch = db.batch()
+        alterados = []
+        for snapshot in pagina:
+            doc = snapshot.to_dict() or {}
+            estatisticas['bytes_antes'] += tamanho_documento(doc)
+            estatisticas['bytes_depois'] += tamanho_documento(compactar_progresso(doc))
+            update_data = migracao_progresso(doc, firestore.Increment, firestore.DELETE_FIELD)
+            if update_data is None:
+                estatisticas['ja_v2'] += 1
+                continue
+            batch.update(snapshot.reference, update_data,
+                         option=db.write_option(last_update_time=snapshot.update_time))
+            alterados.append(snapshot.reference)
+
+        migrados = len(alterados)
+        if alterados and not simular:
+            try:
+                batch.commit()
+            except FailedPrecondition:
+                # Algum documento mudou depois da leitura; o lote inteiro foi descartado
+                relatorio('Documentos alterados durante a migração; refazendo a página um a um...')
+                migrados = 0
+                for referencia in alterados:
+                    resultado = _migrar_documento(db, referencia, firestore, FailedPrecondition)
+                    if resultado:
+                        migrados += 1
+                    elif resultado is None:
+                        estatisticas['ja_v2'] += 1
+                    else:
+                        estatisticas['conflitos'] += 1
+        estatisticas['lidos'] += len(pagina)
+        estatisticas['migrados'] += migrados
+
+        if not simular:
+            with open(checkpoint, 'w') as arquivo:
+                json.dump({'ultimo_id': pagina[-1].id}, arquivo)
+
+        decorrido = time.perf_counter() - inicio
+        relatorio(f"{estatisticas['lidos']} lidos, {estatisticas['migrados']} migrados, "
+                  f"{estatisticas['ja_v2']} já compactos ({estatisticas['lidos'] / decorrido:.0f} docs/s)")
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    if estatisticas['conflitos']:
+        relatorio(f"AVISO: {estatisticas['conflitos']} documentos mudaram a cada tentativa e seguem no formato "
+                  f"antigo (a leitura mista continua valendo). Rode de novo para migrá-los.")
+    return estatisticas
+
+
+def _migrar_documento(db, referencia, firestore, falha_precondicao, tentativas=5):
+    """Relê e migra um só documento, com a mesma pré-condição. True se gravou, None se
+       não havia o que migrar (já em v2 ou apagado) e False se ele mudou em todas as `tentativas`."""
+    for _ in range(tentativas):
+        snapshot = referencia.get()
+        if not snapshot.exists:
+            return None
+        update_data = migracao_progresso(snapshot.to_dict() or {}, firestore.Increment, firestore.DELETE_FIELD)
+        if update_data is None:
+            return None
+        try:
+            referencia.update(update_data, option=db.write_option(last_update_time=snapshot.update_time))
+            return True
+        except falha_precondicao:
+            continue
+    return False
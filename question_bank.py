@@ -0,0 +1,143 @@
+"""Banco de questões dos módulos (data/questoes.json).
+
+As questões de múltipla escolha ficavam escritas à mão nos templates
+conteudo-*.html, com o gabarito só no atributo data-correct. Agora saem de
+um arquivo JSON (ou YAML, se o PyYAML estiver instalado) carregado uma vez
+por processo:
+
+    {"versao": 1, "modulos": {"introducao": [
+        {"id": "introducao-1", "banca": "CESGRANRIO - 2024", "enunciado": "...",
+         "imagem": {"arquivo": "img/...", "alt": "..."},
+         "opcoes": [{"texto": "...", "feedback": "..."}, ...],
+         "correta": "A"}]}}
+
+Na carga o arquivo é validado e o gabarito pré-compilado: para cada questão,
+um dict resposta -> opção com a letra, o número e o texto normalizado de
+cada opção. Corrigir uma resposta é uma consulta a esse dict, O(1) por
+questão, sem percorrer opções nem templates. O gabarito e o feedback das
+opções não vão para a página: o quiz envia a resposta ao servidor, que
+devolve o resultado e o feedback da opção escolhida.
+"""
+import json
+import os
+import re
+import unicodedata
+
+LETRAS = 'ABCDEFGHIJ'
+# O id vira o id do elemento na página (q-<id>) e vai no corpo do POST do quiz
+ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def normalizar_resposta(resposta):
+    """Chave de busca de uma resposta: sem acentos, maiúsculas e espaços extras."""
+    texto = str(resposta)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split()).casefold()
+
+
+def ler_arquivo(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        if caminho.endswith(('.yaml', '.yml')):
+            import yaml
+            return yaml.safe_load(arquivo)
+        return json.load(arquivo)
+
+
+class BancoDeQuestoes:
+    def __init__(self, dados, origem='<dict>'):
+        self.origem = origem
+        self.versao = dados.get('versao', 1)
+        self._por_modulo = {}
+        self._questoes = {}
+        self._gabarito = {}
+
+        for modulo_slug, questoes in (dados.get('modulos') or {}).items():
+            lista = []
+            for numero, questao in enumerate(questoes, start=1):
+                questao = self._validar(modulo_slug, numero, questao)
+                lista.append(questao)
+                self._questoes[questao['id']] = questao
+                self._gabarito[questao['id']] = self._compilar(questao)
+            self._por_modulo[modulo_slug] = tuple(lista)
+
+    @classmethod
+    def carregar(cls, caminho):
+        return cls(ler_arquivo(caminho), origem=os.path.basename(caminho))
+
+    def _validar(self, modulo_slug, numero, questao):
+        local = f'{self.origem}: {modulo_slug}, questão {numero}'
+        questao_id = questao.get('id')
+        if not questao_id or not ID_VALIDO.match(str(questao_id)):
+            raise ValueError(f'{local}: id ausente ou inválido ({questao_id!r}).')
+        if questao_id in self._questoes:
+            raise ValueError(f'{local}: id repetido ({questao_id}).')
+        opcoes = questao.get('opcoes') or []
+        if not 2 <= len(opcoes) <= len(LETRAS):
+            raise ValueError(f'{local}: precisa de 2 a {len(LETRAS)} opções.')
+        correta = str(questao.get('correta', '')).upper()
+        if correta not in LETRAS[:len(opcoes)]:
+            raise ValueError(f'{local}: opção correta inválida ({questao.get("correta")!r}).')
+
+        # O que os templates usam, já pronto: letra, número na página e se a opção é a correta
+        return {
+            **questao,
+            'modulo': modulo_slug,
+            'numero': numero,
+            'correta': correta,
+            'opcoes': [
+                {**opcao, 'letra': letra, 'correta': letra == correta}
+                for letra, opcao in zip(LETRAS, opcoes)
+            ],
+        }
+
+    @staticmethod
+    def _compilar(questao):
+        """{resposta normalizada: opção} com a letra, o número (1..n) e o texto de cada opção."""
+        chaves = {}
+        for posicao, opcao in enumerate(questao['opcoes'], start=1):
+            for chave in (opcao['letra'], str(posicao), opcao['texto']):
+                chaves[normalizar_resposta(chave)] = opcao
+        return chaves
+
+    # --- Consulta ---
+
+    def do_modulo(self, modulo_slug):
+        """Questões do módulo, na ordem da página (tupla vazia se não houver)."""
+        return self._por_modulo.get(modulo_slug, ())
+
+    def questao(self, questao_id):
+        return self._questoes.get(questao_id)
+
+    def gabarito(self, questao_id):
+        """Letra da opção correta, ou None se a questão não existir."""
+        questao = self._questoes.get(questao_id)
+        return questao['correta'] if questao else None
+
+    def __len__(self):
+        return len(self._questoes)
+
+    # --- Correção ---
+
+    def corrigir(self, questao_id, resposta):
+        """True/False para a resposta (letra, número ou texto da opção).
+           None se a questão não estiver no banco ou a resposta não for uma das opções."""
+        opcao = self.opcao_escolhida(questao_id, resposta)
+        return opcao['correta'] if opcao else None
+
+    def opcao_escolhida(self, questao_id, resposta):
+        """A opção (letra, texto, feedback, correta) que a resposta escolhe, ou None."""
+        chaves = self._gabarito.get(questao_id)
+        if chaves is None or resposta is None:
+            return None
+        return chaves.get(normalizar_resposta(resposta))
+
+    def corrigir_modulo(self, modulo_slug, respostas):
+        """Corrige uma lista de respostas pela posição: a i-ésima vai para a i-ésima questão
+           do módulo. Posições sem questão no banco dão None."""
+        questoes = self.do_modulo(modulo_slug)
+        return [
+            self.corrigir(questoes[indice]['id'], resposta) if indice < len(questoes) else None
+            for indice, resposta in enumerate(respostas)
+        ]
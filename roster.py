@@ -0,0 +1,92 @@
+"""Cadastro em massa de professores a partir de uma planilha CSV (dia de implantação).
+
+A planilha precisa das colunas `nome` e `email`; `senha`, `instituicao`,
+`telefone` e `cargo` são opcionais. Sem senha, é gerada uma senha temporária,
+devolvida nas credenciais para a coordenação distribuir.
+
+Linhas inválidas, e-mails repetidos na planilha e e-mails já cadastrados são
+pulados. Os hashes das senhas são gerados em paralelo num pool de processos
+(scrypt é lento de propósito). A gravação é feita em lotes: as contas do
+lote são criadas no Auth, se houver `criar_contas`, e depois gravadas em
+WriteBatches pelo storage.
+"""
+import csv
+import secrets
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from storage import normalizar_email
+
+
+def ler_planilha(arquivo):
+    """Linhas do CSV como dicts, com os nomes das colunas em minúsculas e sem espaços."""
+    leitor = csv.DictReader(arquivo)
+    leitor.fieldnames = [(campo or '').strip().lower() for campo in leitor.fieldnames or []]
+    return [{campo: (valor or '').strip() for campo, valor in linha.items() if campo} for linha in leitor]
+
+
+def provisionar_turma(storage, linhas, novo_usuario, progresso_inicial, criar_contas=None,
+                      tamanho_lote=300, workers=None, relatorio=print):
+    """Cadastra os professores de `linhas` (ver ler_planilha).
+
+    `novo_usuario(nome, email, senha_hash, **opcionais)` monta o documento do
+    usuário, `progresso_inicial()` o de progresso e `criar_contas(registros)`
+    cria as contas de [(uid, usuario_data, progresso_data)] no Auth, devolvendo
+    os UIDs que falharam. Retorna (credenciais, estatisticas); credenciais são
+    dicts nome/email/senha, com senha vazia quando veio da planilha.
+    """
+    estatisticas = {'linhas': len(linhas), 'invalidas': 0, 'ja_cadastrados': 0, 'criados': 0, 'falhas_auth': 0}
+    inicio = time.perf_counter()
+
+    validas = {}
+    for numero, linha in enumerate(linhas, start=2):  # a linha 1 é o cabeçalho
+        chave = normalizar_email(linha.get('email'))
+        if not linha.get('nome') or '@' not in chave or chave in validas:
+            estatisticas['invalidas'] += 1
+            relatorio(f'Linha {numero} ignorada: nome ausente, e-mail inválido ou repetido.')
+            continue
+        validas[chave] = linha
+
+    existentes = storage.emails_cadastrados(validas)
+    estatisticas['ja_cadastrados'] = len(existentes)
+    novos = [linha for chave, linha in validas.items() if chave not in existentes]
+    if not novos:
+        estatisticas['segundos'] = time.perf_counter() - inicio
+        return [], estatisticas
+
+    senhas = [linha.get('senha') or secrets.token_urlsafe(9) for linha in novos]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(generate_password_hash, senhas, chunksize=8))
+    relatorio(f'{len(hashes)} senhas processadas em {time.perf_counter() - inicio:.1f}s.')
+
+    credenciais = []
+    opcionais = ('instituicao', 'telefone', 'cargo')
+    for inicio_lote in range(0, len(novos), tamanho_lote):
+        registros = []
+        for linha, senha, senha_hash in zip(novos[inicio_lote:inicio_lote + tamanho_lote],
+                                            senhas[inicio_lote:inicio_lote + tamanho_lote],
+                                            hashes[inicio_lote:inicio_lote + tamanho_lote]):
+            extras = {campo: linha[campo] for campo in opcionais if linha.get(campo)}
+            usuario_data = novo_usuario(linha['nome'], linha['email'], senha_hash, **extras)
+            registros.append((uuid.uuid4().hex, usuario_data, progresso_inicial()))
+            credenciais.append({'nome': linha['nome'], 'email': linha['email'],
+                                'senha': '' if linha.get('senha') else senha})
+
+        falhas = criar_contas(registros) if criar_contas else set()
+        if falhas:
+            estatisticas['falhas_auth'] += len(falhas)
+            emails_falhos = {normalizar_email(dados['email']) for uid, dados, _ in registros if uid in falhas}
+            credenciais = [c for c in credenciais if normalizar_email(c['email']) not in emails_falhos]
+            registros = [registro for registro in registros if registro[0] not in falhas]
+
+        estatisticas['criados'] += storage.criar_usuarios_lote(registros)
+        decorrido = time.perf_counter() - inicio
+        relatorio(f"{estatisticas['criados']} de {len(novos)} professores criados "
+                  f"({estatisticas['criados'] / decorrido:.0f}/s)...")
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    estatisticas['por_segundo'] = estatisticas['criados'] / estatisticas['segundos']
+    return credenciais, estatisticas
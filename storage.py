@@ -0,0 +1,499 @@
+"""Camada de armazenamento de usuários, progresso e respostas do projeto.
+
+O app fala com `storage` em vez de chamar db.collection(...) nas rotas. Há duas
+implementações com a mesma interface:
+
+- FirestoreStorage: produção (Render + Firebase).
+- SQLiteStorage: instalações pequenas, intranet e testes de carga sem rede
+  (WAL, pool de conexões e índice único no e-mail).
+
+Caminhos de progresso seguem a notação do Firestore: 'slug.acertos',
+'slug.concluido', 'data_conclusao'... O storage grava no formato compacto (v2)
+e devolve o progresso sempre expandido, um mapa por módulo (ver progress.py).
+"""
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from progress import caminho_progresso, ler_progresso
+
+
+def normalizar_email(email):
+    """Chave do e-mail no índice: minúsculas, sem espaços e sem '/' (inválido em IDs do Firestore)."""
+    return (email or '').strip().lower().replace('/', '%2F')
+
+
+class FirestoreStorage:
+    def __init__(self, db, email_fallback_legado=True):
+        self.db = db
+        self.email_fallback_legado = email_fallback_legado
+
+    def get_documentos(self, *chaves):
+        """Busca vários documentos em uma única ida ao Firestore (db.get_all).
+           Recebe pares (colecao, doc_id) e retorna uma lista de dicts (ou None)
+           na mesma ordem em que as chaves foram passadas."""
+        refs = [self.db.collection(colecao).document(str(doc_id)) for colecao, doc_id in chaves]
+        # get_all não garante a ordem de retorno, por isso indexamos pelo caminho
+        docs_por_caminho = {}
+        for doc in self.db.get_all(refs):
+            if doc.exists:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                docs_por_caminho[doc.reference.path] = data
+        return [docs_por_caminho.get(ref.path) for ref in refs]
+
+    # --- Usuários ---
+
+    def get_usuario(self, user_id):
+        return self.get_documentos(('usuarios', user_id))[0]
+
+    def get_usuario_e_progresso(self, user_id):
+        usuario, progresso = self.get_documentos(('usuarios', user_id), ('progresso', user_id))
+        return usuario, ler_progresso(progresso)
+
+    def carregar_pagina(self, user_id, slugs_respostas=(), incluir_usuario=True, portfolio=False):
+        """Usuário, progresso e respostas de uma página em uma única leitura em lote.
+           Retorna (usuario, progresso, {slug: resposta}); usuario/progresso são None
+           quando incluir_usuario é False. Com portfolio, as respostas vêm do documento
+           'portfolios/{user_id}' em vez de um documento por módulo."""
+        chaves = [('usuarios', user_id), ('progresso', user_id)] if incluir_usuario else []
+        chaves += _chaves_respostas(user_id, slugs_respostas, portfolio)
+        docs = self.get_documentos(*chaves)
+        usuario, progresso = (docs[0], ler_progresso(docs[1])) if incluir_usuario else (None, None)
+        docs_respostas = docs[2:] if incluir_usuario else docs
+        if portfolio:
+            respostas = self._respostas_do_portfolio(user_id, docs_respostas[0], slugs_respostas)
+        else:
+            respostas = _respostas_dos_documentos(slugs_respostas, docs_respostas)
+        return usuario, progresso, respostas
+
+    def buscar_uid_por_email(self, email):
+        chave = normalizar_email(email)
+        indice = self.get_documentos(('emails', chave))[0]
+        if indice:
+            return indice['usuario_id']
+        if not self.email_fallback_legado:
+            return None
+        # Usuário antigo, anterior ao índice: busca pela query e já cria o documento
+        usuario_doc = next(self.db.collection('usuarios').where('email', '==', email).limit(1).stream(), None)
+        if usuario_doc is None:
+            return None
+        self.db.collection('emails').document(chave).set({'usuario_id': usuario_doc.id})
+        return usuario_doc.id
+
+    def emails_cadastrados(self, emails, tamanho_lote=300):
+        """Subconjunto de `emails` (normalizados) que já têm entrada no índice.
+           Não consulta usuários antigos sem índice (ver email_fallback_legado)."""
+        chaves = list(dict.fromkeys(normalizar_email(e) for e in emails if e))
+        existentes = set()
+        for inicio in range(0, len(chaves), tamanho_lote):
+            parte = chaves[inicio:inicio + tamanho_lote]
+            docs = self.get_documentos(*(('emails', chave) for chave in parte))
+            existentes.update(chave for chave, doc in zip(parte, docs) if doc)
+        return existentes
+
+    def _criar_no_batch(self, batch, user_id, usuario_data, progresso_data):
+        batch.set(self.db.collection('usuarios').document(user_id), usuario_data)
+        batch.set(self.db.collection('progresso').document(user_id), progresso_data)
+        batch.set(self.db.collection('emails').document(normalizar_email(usuario_data['email'])), {'usuario_id': user_id})
+
+    def criar_usuario(self, user_id, usuario_data, progresso_data):
+        """Usuário, progresso e índice de e-mail em um único WriteBatch (atômico, uma ida ao servidor)."""
+        batch = self.db.batch()
+        self._criar_no_batch(batch, user_id, usuario_data, progresso_data)
+        batch.commit()
+
+    def criar_usuarios_lote(self, usuarios, tamanho_batch=500):
+        """Cria [(user_id, usuario_data, progresso_data), ...] em WriteBatches de até
+           `tamanho_batch` operações (3 por usuário). Retorna quantos foram gravados."""
+        por_batch = max(tamanho_batch // 3, 1)
+        gravados = 0
+        for inicio in range(0, len(usuarios), por_batch):
+            batch = self.db.batch()
+            for user_id, usuario_data, progresso_data in usuarios[inicio:inicio + por_batch]:
+                self._criar_no_batch(batch, user_id, usuario_data, progresso_data)
+            batch.commit()
+            gravados += len(usuarios[inicio:inicio + por_batch])
+        return gravados
+
+    def atualizar_usuario(self, user_id, update_data, email_antigo=None):
+        """Atualiza o usuário e, se o e-mail mudou, troca a entrada do índice no mesmo lote."""
+        batch = self.db.batch()
+        batch.update(self.db.collection('usuarios').document(user_id), update_data)
+        email_novo = update_data.get('email')
+        if email_novo and normalizar_email(email_novo) != normalizar_email(email_antigo):
+            if email_antigo:
+                batch.delete(self.db.collection('emails').document(normalizar_email(email_antigo)))
+            batch.set(self.db.collection('emails').document(normalizar_email(email_novo)), {'usuario_id': user_id})
+        batch.commit()
+
+    # --- Progresso ---
+
+    def atualizar_progresso(self, user_id, incrementos=None, valores=None):
+        """Aplica incrementos atômicos ({'slug.acertos': n}) e valores ({'slug.concluido': True})."""
+        update_data = _dados_progresso(incrementos, valores)
+        if update_data:
+            self.db.collection('progresso').document(user_id).update(update_data)
+
+    def atualizar_progresso_com_anterior(self, user_id, modulo_slug, incrementos=None, valores=None, tentativas=5):
+        """Como atualizar_progresso, mas devolve o mapa do módulo como estava logo antes da escrita.
+           Lê o documento e grava com a pré-condição last_update_time da leitura; se outra escrita
+           entrar no meio, relê e tenta de novo (FailedPrecondition após `tentativas`)."""
+        from google.api_core.exceptions import FailedPrecondition
+
+        referencia = self.db.collection('progresso').document(user_id)
+        update_data = _dados_progresso(incrementos, valores)
+        for tentativa in range(tentativas):
+            snapshot = referencia.get()
+            anterior = (ler_progresso(snapshot.to_dict()) or {}).get(modulo_slug) or {}
+            try:
+                referencia.update(update_data, option=self.db.write_option(last_update_time=snapshot.update_time))
+                return anterior
+            except FailedPrecondition:
+                if tentativa == tentativas - 1:
+                    raise
+
+    def incrementar_lote(self, lote, tamanho_batch=500):
+        """Grava {user_id: {'slug.acertos': n, ...}} em WriteBatches.
+           Usuários já gravados são removidos de 'lote', para que uma falha no meio
+           deixe em 'lote' apenas o que não foi confirmado."""
+        from firebase_admin import firestore
+
+        user_ids = list(lote)
+        for inicio in range(0, len(user_ids), tamanho_batch):
+            parte = user_ids[inicio:inicio + tamanho_batch]
+            batch = self.db.batch()
+            for user_id in parte:
+                incrementos = {caminho_progresso(caminho): firestore.Increment(n) for caminho, n in lote[user_id].items()}
+                batch.update(self.db.collection('progresso').document(user_id), incrementos)
+            batch.commit()
+            for user_id in parte:
+                lote.pop(user_id)
+
+    # --- Respostas do projeto ---
+
+    def get_respostas(self, user_id, slugs):
+        """{slug: conteudo_resposta} das respostas salvas (IDs determinísticos, leitura em lote)."""
+        docs = self.get_documentos(*_chaves_respostas(user_id, slugs))
+        return _respostas_dos_documentos(slugs, docs)
+
+    def salvar_resposta(self, user_id, modulo_slug, conteudo):
+        """Grava a resposta do módulo e a cópia no portfólio do usuário no mesmo lote."""
+        from firebase_admin import firestore
+
+        batch = self.db.batch()
+        batch.set(self.db.collection('respostas_projeto').document(f'{user_id}_{modulo_slug}'), {
+            'usuario_id': user_id,
+            'modulo_slug': modulo_slug,
+            'conteudo_resposta': conteudo,
+            'data_atualizacao': firestore.SERVER_TIMESTAMP
+        }, merge=True)
+        batch.set(self.db.collection('portfolios').document(user_id), {
+            'respostas': {modulo_slug: conteudo},
+            'data_atualizacao': firestore.SERVER_TIMESTAMP
+        }, merge=True)
+        batch.commit()
+
+    # --- Portfólio (todas as respostas do usuário em um só documento) ---
+
+    def get_portfolio(self, user_id, slugs):
+        """{slug: conteudo_resposta} das respostas do usuário, lidas de 'portfolios/{user_id}'."""
+        return self._respostas_do_portfolio(user_id, self.get_documentos(('portfolios', user_id))[0], slugs)
+
+    def _respostas_do_portfolio(self, user_id, portfolio, slugs):
+        salvas, faltando = _separar_portfolio(portfolio, slugs)
+        # O que já está no portfólio foi salvo depois e vale mais
+        return {**self.get_respostas(user_id, faltando), **salvas} if faltando else salvas
+
+    def paginar_respostas(self, tamanho_pagina=500):
+        """Todas as respostas do projeto, em páginas (listas de dicts com nome e e-mail do autor)."""
+        from firestore_paging import paginar_colecao
+
+        for pagina in paginar_colecao(self.db.collection('respostas_projeto'), tamanho_pagina):
+            respostas = [snapshot.to_dict() or {} for snapshot in pagina]
+            user_ids = list(dict.fromkeys(str(r.get('usuario_id')) for r in respostas))
+            usuarios = dict(zip(user_ids, self.get_documentos(*(('usuarios', uid) for uid in user_ids))))
+            yield [_linha_exportacao(r, usuarios.get(str(r.get('usuario_id')))) for r in respostas]
+
+
+def _dados_progresso(incrementos, valores):
+    """Campos do update do documento de progresso: incrementos atômicos e valores."""
+    from firebase_admin import firestore
+
+    update_data = {caminho_progresso(caminho): firestore.Increment(n) for caminho, n in (incrementos or {}).items() if n}
+    update_data.update({caminho_progresso(caminho): valor for caminho, valor in (valores or {}).items()})
+    return update_data
+
+
+def _chaves_respostas(user_id, slugs, portfolio=False):
+    if portfolio:
+        return [('portfolios', user_id)]
+    return [('respostas_projeto', f'{user_id}_{slug}') for slug in slugs]
+
+
+def _respostas_dos_documentos(slugs, docs):
+    return {slug: doc['conteudo_resposta'] for slug, doc in zip(slugs, docs) if doc}
+
+
+def _separar_portfolio(portfolio, slugs):
+    """(respostas do portfólio, slugs que faltam). Portfólio ausente, ou criado por salvar_resposta
+       só com as respostas novas: o que falta vem dos documentos por módulo, sem gravar (quem grava
+       é `flask completar-portfolios`)."""
+    salvas = {slug: conteudo for slug, conteudo in ((portfolio or {}).get('respostas') or {}).items() if slug in slugs}
+    if portfolio is None or not portfolio.get('completo'):
+        return salvas, [slug for slug in slugs if slug not in salvas]
+    return salvas, []
+
+
+def _linha_exportacao(resposta, usuario):
+    data = resposta.get('data_atualizacao')
+    return {
+        'usuario_id': resposta.get('usuario_id'),
+        'nome': (usuario or {}).get('nome', ''),
+        'email': (usuario or {}).get('email', ''),
+        'modulo_slug': resposta.get('modulo_slug'),
+        'conteudo_resposta': resposta.get('conteudo_resposta', ''),
+        'data_atualizacao': data.isoformat() if isinstance(data, datetime) else data,
+    }
+
+
+def _agora_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _serializavel(valor):
+    """Troca sentinelas do Firestore (SERVER_TIMESTAMP) e datas por strings ISO."""
+    if isinstance(valor, dict):
+        return {k: _serializavel(v) for k, v in valor.items()}
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if type(valor).__name__ == 'Sentinel':
+        return _agora_iso()
+    return valor
+
+
+def _definir_caminho(dados, caminho, valor, incremento=False):
+    *pais, campo = caminho.split('.')
+    alvo = dados
+    for parte in pais:
+        alvo = alvo.setdefault(parte, {})
+    alvo[campo] = (alvo.get(campo) or 0) + valor if incremento else valor
+
+
+class SQLiteStorage:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            dados TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios (email);
+        CREATE TABLE IF NOT EXISTS progresso (
+            usuario_id TEXT PRIMARY KEY,
+            dados TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS respostas_projeto (
+            usuario_id TEXT NOT NULL,
+            modulo_slug TEXT NOT NULL,
+            conteudo_resposta TEXT NOT NULL,
+            data_atualizacao TEXT NOT NULL,
+            PRIMARY KEY (usuario_id, modulo_slug)
+        );
+    """
+
+    def __init__(self, caminho, tamanho_pool=8):
+        self.caminho = caminho
+        self._pool = queue.LifoQueue()
+        self._criadas = 0
+        self._tamanho_pool = tamanho_pool
+        self._lock = threading.Lock()
+        with self._conexao() as conexao:
+            conexao.executescript(self.SCHEMA)
+
+    def apos_fork(self):
+        """Descarta o pool herdado do mestre (gunicorn --preload). As conexões herdadas
+           não são fechadas: fechar no filho pode liberar locks do processo pai."""
+        self._herdadas = getattr(self, '_herdadas', []) + [self._pool]
+        self._pool = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _nova_conexao(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.execute('PRAGMA synchronous=NORMAL')
+        return conexao
+
+    @contextmanager
+    def _conexao(self):
+        try:
+            conexao = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                pode_criar = self._criadas < self._tamanho_pool
+                if pode_criar:
+                    self._criadas += 1
+            conexao = self._nova_conexao() if pode_criar else self._pool.get()
+        try:
+            yield conexao
+        finally:
+            self._pool.put(conexao)
+
+    @contextmanager
+    def _transacao(self):
+        with self._conexao() as conexao:
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                yield conexao
+            except BaseException:
+                conexao.execute('ROLLBACK')
+                raise
+            conexao.execute('COMMIT')
+
+    # --- Usuários ---
+
+    def get_usuario(self, user_id):
+        with self._conexao() as conexao:
+            linha = conexao.execute('SELECT dados FROM usuarios WHERE id = ?', (str(user_id),)).fetchone()
+        if linha is None:
+            return None
+        usuario = json.loads(linha['dados'])
+        usuario['id'] = str(user_id)
+        return usuario
+
+    def get_usuario_e_progresso(self, user_id):
+        with self._conexao() as conexao:
+            linha = conexao.execute(
+                'SELECT u.dados AS usuario, p.dados AS progresso FROM usuarios u '
+                'LEFT JOIN progresso p ON p.usuario_id = u.id WHERE u.id = ?', (str(user_id),)
+            ).fetchone()
+        if linha is None:
+            return None, None
+        usuario = json.loads(linha['usuario'])
+        usuario['id'] = str(user_id)
+        progresso = ler_progresso(json.loads(linha['progresso'])) if linha['progresso'] else None
+        if progresso is not None:
+            progresso['id'] = str(user_id)
+        return usuario, progresso
+
+    def buscar_uid_por_email(self, email):
+        with self._conexao() as conexao:
+            linha = conexao.execute('SELECT id FROM usuarios WHERE email = ?', (normalizar_email(email),)).fetchone()
+        return linha['id'] if linha else None
+
+    def emails_cadastrados(self, emails):
+        chaves = list(dict.fromkeys(normalizar_email(e) for e in emails if e))
+        existentes = set()
+        with self._conexao() as conexao:
+            # Lotes abaixo do limite de parâmetros do SQLite
+            for inicio in range(0, len(chaves), 500):
+                parte = chaves[inicio:inicio + 500]
+                marcadores = ', '.join('?' for _ in parte)
+                linhas = conexao.execute(f'SELECT email FROM usuarios WHERE email IN ({marcadores})', parte).fetchall()
+                existentes.update(linha['email'] for linha in linhas)
+        return existentes
+
+    def criar_usuario(self, user_id, usuario_data, progresso_data):
+        self.criar_usuarios_lote([(user_id, usuario_data, progresso_data)])
+
+    def criar_usuarios_lote(self, usuarios, tamanho_batch=500):
+        with self._transacao() as conexao:
+            conexao.executemany('INSERT INTO usuarios (id, email, dados) VALUES (?, ?, ?)', [
+                (user_id, normalizar_email(usuario_data['email']), json.dumps(_serializavel(usuario_data)))
+                for user_id, usuario_data, _ in usuarios
+            ])
+            conexao.executemany('INSERT INTO progresso (usuario_id, dados) VALUES (?, ?)', [
+                (user_id, json.dumps(_serializavel(progresso_data))) for user_id, _, progresso_data in usuarios
+            ])
+        return len(usuarios)
+
+    def atualizar_usuario(self, user_id, update_data, email_antigo=None):
+        with self._transacao() as conexao:
+            linha = conexao.execute('SELECT dados FROM usuarios WHERE id = ?', (user_id,)).fetchone()
+            if linha is None:
+                raise KeyError(f'Usuário inexistente: {user_id}')
+            usuario = json.loads(linha['dados'])
+            usuario.update(_serializavel(update_data))
+            conexao.execute('UPDATE usuarios SET email = ?, dados = ? WHERE id = ?', (
+                normalizar_email(usuario['email']), json.dumps(usuario), user_id
+            ))
+
+    # --- Progresso ---
+
+    def _aplicar_progresso(self, conexao, user_id, incrementos, valores):
+        linha = conexao.execute('SELECT dados FROM progresso WHERE usuario_id = ?', (user_id,)).fetchone()
+        if linha is None:
+            raise KeyError(f'Progresso inexistente: {user_id}')
+        progresso = json.loads(linha['dados'])
+        for caminho, n in (incrementos or {}).items():
+            _definir_caminho(progresso, caminho_progresso(caminho), n, incremento=True)
+        for caminho, valor in (valores or {}).items():
+            _definir_caminho(progresso, caminho_progresso(caminho), _serializavel(valor))
+        conexao.execute('UPDATE progresso SET dados = ? WHERE usuario_id = ?', (json.dumps(progresso), user_id))
+
+    def atualizar_progresso(self, user_id, incrementos=None, valores=None):
+        with self._transacao() as conexao:
+            self._aplicar_progresso(conexao, user_id, incrementos, valores)
+
+    def atualizar_progresso_com_anterior(self, user_id, modulo_slug, incrementos=None, valores=None):
+        with self._transacao() as conexao:
+            linha = conexao.execute('SELECT dados FROM progresso WHERE usuario_id = ?', (user_id,)).fetchone()
+            progresso = ler_progresso(json.loads(linha['dados'])) if linha else None
+            anterior = (progresso or {}).get(modulo_slug) or {}
+            self._aplicar_progresso(conexao, user_id, incrementos, valores)
+        return anterior
+
+    def incrementar_lote(self, lote):
+        with self._transacao() as conexao:
+            for user_id, incrementos in lote.items():
+                self._aplicar_progresso(conexao, user_id, incrementos, None)
+        lote.clear()
+
+    # --- Respostas do projeto ---
+
+    def get_respostas(self, user_id, slugs):
+        slugs = list(slugs)
+        if not slugs:
+            return {}
+        marcadores = ', '.join('?' for _ in slugs)
+        with self._conexao() as conexao:
+            linhas = conexao.execute(
+                f'SELECT modulo_slug, conteudo_resposta FROM respostas_projeto '
+                f'WHERE usuario_id = ? AND modulo_slug IN ({marcadores})', (user_id, *slugs)
+            ).fetchall()
+        return {linha['modulo_slug']: linha['conteudo_resposta'] for linha in linhas}
+
+    def salvar_resposta(self, user_id, modulo_slug, conteudo):
+        with self._transacao() as conexao:
+            conexao.execute(
+                'INSERT INTO respostas_projeto (usuario_id, modulo_slug, conteudo_resposta, data_atualizacao) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT (usuario_id, modulo_slug) DO UPDATE SET '
+                'conteudo_resposta = excluded.conteudo_resposta, data_atualizacao = excluded.data_atualizacao',
+                (user_id, modulo_slug, conteudo, _agora_iso())
+            )
+
+    def get_portfolio(self, user_id, slugs):
+        # Aqui as respostas do usuário já saem em uma única consulta
+        return self.get_respostas(user_id, slugs)
+
+    def paginar_respostas(self, tamanho_pagina=500):
+        ultimo = ('', '')
+        while True:
+            with self._conexao() as conexao:
+                linhas = conexao.execute(
+                    'SELECT r.usuario_id, r.modulo_slug, r.conteudo_resposta, r.data_atualizacao, u.dados '
+                    'FROM respostas_projeto r LEFT JOIN usuarios u ON u.id = r.usuario_id '
+                    'WHERE (r.usuario_id, r.modulo_slug) > (?, ?) '
+                    'ORDER BY r.usuario_id, r.modulo_slug LIMIT ?', (*ultimo, tamanho_pagina)
+                ).fetchall()
+            if not linhas:
+                return
+            yield [_linha_exportacao(dict(linha), json.loads(linha['dados']) if linha['dados'] else None)
+                   for linha in linhas]
+            if len(linhas) < tamanho_pagina:
+                return
+            ultimo = (linhas[-1]['usuario_id'], linhas[-1]['modulo_slug'])
@@ -0,0 +1,80 @@
+import threading
+
+from progress import ler_progresso
+
+
+class TransactionalSubmitter:
+    """Grava uma submissão de exercício lendo e atualizando o sub-mapa do módulo
+    em uma única transação do Firestore.
+
+    Diferente do caminho com firestore.Increment, os contadores retornados são
+    os reais pós-incremento, e 'concluido' nunca é perdido por submissões
+    concorrentes (ex.: duas abas). O custo é uma leitura extra e retentativas
+    sob contenção, limitadas por `max_attempts`.
+    """
+
+    def __init__(self, db, max_attempts=5):
+        self.db = db
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.metricas = {'transacoes': 0, 'tentativas': 0, 'retentativas': 0, 'falhas': 0}
+
+    def submeter(self, user_id, modulo_slug, is_correct, min_acertos):
+        """Retorna {'acertos', 'erros', 'concluido', 'ja_concluido'} após a gravação."""
+        return self.submeter_lote(user_id, modulo_slug, int(is_correct), int(not is_correct), min_acertos)
+
+    def submeter_lote(self, user_id, modulo_slug, novos_acertos, novos_erros, min_acertos):
+        """Como submeter, mas soma `novos_acertos` e `novos_erros` de uma vez (envio do módulo inteiro)."""
+        # Import tardio: o google-cloud-firestore só é carregado se o modo transacional for usado
+        from google.cloud import firestore
+
+        progresso_ref = self.db.collection('progresso').document(str(user_id))
+        tentativas = [0]
+
+        @firestore.transactional
+        def aplicar(transaction):
+            tentativas[0] += 1
+            snapshot = progresso_ref.get(transaction=transaction)
+            progresso_db = ler_progresso(snapshot.to_dict()) if snapshot.exists else {}
+            modulo = progresso_db.get(modulo_slug) or {}
+            acertos = modulo.get('acertos', 0)
+            erros = modulo.get('erros', 0)
+
+            if modulo.get('concluido'):
+                return {'acertos': acertos, 'erros': erros, 'concluido': True, 'ja_concluido': True}
+
+            acertos += novos_acertos
+            erros += novos_erros
+            concluido = acertos >= min_acertos
+
+            # Valores absolutos nos mapas v2; o sub-mapa v1 do módulo (se houver) já foi
+            # somado acima e sai do documento, para não ser contado duas vezes
+            update_data = {
+                f'a.{modulo_slug}': acertos,
+                f'e.{modulo_slug}': erros,
+                modulo_slug: firestore.DELETE_FIELD,
+            }
+            if concluido:
+                update_data[f'c.{modulo_slug}'] = True
+            if snapshot.exists:
+                transaction.update(progresso_ref, update_data)
+            else:
+                transaction.set(progresso_ref, {'v': 2, 'a': {modulo_slug: acertos}, 'e': {modulo_slug: erros},
+                                                'c': {modulo_slug: True} if concluido else {}})
+            return {'acertos': acertos, 'erros': erros, 'concluido': concluido, 'ja_concluido': False}
+
+        try:
+            resultado = aplicar(self.db.transaction(max_attempts=self.max_attempts))
+        except Exception:
+            self._registrar(tentativas[0], falhou=True)
+            raise
+        self._registrar(tentativas[0])
+        return resultado
+
+    def _registrar(self, tentativas, falhou=False):
+        with self._lock:
+            self.metricas['transacoes'] += 1
+            self.metricas['tentativas'] += tentativas
+            self.metricas['retentativas'] += max(tentativas - 1, 0)
+            if falhou:
+                self.metricas['falhas'] += 1
@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+import pytest
+
+# O app é importado com o SQLite e os caches em um diretório temporário: nada toca o Firestore
+# real nem a pasta instance/ do projeto. Os testes trocam o storage por um FakeFirestore.
+TMP = tempfile.mkdtemp(prefix='pcteacher-testes-')
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', os.path.join(TMP, 'testes.db'))
+os.environ.setdefault('CERTIFICADOS_DIR', os.path.join(TMP, 'certificados'))
+os.environ.setdefault('JINJA_BYTECODE_CACHE_DIR', os.path.join(TMP, 'jinja_cache'))
+os.environ.setdefault('PROFILES_DIR', os.path.join(TMP, 'profiles'))
+os.environ.setdefault('LOGIN_THROTTLE_IP_BURST', '0')
+os.environ.setdefault('LOGIN_THROTTLE_EMAIL_BURST', '0')
+
+
+@pytest.fixture
+def pc_teacher(monkeypatch):
+    """O módulo app com um FakeFirestore vazio no lugar do banco e o cache de usuários limpo."""
+    import app as pc_teacher
+    from fake_firestore import FakeFirestore
+    from storage import FirestoreStorage
+
+    fake = FakeFirestore()
+    monkeypatch.setattr(pc_teacher, 'db', fake)
+    monkeypatch.setattr(pc_teacher, 'storage', FirestoreStorage(fake))
+    pc_teacher.usuario_cache.clear()
+    yield pc_teacher
+    pc_teacher.usuario_cache.clear()
+
+
+@pytest.fixture
+def cliente(pc_teacher):
+    """Test client com a sessão de 'u1', que existe no fake com o progresso vazio."""
+    pc_teacher.db.collection('usuarios').document('u1').set({'nome': 'Professora', 'email': 'u1@escola.exemplo'})
+    pc_teacher.db.collection('progresso').document('u1').set({})
+    cliente = pc_teacher.app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['usuario_id'] = 'u1'
+    return cliente
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip('asgiref')
+
+from async_storage import AsyncFirestoreStorage  # noqa: E402
+from fake_firestore import FakeAsyncFirestore  # noqa: E402
+
+
+@pytest.fixture
+def asgi(pc_teacher, monkeypatch):
+    """asgi.AdaptadorAsgi com o storage firestore-async sobre o FakeFirestore do pc_teacher."""
+    from asgi import AdaptadorAsgi
+
+    fake = pc_teacher.db
+    monkeypatch.setattr(pc_teacher, 'storage', AsyncFirestoreStorage(fake, lambda: FakeAsyncFirestore(fake)))
+    fake.collection('usuarios').document('u1').set({'nome': 'Professora', 'email': 'u1@escola.exemplo'})
+    fake.collection('progresso').document('u1').set({})
+    adaptador = AdaptadorAsgi(pc_teacher.app, pc_teacher.rotas_async(), threads=2)
+    yield adaptador
+    adaptador.executor.shutdown()
+
+
+def cookie_de_sessao(pc_teacher, user_id='u1'):
+    serializador = pc_teacher.app.session_interface.get_signing_serializer(pc_teacher.app)
+    return f"{pc_teacher.app.config['SESSION_COOKIE_NAME']}={serializador.dumps({'usuario_id': user_id})}"
+
+
+async def chamar(adaptador, metodo, caminho, cookie='', dados=None):
+    """Uma requisição ASGI direto no adaptador; retorna (status, cabeçalhos, corpo)."""
+    corpo = json.dumps(dados).encode() if dados is not None else b''
+    cabecalhos = [(b'host', b'localhost'), (b'cookie', cookie.encode())]
+    if dados is not None:
+        cabecalhos += [(b'content-type', b'application/json'), (b'content-length', str(len(corpo)).encode())]
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo,
+             'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'',
+             'root_path': '', 'headers': cabecalhos, 'server': ('localhost', 80), 'client': ('127.0.0.1', 5000)}
+    mensagens = [{'type': 'http.request', 'body': corpo, 'more_body': False}]
+    enviadas = []
+
+    async def receive():
+        return mensagens.pop(0) if mensagens else {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    await adaptador(scope, receive, send)
+    inicio = next(m for m in enviadas if m['type'] == 'http.response.start')
+    corpo = b''.join(m.get('body', b'') for m in enviadas if m['type'] == 'http.response.body')
+    return inicio['status'], dict((k.decode(), v.decode()) for k, v in inicio['headers']), corpo
+
+
+def sem_leituras_sincronas(pc_teacher, monkeypatch):
+    def falhar(*args, **kwargs):
+        raise AssertionError('leitura pelo cliente síncrono numa rota async')
+    monkeypatch.setattr(pc_teacher.storage, 'get_documentos', falhar)
+
+
+def test_so_o_modo_firestore_async_tem_rotas_async(pc_teacher, asgi):
+    assert set(pc_teacher.rotas_async()) == {'conteudo_dinamico', 'submeter_exercicio'}
+    pc_teacher.storage = pc_teacher.FirestoreStorage(pc_teacher.db)
+    assert pc_teacher.rotas_async() == {}
+
+
+def test_pagina_de_conteudo_pelo_async_client(pc_teacher, asgi, monkeypatch):
+    # Resposta só no documento do módulo (portfólio incompleto): a página completa com outra leitura
+    pc_teacher.db.collection('respostas_projeto').document('u1_introducao').set(
+        {'usuario_id': 'u1', 'modulo_slug': 'introducao', 'conteudo_resposta': 'Minha ideia de projeto'})
+    pc_teacher.storage.atualizar_progresso('u1', valores={'algoritmo.concluido': True})
+    sem_leituras_sincronas(pc_teacher, monkeypatch)
+
+    status, _, corpo = asyncio.run(chamar(asgi, 'GET', '/conteudo/projeto-final', cookie_de_sessao(pc_teacher)))
+    assert status == 200
+    assert 'Minha ideia de projeto' in corpo.decode()
+
+    # Módulo bloqueado: mesma regra de desbloqueio da view síncrona
+    status, cabecalhos, _ = asyncio.run(chamar(asgi, 'GET', '/conteudo/decomposicao', cookie_de_sessao(pc_teacher)))
+    assert status == 302 and cabecalhos['location'].endswith('/modulos')
+
+
+def test_pagina_de_conteudo_sem_sessao_vai_para_o_login(asgi):
+    status, cabecalhos, _ = asyncio.run(chamar(asgi, 'GET', '/conteudo/introducao'))
+    assert status == 302 and cabecalhos['location'].endswith('/login')
+
+
+def test_submissao_pelo_async_client(pc_teacher, asgi, monkeypatch):
+    questao = pc_teacher.banco_questoes.do_modulo('introducao')[0]
+    pc_teacher.storage.atualizar_progresso('u1', {'introducao.acertos': 2})
+    sem_leituras_sincronas(pc_teacher, monkeypatch)
+
+    status, _, corpo = asyncio.run(chamar(asgi, 'POST', '/submeter-exercicio/introducao', cookie_de_sessao(pc_teacher),
+                                          {'questao_id': questao['id'], 'resposta': questao['correta']}))
+    dados = json.loads(corpo)
+    assert status == 200 and dados['is_correct'] is True
+    assert dados['new_acertos'] == 3 and dados['is_module_completed'] is True
+
+    _, progresso = pc_teacher.FirestoreStorage(pc_teacher.db).get_usuario_e_progresso('u1')
+    assert progresso['introducao'] == {'acertos': 3, 'erros': 0, 'concluido': True}
+
+
+def test_demais_rotas_seguem_pelo_pool_wsgi(pc_teacher, asgi):
+    status, _, corpo = asyncio.run(chamar(asgi, 'GET', '/api/progresso', cookie_de_sessao(pc_teacher)))
+    assert status == 200 and json.loads(corpo)['total_modules'] == 6
+    status, _, _ = asyncio.run(chamar(asgi, 'GET', '/nao-existe'))
+    assert status == 404
+
+
+def test_paginas_esperam_o_firestore_ao_mesmo_tempo(pc_teacher, asgi):
+    pc_teacher.db.latencia = 0.1
+    cookie = cookie_de_sessao(pc_teacher)
+
+    async def dez_paginas():
+        return await asyncio.gather(*(chamar(asgi, 'GET', '/conteudo/introducao', cookie) for _ in range(10)))
+
+    inicio = time.perf_counter()
+    respostas = asyncio.run(dez_paginas())
+    # Uma a uma seriam 10 x 100 ms; no loop, as esperas se sobrepõem
+    assert all(status == 200 for status, _, _ in respostas)
+    assert time.perf_counter() - inicio < 0.6
@@ -0,0 +1,57 @@
+import pytest
+
+from write_buffer import ProgressWriteBuffer
+
+
+@pytest.fixture
+def estatisticas(pc_teacher, monkeypatch):
+    """Liga as estatísticas do curso com um buffer parado: os deltas ficam em retirar('curso')."""
+    buffer = ProgressWriteBuffer(lambda lote: None)
+    monkeypatch.setattr(pc_teacher, 'buffer_estatisticas', buffer)
+    return lambda: buffer.retirar('curso')
+
+
+def outra_submissao_no_meio(pc_teacher, monkeypatch, incrementos=None, valores=None):
+    # Outra requisição do mesmo usuário grava depois da leitura desta e antes da escrita
+    original = pc_teacher.storage.atualizar_progresso_com_anterior
+
+    def com_escrita_antes(*args, **kwargs):
+        pc_teacher.storage.atualizar_progresso('u1', incrementos, valores)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(pc_teacher.storage, 'atualizar_progresso_com_anterior', com_escrita_antes)
+
+
+def submeter(pc_teacher, cliente, certa=True):
+    questao = pc_teacher.banco_questoes.do_modulo('introducao')[0]
+    resposta = questao['correta'] if certa else next(o['letra'] for o in questao['opcoes'] if not o['correta'])
+    return cliente.post('/submeter-exercicio/introducao', json={'questao_id': questao['id'], 'resposta': resposta})
+
+
+def test_primeira_submissao_conta_em_iniciados(pc_teacher, cliente, estatisticas):
+    submeter(pc_teacher, cliente)
+    assert estatisticas() == {'introducao.acertos': 1, 'introducao.iniciados': 1}
+
+    submeter(pc_teacher, cliente, certa=False)
+    assert estatisticas() == {'introducao.erros': 1}
+
+
+def test_iniciados_vem_da_leitura_da_escrita(pc_teacher, cliente, estatisticas, monkeypatch):
+    outra_submissao_no_meio(pc_teacher, monkeypatch, incrementos={'introducao.erros': 1})
+    submeter(pc_teacher, cliente)
+    # A leitura do começo viu 0/0, mas a escrita encontrou o erro da outra submissão
+    assert estatisticas() == {'introducao.acertos': 1}
+
+
+def test_conclusao_concorrente_conta_uma_vez(pc_teacher, cliente, estatisticas, monkeypatch):
+    pc_teacher.storage.atualizar_progresso('u1', {'introducao.acertos': 2})
+    outra_submissao_no_meio(pc_teacher, monkeypatch, incrementos={'introducao.acertos': 1},
+                            valores={'introducao.concluido': True})
+    assert submeter(pc_teacher, cliente).get_json()['is_module_completed'] is True
+    assert 'introducao.concluidos' not in estatisticas()
+
+
+def test_projeto_final_conta_a_conclusao_uma_vez(pc_teacher, cliente, estatisticas):
+    pc_teacher.storage.atualizar_progresso('u1', valores={'algoritmo.concluido': True})
+    cliente.post('/concluir-projeto-final')
+    cliente.post('/concluir-projeto-final')
+    assert estatisticas() == {'projeto-final.iniciados': 1, 'projeto-final.concluidos': 1}
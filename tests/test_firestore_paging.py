@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from certificate_job import _datas_de_conclusao
+from fake_firestore import FailedPrecondition, FakeFirestore
+from firestore_paging import paginar_colecao
+
+
+def colecao(n):
+    db = FakeFirestore()
+    for i in range(n):
+        db.collection('progresso').document(f'u{i:04d}').set({'v': 2})
+    return db
+
+
+def ids(paginas):
+    return [snapshot.id for pagina in paginas for snapshot in pagina]
+
+
+def test_percorre_a_colecao_em_paginas_ordenadas_pelo_id():
+    paginas = list(paginar_colecao(colecao(7).collection('progresso'), tamanho_pagina=3))
+    assert [len(pagina) for pagina in paginas] == [3, 3, 1]
+    assert ids(paginas) == [f'u{i:04d}' for i in range(7)]
+
+
+def test_retoma_mesmo_com_o_documento_do_checkpoint_apagado():
+    db = colecao(6)
+    db.collection('progresso').document('u0002').delete()
+    paginas = paginar_colecao(db.collection('progresso'), tamanho_pagina=2, inicio_apos_id='u0002')
+    assert ids(paginas) == ['u0003', 'u0004', 'u0005']
+
+
+def test_datas_de_conclusao_em_lotes_de_ate_500():
+    db = colecao(1200)
+    concluidos = {snapshot.id: (snapshot, {}) for pagina in paginar_colecao(db.collection('progresso'), 1200)
+                  for snapshot in pagina}
+    chamadas = db.contar_chamadas_da_thread()
+
+    datas = _datas_de_conclusao(db, concluidos, FailedPrecondition)
+
+    hoje = datetime.now().date()
+    assert len(datas) == 1200 and set(datas.values()) == {hoje}
+    assert chamadas['commit'] == 3
+    assert db.collection('progresso').document('u1199').get().to_dict()['data_conclusao'] == hoje.isoformat()
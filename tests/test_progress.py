@@ -0,0 +1,99 @@
+import copy
+
+import pytest
+
+from fake_firestore import FakeFirestore
+from progress import compactar_progresso, ler_progresso
+from progress_migration import migrar_progresso
+
+V1 = {
+    'introducao': {'acertos': 3, 'erros': 1, 'concluido': True},
+    'decomposicao': {'acertos': 1, 'erros': 2, 'concluido': False},
+    'rec-padrao': {'acertos': 0, 'erros': 0, 'concluido': False},
+    'introducao_concluido': True,
+    'decomposicao_concluido': False,
+    'data_conclusao': '2026-03-01',
+}
+V2 = {
+    'v': 2,
+    'a': {'introducao': 3, 'decomposicao': 1},
+    'e': {'introducao': 1, 'decomposicao': 2},
+    'c': {'introducao': True},
+    'data_conclusao': '2026-03-01',
+}
+# v1 que já recebeu escritas nos caminhos v2 (ainda não migrado): a leitura soma as duas partes
+MISTO = {
+    'introducao': {'acertos': 2, 'erros': 1, 'concluido': False},
+    'introducao_concluido': False,
+    'a': {'introducao': 1, 'decomposicao': 1},
+    'e': {'decomposicao': 2},
+    'c': {'introducao': True},
+    'data_conclusao': '2026-03-01',
+}
+EXPANDIDO = {
+    'introducao': {'acertos': 3, 'erros': 1, 'concluido': True},
+    'decomposicao': {'acertos': 1, 'erros': 2, 'concluido': False},
+    'data_conclusao': '2026-03-01',
+}
+
+
+@pytest.mark.parametrize('doc', [V1, V2, MISTO], ids=['v1', 'v2', 'misto'])
+def test_todas_as_versoes_leem_a_mesma_estrutura(doc):
+    assert ler_progresso(doc) == EXPANDIDO
+
+
+def test_leitura_nao_altera_o_documento():
+    doc = copy.deepcopy(MISTO)
+    ler_progresso(doc)
+    assert doc == MISTO
+
+
+@pytest.mark.parametrize('doc', [V1, V2, MISTO, EXPANDIDO, {}], ids=['v1', 'v2', 'misto', 'expandido', 'vazio'])
+def test_compactar_e_ler_volta_ao_mesmo_progresso(doc):
+    compacto = compactar_progresso(doc)
+    assert compacto['v'] == 2
+    assert ler_progresso(compacto) == (ler_progresso(doc) or {})
+    assert compactar_progresso(compacto) == compacto
+
+
+def colecao(docs):
+    db = FakeFirestore()
+    for user_id, doc in docs.items():
+        db.collection('progresso').document(user_id).set(copy.deepcopy(doc))
+    return db
+
+
+def documentos(db):
+    return {snapshot.id: snapshot.to_dict() for snapshot in db.collection('progresso').stream()}
+
+
+def test_migracao_de_colecao_com_versoes_misturadas(tmp_path):
+    db = colecao({'u1': V1, 'u2': V2, 'u3': MISTO, 'u4': {}})
+    estatisticas = migrar_progresso(db, str(tmp_path / 'checkpoint.json'), tamanho_pagina=2, relatorio=lambda _: None)
+
+    assert estatisticas['lidos'] == 4
+    assert estatisticas['migrados'] == 3 and estatisticas['ja_v2'] == 1
+    for user_id, doc in documentos(db).items():
+        assert doc['v'] == 2
+        assert not any(isinstance(valor, dict) and 'acertos' in valor for valor in doc.values())
+        assert not any(chave.endswith('_concluido') for chave in doc)
+        esperado = {} if user_id == 'u4' else EXPANDIDO
+        assert ler_progresso(doc) == esperado
+
+
+def test_migracao_e_idempotente(tmp_path):
+    db = colecao({'u1': V1, 'u2': V2, 'u3': MISTO})
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    migrar_progresso(db, checkpoint, relatorio=lambda _: None)
+    depois_da_primeira = documentos(db)
+
+    estatisticas = migrar_progresso(db, checkpoint, relatorio=lambda _: None)
+    assert estatisticas['migrados'] == 0 and estatisticas['ja_v2'] == 3
+    assert documentos(db) == depois_da_primeira
+
+
+def test_migracao_simulada_nao_grava(tmp_path):
+    db = colecao({'u1': V1})
+    estatisticas = migrar_progresso(db, str(tmp_path / 'checkpoint.json'), simular=True, relatorio=lambda _: None)
+    assert estatisticas['bytes_depois'] < estatisticas['bytes_antes']
+    assert documentos(db) == {'u1': V1}
@@ -0,0 +1,134 @@
+import pytest
+
+from question_bank import BancoDeQuestoes
+
+DADOS = {'versao': 1, 'modulos': {
+    'introducao': [
+        {'id': 'introducao-1', 'enunciado': 'Pergunta 1',
+         'opcoes': [{'texto': 'Decomposição', 'feedback': 'Isso.'},
+                    {'texto': 'Topologia', 'feedback': 'Não é um pilar.'}],
+         'correta': 'A'},
+    ],
+    'decomposicao': [
+        {'id': 'decomposicao-1', 'enunciado': 'Pergunta 2',
+         'opcoes': [{'texto': 'Sim'}, {'texto': 'Não'}, {'texto': 'Talvez'}],
+         'correta': 'c'},
+    ],
+}}
+
+
+@pytest.fixture
+def banco():
+    return BancoDeQuestoes(DADOS)
+
+
+@pytest.mark.parametrize('resposta', ['A', 'a', '1', 'decomposicao', '  DECOMPOSIÇÃO '])
+def test_corrigir_opcao_correta(banco, resposta):
+    assert banco.corrigir('introducao-1', resposta) is True
+
+
+@pytest.mark.parametrize('resposta', ['B', '2', 'Topologia'])
+def test_corrigir_opcao_errada(banco, resposta):
+    assert banco.corrigir('introducao-1', resposta) is False
+
+
+@pytest.mark.parametrize('questao_id, resposta', [
+    ('introducao-9', 'A'),   # id desconhecido
+    ('introducao-1', 'E'),   # não é uma das opções
+    ('introducao-1', 'certo'),
+    ('introducao-1', None),
+])
+def test_corrigir_sem_resultado(banco, questao_id, resposta):
+    assert banco.corrigir(questao_id, resposta) is None
+
+
+def test_opcao_escolhida_traz_o_feedback(banco):
+    assert banco.opcao_escolhida('introducao-1', 'B')['feedback'] == 'Não é um pilar.'
+    assert banco.opcao_escolhida('introducao-1', 'Z') is None
+
+
+def test_corrigir_modulo_pela_posicao(banco):
+    assert banco.corrigir_modulo('introducao', ['A', 'B']) == [True, None]
+
+
+@pytest.mark.parametrize('questao, erro', [
+    ({'id': 'x y', 'opcoes': [{'texto': 'a'}, {'texto': 'b'}], 'correta': 'A'}, 'id'),
+    ({'id': 'x', 'opcoes': [{'texto': 'a'}], 'correta': 'A'}, 'opções'),
+    ({'id': 'x', 'opcoes': [{'texto': 'a'}, {'texto': 'b'}], 'correta': 'C'}, 'correta'),
+])
+def test_questao_invalida_recusada_na_carga(questao, erro):
+    with pytest.raises(ValueError, match=erro):
+        BancoDeQuestoes({'modulos': {'introducao': [questao]}})
+
+
+def test_banco_do_projeto_bate_com_os_exercicios_dos_modulos(pc_teacher):
+    # Cada módulo com questões no banco tem exatamente tantos exercícios quanto questões
+    for modulo in pc_teacher.MODULO_CONFIG:
+        assert len(pc_teacher.banco_questoes.do_modulo(modulo['slug'])) == modulo['exercises']
+        assert modulo['min_acertos_para_desbloqueio'] <= modulo['exercises']
+
+
+# --- check_answer (app.py) ---
+
+def test_check_answer_opcao_correta_e_errada(pc_teacher):
+    correta = pc_teacher.banco_questoes.gabarito('introducao-1')
+    errada = next(o['letra'] for o in pc_teacher.banco_questoes.questao('introducao-1')['opcoes'] if not o['correta'])
+    assert pc_teacher.check_answer('introducao', correta, 'introducao-1') is True
+    assert pc_teacher.check_answer('introducao', errada, 'introducao-1') is False
+
+
+def test_check_answer_id_desconhecido_ou_de_outro_modulo(pc_teacher):
+    correta = pc_teacher.banco_questoes.gabarito('decomposicao-1')
+    assert pc_teacher.check_answer('introducao', correta, 'introducao-99') is False
+    assert pc_teacher.check_answer('introducao', correta, None) is False
+    # Resposta certa, mas de uma questão de outro módulo
+    assert pc_teacher.check_answer('introducao', correta, 'decomposicao-1') is False
+
+
+def test_check_answer_texto_livre_em_modulo_com_banco(pc_teacher):
+    assert pc_teacher.check_answer('introducao', 'certo', 'introducao-1') is False
+    assert pc_teacher.check_answer('introducao', 'correto', None) is False
+
+
+def test_check_answer_palavra_chave_em_modulo_sem_banco(pc_teacher, monkeypatch):
+    monkeypatch.setattr(pc_teacher, 'banco_questoes', BancoDeQuestoes(DADOS))
+    # 'abstracao' não tem questões neste banco: vale a correção antiga por palavra-chave
+    assert pc_teacher.check_answer('abstracao', 'Está certo', None) is True
+    assert pc_teacher.check_answer('abstracao', 'Correto!', None) is True
+    assert pc_teacher.check_answer('abstracao', 'B', None) is False
+
+
+# --- Quiz: POST {questao_id, resposta} e o resultado do servidor ---
+
+def test_pagina_do_modulo_nao_traz_o_gabarito(cliente):
+    html = cliente.get('/conteudo/introducao').get_data(as_text=True)
+    assert 'data-questao="introducao-1"' in html
+    assert 'data-correct' not in html and 'data-feedback' not in html
+
+
+def test_submeter_devolve_resultado_e_feedback(pc_teacher, cliente):
+    questao = pc_teacher.banco_questoes.questao('introducao-1')
+    errada = next(o for o in questao['opcoes'] if not o['correta'])
+
+    dados = cliente.post('/submeter-exercicio/introducao',
+                         json={'questao_id': 'introducao-1', 'resposta': errada['letra']}).get_json()
+    assert dados['success'] and dados['is_correct'] is False
+    assert dados['feedback'] == errada['feedback']
+    assert dados['new_erros'] == 1
+
+    dados = cliente.post('/submeter-exercicio/introducao',
+                         json={'questao_id': 'introducao-1', 'resposta': questao['correta']}).get_json()
+    assert dados['is_correct'] is True and dados['new_acertos'] == 1
+    assert pc_teacher.storage.get_usuario_e_progresso('u1')[1]['introducao']['acertos'] == 1
+
+
+def test_submeter_ate_o_minimo_conclui_o_modulo(pc_teacher, cliente):
+    min_acertos = pc_teacher.MODULO_BY_SLUG['rec-padrao']['min_acertos_para_desbloqueio']
+    for questao in pc_teacher.banco_questoes.do_modulo('rec-padrao')[:min_acertos]:
+        dados = cliente.post('/submeter-exercicio/rec-padrao',
+                             json={'questao_id': questao['id'], 'resposta': questao['correta']}).get_json()
+    assert dados['is_module_completed'] is True
+    assert pc_teacher.storage.get_usuario_e_progresso('u1')[1]['rec-padrao']['concluido'] is True
+    # O botão "Concluir" da página passa a levar à lista de módulos
+    resposta = cliente.post('/concluir-modulo/rec_padrao')
+    assert resposta.status_code == 302 and resposta.location.endswith('/modulos')
@@ -0,0 +1,134 @@
+import pytest
+
+from fake_firestore import FakeFirestore
+from storage import FirestoreStorage, SQLiteStorage
+
+
+@pytest.fixture(params=['sqlite', 'firestore'])
+def storage(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteStorage(str(tmp_path / 'storage.db'))
+    return FirestoreStorage(FakeFirestore())
+
+
+def novo_usuario(n, **extra):
+    return (f'u{n}', {'nome': f'Professor(a) {n}', 'email': f'Prof{n}@Escola.exemplo', **extra}, {'v': 2})
+
+
+# --- Usuários ---
+
+def test_criar_e_ler_usuario_com_progresso(storage):
+    storage.criar_usuario(*novo_usuario(1, instituicao='EE Centro'))
+
+    usuario = storage.get_usuario('u1')
+    assert usuario['id'] == 'u1' and usuario['instituicao'] == 'EE Centro'
+    usuario, progresso = storage.get_usuario_e_progresso('u1')
+    assert usuario['nome'] == 'Professor(a) 1'
+    assert progresso == {'id': 'u1'}
+
+    assert storage.get_usuario('nao-existe') is None
+    assert storage.get_usuario_e_progresso('nao-existe') == (None, None)
+
+
+def test_email_e_buscado_pelo_indice_normalizado(storage):
+    storage.criar_usuario(*novo_usuario(1))
+    assert storage.buscar_uid_por_email(' prof1@escola.EXEMPLO ') == 'u1'
+    assert storage.buscar_uid_por_email('outro@escola.exemplo') is None
+
+
+def test_criar_usuarios_em_lote(storage):
+    usuarios = [novo_usuario(n) for n in range(250)]
+    assert storage.criar_usuarios_lote(usuarios, tamanho_batch=30) == 250
+    assert storage.get_usuario('u249')['email'] == 'Prof249@Escola.exemplo'
+    assert storage.emails_cadastrados(['prof0@escola.exemplo', 'PROF249@escola.exemplo', 'novo@escola.exemplo']) == {
+        'prof0@escola.exemplo', 'prof249@escola.exemplo'}
+
+
+def test_atualizar_usuario_troca_o_indice_de_email(storage):
+    storage.criar_usuario(*novo_usuario(1))
+    storage.atualizar_usuario('u1', {'email': 'novo@escola.exemplo', 'telefone': '1234'},
+                              email_antigo='Prof1@Escola.exemplo')
+
+    assert storage.get_usuario('u1')['telefone'] == '1234'
+    assert storage.buscar_uid_por_email('novo@escola.exemplo') == 'u1'
+    assert storage.buscar_uid_por_email('prof1@escola.exemplo') is None
+
+
+# --- Progresso ---
+
+def test_incrementos_e_valores_de_progresso(storage):
+    storage.criar_usuario(*novo_usuario(1))
+    storage.atualizar_progresso('u1', {'introducao.acertos': 2, 'introducao.erros': 1})
+    storage.atualizar_progresso('u1', {'introducao.acertos': 1}, {'introducao.concluido': True,
+                                                                  'data_conclusao': '2026-03-01'})
+
+    _, progresso = storage.get_usuario_e_progresso('u1')
+    assert progresso['introducao'] == {'acertos': 3, 'erros': 1, 'concluido': True}
+    assert progresso['data_conclusao'] == '2026-03-01'
+
+
+def test_atualizar_progresso_com_anterior(storage):
+    storage.criar_usuario(*novo_usuario(1))
+    assert storage.atualizar_progresso_com_anterior('u1', 'introducao', {'introducao.erros': 1}) == {}
+    anterior = storage.atualizar_progresso_com_anterior('u1', 'introducao', {'introducao.acertos': 1},
+                                                        {'introducao.concluido': True})
+    assert anterior == {'acertos': 0, 'erros': 1, 'concluido': False}
+    assert storage.get_usuario_e_progresso('u1')[1]['introducao'] == {'acertos': 1, 'erros': 1, 'concluido': True}
+
+
+def test_incrementar_lote(storage):
+    for n in range(3):
+        storage.criar_usuario(*novo_usuario(n))
+    lote = {'u0': {'introducao.acertos': 2}, 'u1': {'introducao.erros': 1}, 'u2': {'decomposicao.acertos': 1}}
+    storage.incrementar_lote(lote)
+
+    # O que foi gravado sai do lote
+    assert lote == {}
+    assert storage.get_usuario_e_progresso('u0')[1]['introducao']['acertos'] == 2
+    assert storage.get_usuario_e_progresso('u2')[1]['decomposicao']['acertos'] == 1
+
+
+# --- Respostas do projeto ---
+
+def test_salvar_e_ler_respostas(storage):
+    storage.criar_usuario(*novo_usuario(1))
+    storage.salvar_resposta('u1', 'introducao', 'Primeira ideia')
+    storage.salvar_resposta('u1', 'introducao', 'Ideia revisada')
+    storage.salvar_resposta('u1', 'abstracao', 'Outra ideia')
+
+    assert storage.get_respostas('u1', ['introducao', 'decomposicao']) == {'introducao': 'Ideia revisada'}
+    assert storage.get_portfolio('u1', ['introducao', 'abstracao', 'algoritmo']) == {
+        'introducao': 'Ideia revisada', 'abstracao': 'Outra ideia'}
+    assert storage.get_respostas('u1', []) == {}
+
+
+def test_paginar_respostas_com_o_autor(storage):
+    for n in range(3):
+        storage.criar_usuario(*novo_usuario(n))
+        for slug in ('introducao', 'abstracao'):
+            storage.salvar_resposta(f'u{n}', slug, f'Resposta {n} {slug}')
+
+    paginas = list(storage.paginar_respostas(tamanho_pagina=4))
+    assert [len(pagina) for pagina in paginas] == [4, 2]
+    linhas = [linha for pagina in paginas for linha in pagina]
+    assert sorted((linha['usuario_id'], linha['modulo_slug']) for linha in linhas) == sorted(
+        (f'u{n}', slug) for n in range(3) for slug in ('introducao', 'abstracao'))
+    assert all(linha['nome'] == f"Professor(a) {linha['usuario_id'][1:]}" for linha in linhas)
+    assert all(linha['data_atualizacao'] for linha in linhas)
+
+
+# --- Só Firestore: a página de conteúdo lê tudo em um get_all ---
+
+def test_carregar_pagina_em_uma_leitura():
+    db = FakeFirestore()
+    storage = FirestoreStorage(db)
+    storage.criar_usuario(*novo_usuario(1))
+    storage.atualizar_progresso('u1', {'introducao.acertos': 1})
+    storage.salvar_resposta('u1', 'introducao', 'Minha ideia')
+
+    chamadas = db.contar_chamadas_da_thread()
+    usuario, progresso, respostas = storage.carregar_pagina('u1', ['introducao', 'decomposicao'])
+    assert sum(chamadas.values()) == 1
+    assert usuario['nome'] == 'Professor(a) 1'
+    assert progresso['introducao']['acertos'] == 1
+    assert respostas == {'introducao': 'Minha ideia'}
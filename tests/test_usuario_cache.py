@@ -0,0 +1,41 @@
+def gravado_por_outro_worker(pc_teacher, incrementos=None, valores=None):
+    # Grava direto no storage, sem passar pelas rotas: o usuario_cache deste worker não fica sabendo
+    pc_teacher.storage.atualizar_progresso('u1', incrementos, valores)
+
+
+def test_cache_atende_as_paginas_de_exibicao(pc_teacher, cliente):
+    cliente.get('/dashboard')
+    gravado_por_outro_worker(pc_teacher, valores={'introducao.concluido': True})
+    assert 'introducao' not in pc_teacher.usuario_cache.get('u1')['progresso']
+
+
+def test_desbloqueio_le_o_progresso_atual(pc_teacher, cliente):
+    assert cliente.get('/conteudo/decomposicao').status_code == 302
+    gravado_por_outro_worker(pc_teacher, valores={'introducao.concluido': True})
+    assert cliente.get('/conteudo/decomposicao').status_code == 200
+
+
+def test_submissao_le_os_acertos_atuais(pc_teacher, cliente):
+    questoes = pc_teacher.banco_questoes.do_modulo('introducao')
+    cliente.get('/dashboard')
+    gravado_por_outro_worker(pc_teacher, incrementos={'introducao.acertos': 2})
+
+    dados = cliente.post('/submeter-exercicio/introducao',
+                         json={'questao_id': questoes[0]['id'], 'resposta': questoes[0]['correta']}).get_json()
+    # 2 acertos do outro worker + este = mínimo de 3: conclui
+    assert dados['new_acertos'] == 3 and dados['is_module_completed'] is True
+
+
+def test_etag_do_progresso_muda_com_escrita_de_outro_worker(pc_teacher, cliente):
+    primeira = cliente.get('/api/progresso')
+    assert cliente.get('/api/progresso', headers={'If-None-Match': primeira.headers['ETag']}).status_code == 304
+
+    gravado_por_outro_worker(pc_teacher, incrementos={'introducao.acertos': 1})
+    segunda = cliente.get('/api/progresso', headers={'If-None-Match': primeira.headers['ETag']})
+    assert segunda.status_code == 200 and segunda.headers['ETag'] != primeira.headers['ETag']
+
+
+def test_concluir_modulo_le_a_conclusao_atual(pc_teacher, cliente):
+    cliente.get('/dashboard')
+    gravado_por_outro_worker(pc_teacher, valores={'introducao.concluido': True})
+    assert cliente.post('/concluir-modulo/introducao').location.endswith('/modulos')
@@ -0,0 +1,50 @@
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from write_buffer import ProgressWriteBuffer, exigir_worker_unico
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def carregar_gunicorn_conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(RAIZ, 'gunicorn.conf.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def servidor(workers):
+    return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+
+def test_buffers_de_workers_diferentes_nao_se_enxergam():
+    # Dois workers = dois processos = dois buffers: o segundo não vê os acertos do primeiro
+    worker_a = ProgressWriteBuffer(lambda lote: None)
+    worker_b = ProgressWriteBuffer(lambda lote: None)
+    worker_a.add('u1', 'introducao', acertos=2)
+    worker_b.add('u1', 'introducao', acertos=1)
+    assert worker_b.pendentes('u1', 'introducao') == (1, 0)
+
+
+@pytest.mark.parametrize('workers, window', [(1, 2.0), (4, 0), (1, 0)])
+def test_write_behind_aceito_com_um_worker_ou_desligado(workers, window):
+    exigir_worker_unico(workers, window)
+
+
+def test_write_behind_recusado_com_varios_workers():
+    with pytest.raises(RuntimeError, match='único worker'):
+        exigir_worker_unico(2, 2.0)
+
+
+def test_gunicorn_recusa_subir_com_varios_workers(monkeypatch):
+    conf = carregar_gunicorn_conf()
+    monkeypatch.setenv('SUBMISSION_WRITE_BEHIND_WINDOW', '2')
+    with pytest.raises(RuntimeError):
+        conf.on_starting(servidor(3))
+    conf.on_starting(servidor(1))
+
+    monkeypatch.setenv('SUBMISSION_WRITE_BEHIND_WINDOW', '0')
+    conf.on_starting(servidor(3))
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Limitador token bucket por chave (ex.: 'ip:1.2.3.4', 'email:ana@escola.br').
+
+    Cada chave começa com `capacidade` fichas e ganha `por_segundo` fichas por
+    segundo até o máximo; cada tentativa gasta uma. Sem ficha, permitir()
+    retorna False. Assim rajadas curtas legítimas passam e retentativas em
+    série são barradas antes de qualquer hash de senha. Os baldes ficam em
+    memória (por processo), em um LRU de até `maxsize` chaves.
+    """
+
+    def __init__(self, capacidade, por_segundo, maxsize=10000):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.maxsize = maxsize
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.capacidade > 0
+
+    def permitir(self, chave, custo=1):
+        if not self.enabled:
+            return True
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado = self._baldes.get(chave, (self.capacidade, agora))
+            fichas = min(self.capacidade, fichas + (agora - atualizado) * self.por_segundo)
+            permitido = fichas >= custo
+            if permitido:
+                fichas -= custo
+            self._baldes[chave] = (fichas, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.maxsize:
+                self._baldes.popitem(last=False)
+            return permitido
+
+    def espera(self, chave, custo=1):
+        """Segundos até haver `custo` fichas na chave (0 se já houver)."""
+        with self._lock:
+            fichas, atualizado = self._baldes.get(chave, (self.capacidade, time.monotonic()))
+        fichas = min(self.capacidade, fichas + (time.monotonic() - atualizado) * self.por_segundo)
+        if fichas >= custo or self.por_segundo <= 0:
+            return 0
+        return (custo - fichas) / self.por_segundo
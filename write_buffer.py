@@ -0,0 +1,126 @@
+import atexit
+import threading
+from collections import defaultdict
+
+
+def exigir_worker_unico(workers, window):
+    """Levanta RuntimeError se o modo write-behind (window > 0) for usado com mais de um worker."""
+    if window > 0 and workers > 1:
+        raise RuntimeError(
+            f'SUBMISSION_WRITE_BEHIND_WINDOW={window} exige um único worker do gunicorn (há {workers}): '
+            'o buffer é por processo e a conclusão dos módulos se perderia. '
+            'Use -w 1 com --threads, ou SUBMISSION_WRITE_BEHIND_WINDOW=0.'
+        )
+
+
+class ProgressWriteBuffer:
+    """Buffer write-behind para os contadores de exercícios.
+
+    Acumula, por usuário, os incrementos de acertos/erros de cada módulo e os
+    grava em lote a cada `window` segundos através de `flush_fn`, que recebe
+    {user_id: {'slug.acertos': n, 'slug.erros': n, ...}} e é responsável pela
+    escrita (ex.: um WriteBatch com firestore.Increment). Se falhar no meio,
+    flush_fn deve remover de `lote` os usuários já gravados.
+
+    Incrementos em voo (já retirados do buffer, mas ainda não confirmados)
+    continuam visíveis em `pendentes()`, para que o feedback calculado a
+    partir de um snapshot lido antes do flush não perca contagens.
+
+    O buffer é do processo: só funciona com um worker do gunicorn (threads à
+    vontade). Com vários, o worker que recebe o acerto decisivo não enxerga os
+    acertos ainda no buffer dos outros e 'concluido' nunca é gravado; veja
+    exigir_worker_unico, chamado pelo gunicorn.conf.py na subida.
+    """
+
+    def __init__(self, flush_fn, window=2.0):
+        self.flush_fn = flush_fn
+        self.window = window
+        self._pendentes = defaultdict(lambda: defaultdict(int))
+        self._em_voo = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='progress-write-buffer', daemon=True)
+            self._thread.start()
+            # Drena o que restar quando o worker for encerrado
+            atexit.register(self.stop)
+        return self
+
+    def apos_fork(self):
+        """No worker recém-criado (gunicorn --preload): a thread do mestre não existe aqui."""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._parar = threading.Event()
+        self._pendentes.clear()
+        self._em_voo = {}
+        self._thread = None
+        return self.start()
+
+    def stop(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.window + 5)
+            self._thread = None
+        self.flush()
+
+    def add(self, user_id, modulo_slug, acertos=0, erros=0):
+        self.somar(user_id, {f'{modulo_slug}.acertos': acertos, f'{modulo_slug}.erros': erros})
+
+    def somar(self, chave, incrementos):
+        """Acumula {'caminho': n} na chave (usuário, ou outro documento de contadores)."""
+        with self._lock:
+            contadores = self._pendentes[chave]
+            for caminho, n in incrementos.items():
+                if n:
+                    contadores[caminho] += n
+
+    def pendentes(self, user_id, modulo_slug):
+        """Incrementos (acertos, erros) ainda não visíveis no Firestore."""
+        with self._lock:
+            acertos = erros = 0
+            for fonte in (self._pendentes.get(user_id), self._em_voo.get(user_id)):
+                if fonte:
+                    acertos += fonte.get(f'{modulo_slug}.acertos', 0)
+                    erros += fonte.get(f'{modulo_slug}.erros', 0)
+            return acertos, erros
+
+    def retirar(self, user_id):
+        """Remove e retorna os incrementos pendentes de um usuário para uma escrita imediata."""
+        with self._lock:
+            return dict(self._pendentes.pop(user_id, {}))
+
+    def devolver(self, user_id, contadores):
+        """Recoloca no buffer incrementos retirados cuja escrita falhou."""
+        with self._lock:
+            for caminho, n in contadores.items():
+                self._pendentes[user_id][caminho] += n
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pendentes:
+                    return 0
+                lote = {uid: dict(c) for uid, c in self._pendentes.items()}
+                total = len(lote)
+                self._pendentes.clear()
+                self._em_voo = lote
+            try:
+                self.flush_fn(lote)
+            except Exception as e:
+                print(f"Erro ao gravar lote de submissões ({len(lote)} usuário(s)): {e}")
+                # Devolve ao buffer o que flush_fn não confirmou (ela remove de 'lote' o que gravou)
+                for uid, contadores in lote.items():
+                    self.devolver(uid, contadores)
+                return 0
+            finally:
+                with self._lock:
+                    self._em_voo = {}
+            return total
+
+    def _loop(self):
+        while not self._parar.wait(self.window):
+            self.flush()